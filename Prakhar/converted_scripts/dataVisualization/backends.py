@@ -0,0 +1,286 @@
+# backends.py
+# Pluggable engines for the row-level aggregations that are left once the
+# cube and the Dataset paths don't apply: group stats and count tables for
+# the bar charts, and null/value counts of the text columns in the profile.
+# "pandas" (the default) keeps the groupby/value_counts code in
+# eda_functions and profiling. "polars" and "arrow" run the same
+# aggregations multithreaded on Arrow columns, converted once per dataframe
+# and column, so string columns like gender are Arrow strings instead of
+# Python objects. Choose with the EDA_BACKEND environment variable or
+# set_backend(); `python backends.py data.csv` checks that every installed
+# backend gives the same results as pandas.
+import os
+import sys
+import weakref
+from importlib.util import find_spec
+
+import numpy as np
+import pandas as pd
+
+import derived
+from lazy_imports import LazyModule
+
+# Optional dependencies, imported when a backend first uses them
+pl = LazyModule("polars") if find_spec("polars") else None
+pa = LazyModule("pyarrow") if find_spec("pyarrow") else None
+pc = LazyModule("pyarrow.compute") if pa is not None else None
+
+BACKEND_NAMES = ("pandas", "polars", "arrow")
+
+
+class _Engine:
+    """
+    Shared ordering and labelling on top of a few engine primitives, so
+    every backend returns exactly what the pandas code does: categorical and
+    derived columns are grouped by their integer codes and keep all their
+    levels, numeric levels are sorted and text levels keep their order of
+    first appearance. Missing keys are dropped.
+    """
+    name = None
+
+    def __init__(self):
+        # The process whose thread pool the engine runs on (see engine())
+        self.pid = os.getpid()
+        # Converted columns per dataframe (by id), dropped with the frame
+        self._columns = {}
+
+    def column(self, df, name):
+        entry = self._columns.get(id(df))
+        if entry is None:
+            entry = self._columns[id(df)] = {}
+            weakref.finalize(df, self._columns.pop, id(df), None)
+        if name not in entry:
+            entry[name] = self.convert(df[name])
+        return entry[name]
+
+    def key(self, df, name):
+        """(engine column, categorical dtype) for a grouping column; the dtype is None unless it's coded."""
+        if name not in df.columns or isinstance(df[name].dtype, pd.CategoricalDtype):
+            codes, labels = derived.codes(df, name)
+            dtype = df[name].dtype if name in df.columns else pd.CategoricalDtype(list(labels), ordered=True)
+            return self.convert_codes(codes), dtype
+        return self.column(df, name), None
+
+    def _levels(self, df, name, key, dtype, found, categorical=True):
+        # Levels in pandas' order and the positions to reindex by
+        if dtype is not None:
+            positions = np.arange(len(dtype.categories))
+            if not categorical:
+                return pd.Index(dtype.categories, name=name), positions
+            return pd.CategoricalIndex(dtype.categories, dtype=dtype, name=name), positions
+        if pd.api.types.is_numeric_dtype(df[name]):
+            levels = np.sort(np.asarray(found))
+        else:
+            levels = self.unique(key)
+        return pd.Index(levels, name=name), levels
+
+    def group_stats(self, df, x, y):
+        """count, mean and std of y per level of x, like eda_functions.group_stats."""
+        key, dtype = self.key(df, x)
+        stats = self.stats(key, self.column(df, y))
+        index, positions = self._levels(df, x, key, dtype, stats.index)
+        stats = stats.reindex(positions)
+        stats.index = index
+        stats["count"] = stats["count"].fillna(0).astype(np.int64)
+        # pandas keeps float32 means for float32 columns
+        dtype = df[y].dtype if pd.api.types.is_float_dtype(df[y]) else np.float64
+        return stats[["count", "mean", "std"]].astype({"mean": dtype, "std": dtype})
+
+    def group_counts(self, df, x, hue):
+        """Row counts per (x, hue) pair as an x by hue table, like eda_functions.group_counts."""
+        (kx, tx), (kh, th) = self.key(df, x), self.key(df, hue)
+        pairs = self.counts(kx, kh)
+        table = pairs.set_index(["a", "b"])["n"].unstack("b", fill_value=0)
+        # Reindexed by a list of levels in the pandas code, so plain indexes
+        rows, row_positions = self._levels(df, x, kx, tx, table.index, categorical=False)
+        cols, col_positions = self._levels(df, hue, kh, th, table.columns, categorical=False)
+        table = table.reindex(index=row_positions, columns=col_positions, fill_value=0).astype(np.int64)
+        table.index, table.columns = rows, cols
+        return table
+
+    def value_counts(self, df, name):
+        """df[name].value_counts() (most frequent first)."""
+        key, dtype = self.key(df, name)
+        if dtype is not None:
+            counts = self.frequencies(key).reindex(np.arange(len(dtype.categories)), fill_value=0)
+            counts.index = pd.CategoricalIndex(dtype.categories, dtype=dtype, name=name)
+        else:
+            counts = self.frequencies(key)
+            counts.index.name = name
+        return counts.astype(np.int64).rename("count").sort_values(ascending=False, kind="stable")
+
+    def null_count(self, df, name):
+        if name not in df.columns or isinstance(df[name].dtype, pd.CategoricalDtype):
+            return int((derived.codes(df, name)[0] < 0).sum())
+        return self.nulls(self.column(df, name))
+
+
+class PolarsBackend(_Engine):
+    name = "polars"
+
+    def convert(self, series):
+        return pl.from_pandas(series)
+
+    def convert_codes(self, codes):
+        return pl.Series(codes)
+
+    def stats(self, key, values):
+        stats = (
+            pl.DataFrame({"k": key, "v": values})
+            .group_by("k")
+            .agg(pl.col("v").count().alias("count"), pl.col("v").mean().alias("mean"),
+                 pl.col("v").std().alias("std"))
+            .drop_nulls("k")
+        )
+        return stats.to_pandas().set_index("k")
+
+    def counts(self, a, b):
+        return pl.DataFrame({"a": a, "b": b}).group_by(["a", "b"]).len("n").drop_nulls(["a", "b"]).to_pandas()
+
+    def unique(self, key):
+        return key.drop_nulls().unique(maintain_order=True).to_list()
+
+    def frequencies(self, key):
+        counts = key.drop_nulls().to_frame("v").group_by("v", maintain_order=True).len("n").to_pandas()
+        return counts.set_index("v")["n"]
+
+    def nulls(self, column):
+        return int(column.null_count())
+
+
+class ArrowBackend(_Engine):
+    name = "arrow"
+
+    def convert(self, series):
+        return pa.array(series, from_pandas=True)
+
+    def convert_codes(self, codes):
+        return pa.array(codes)
+
+    def stats(self, key, values):
+        # As float64, like pandas' mean and std: Arrow has no stddev kernel
+        # for the null type an empty object column converts to
+        values = values.cast(pa.float64())
+        stats = pa.table({"k": key, "v": values}).group_by("k").aggregate([
+            ("v", "count"), ("v", "mean"), ("v", "stddev", pc.VarianceOptions(ddof=1)),
+        ])
+        stats = stats.filter(pc.is_valid(stats["k"])).to_pandas()
+        return stats.set_index("k").rename(columns={"v_count": "count", "v_mean": "mean", "v_stddev": "std"})
+
+    def counts(self, a, b):
+        table = pa.table({"a": a, "b": b}).group_by(["a", "b"]).aggregate([([], "count_all")])
+        table = table.filter(pc.and_(pc.is_valid(table["a"]), pc.is_valid(table["b"])))
+        return table.to_pandas().rename(columns={"count_all": "n"})
+
+    def unique(self, key):
+        # pc.unique keeps the order of first appearance
+        return pc.unique(key).drop_null().to_pylist()
+
+    def frequencies(self, key):
+        counts = pc.value_counts(key.drop_null())
+        return pd.Series(counts.field("counts").to_numpy(), index=counts.field("values").to_pylist())
+
+    def nulls(self, column):
+        return column.null_count
+
+
+_ENGINES = {"polars": (PolarsBackend, pl), "arrow": (ArrowBackend, pa)}
+_active = None
+
+def set_backend(name):
+    """Selects the backend ("pandas", "polars" or "arrow") for this process."""
+    global _active
+    if name not in BACKEND_NAMES:
+        raise ValueError(f"backend must be one of {', '.join(BACKEND_NAMES)}, not {name!r}")
+    if name == "pandas":
+        _active = None
+        return
+    cls, module = _ENGINES[name]
+    if module is None:
+        raise ImportError(f"The {name} backend needs the {name if name == 'polars' else 'pyarrow'} package")
+    _active = cls()
+
+def get_backend():
+    return "pandas" if _active is None else _active.name
+
+def engine():
+    """
+    The active Polars/Arrow engine, or None for pandas. Their thread pools
+    don't survive fork(), so forked render workers (rendering.py) use pandas.
+    """
+    if _active is None or _active.pid != os.getpid():
+        return None
+    return _active
+
+set_backend(os.environ.get("EDA_BACKEND", "pandas"))
+
+
+# Parity check
+def check_parity(df, backends=None):
+    """
+    Runs the backend-dependent aggregations (the bar chart stats and count
+    tables of every registered plot, and the profile) on each backend and
+    compares them with pandas. Returns {backend: list of mismatches}.
+    """
+    import eda_functions as eda
+    import profiling
+
+    if not len(df):
+        # Nothing to aggregate; pandas' empty results are object-typed where
+        # the engines give numbers, which isn't worth reporting
+        return {name: [] for name in backends or BACKEND_NAMES[1:]}
+    stats_pairs = [("gender", "ads_clicked_per_day"), ("activity_bin", "reels_watched_per_day"),
+                   ("relationship_status", "dms_sent_per_week"), ("employment_status", "daily_active_minutes_instagram"),
+                   ("education_level", "daily_active_minutes_instagram"), ("age", "likes_given_per_day")]
+    count_pairs = [("gender", "activity_bin"), ("education_level", "gender")]
+
+    def run():
+        results = {}
+        for x, y in stats_pairs:
+            if derived.can_derive(df, x) and y in df.columns:
+                results[f"group_stats({x}, {y})"] = eda.group_stats(df, x, y)
+        for x, hue in count_pairs:
+            if derived.can_derive(df, x) and derived.can_derive(df, hue):
+                results[f"group_counts({x}, {hue})"] = eda.group_counts(df, x, hue)
+        profile = profiling.profile_dataset(df, duplicates=False)
+        results["profile.missing"] = profile.missing
+        for name, column in profile.columns.items():
+            if column.top_values is not None:
+                results[f"profile.top_values({name})"] = column.top_values
+        return results
+
+    previous = get_backend()
+    try:
+        set_backend("pandas")
+        expected = run()
+        mismatches = {}
+        for name in backends or BACKEND_NAMES[1:]:
+            set_backend(name)
+            found = run()
+            mismatches[name] = []
+            for label, want in expected.items():
+                assert_equal = pd.testing.assert_frame_equal if isinstance(want, pd.DataFrame) else pd.testing.assert_series_equal
+                # Same numbers up to rounding: engines sum in a different order
+                # (and pandas accumulates float32 means in float32)
+                dtypes = want.dtypes if isinstance(want, pd.DataFrame) else [want.dtype]
+                rtol = 1e-5 if any(dtype == np.float32 for dtype in dtypes) else 1e-9
+                try:
+                    assert_equal(found[label], want, rtol=rtol)
+                except AssertionError as e:
+                    mismatches[name].append(f"{label}: {e}")
+    finally:
+        set_backend(previous)
+    return mismatches
+
+if __name__ == "__main__":
+    import eda_functions as eda
+
+    data = eda.load_data(sys.argv[1])
+    available = [name for name in BACKEND_NAMES[1:] if _ENGINES[name][1] is not None]
+    failed = False
+    for name, problems in check_parity(data, available).items():
+        print(f"{name}: {'OK' if not problems else f'{len(problems)} mismatches'}")
+        for problem in problems:
+            print("   ", problem)
+        failed |= bool(problems)
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,306 @@
+# benchmarks.py
+# Timing and memory benchmarks for the eda_functions entry points and the
+# computations behind the dashboard's Data Overview tab, run on synthetic
+# Instagram-lifestyle data. The generator is seeded, so every run at a given
+# size sees the same rows. It writes the CSV in chunks, so a 50M-row file
+# never has to be built in memory.
+# Results are written as JSON with stable keys and ordering, so comparing
+# two commits' files (or `python benchmarks.py compare old.json new.json`)
+# shows the regressions.
+#
+# Usage: python benchmarks.py run --sizes 10k 100k 1m -o bench.json
+#        python benchmarks.py imports -o imports.json
+#        python benchmarks.py compare old.json new.json
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+import backends
+import cube
+import duplicates
+import eda_functions as eda
+import profiling
+import sampling
+
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000, "10m": 10_000_000, "50m": 50_000_000}
+DEFAULT_SIZES = ("10k", "100k", "1m")
+DEFAULT_SEED = 0
+GENERATOR_CHUNK_ROWS = 1_000_000
+# A case is flagged by `compare` when it gets this much slower (or bigger)
+REGRESSION_THRESHOLD = 0.10
+
+# Levels and their shares, close to the real dataset's
+GENDERS = (["Female", "Male", "Non-binary"], [0.48, 0.48, 0.04])
+EDUCATION = (["High school", "Bachelor's", "Master's", "PhD"], [0.35, 0.40, 0.20, 0.05])
+EMPLOYMENT = (["Employed", "Student", "Unemployed", "Retired"], [0.60, 0.20, 0.10, 0.10])
+RELATIONSHIP = (["Single", "In a relationship", "Married"], [0.40, 0.25, 0.35])
+# Mean weekly work hours per employment status
+WORK_HOURS = {"Employed": 40.0, "Student": 15.0, "Unemployed": 5.0, "Retired": 2.0}
+WORK_HOURS_MISSING = 0.01
+
+
+# 1. DATA GENERATOR
+def generate_chunk(n, seed=DEFAULT_SEED, start=0):
+    """
+    n synthetic rows with the dataset's columns, user ids from `start`.
+    Each chunk is seeded by (seed, start), so chunks can be generated
+    independently and in any order.
+    """
+    rng = np.random.default_rng([seed, start])
+    age = rng.integers(18, 70, n)
+    employment = rng.choice(EMPLOYMENT[0], n, p=EMPLOYMENT[1])
+    # Younger users spend more time in the app; engagement follows activity
+    minutes = np.clip(rng.gamma(4.0, 50.0, n) * (1.3 - (age - 18) / 100), 1, 499).round(1)
+    mean_hours = pd.Series(employment).map(WORK_HOURS).to_numpy()
+    work_hours = np.clip(rng.normal(mean_hours, 6.0), 0, 80).round(1)
+    work_hours[rng.random(n) < WORK_HOURS_MISSING] = np.nan
+    return pd.DataFrame({
+        "user_id": np.arange(start, start + n),
+        "age": age,
+        "gender": rng.choice(GENDERS[0], n, p=GENDERS[1]),
+        "education_level": rng.choice(EDUCATION[0], n, p=EDUCATION[1]),
+        "employment_status": employment,
+        "relationship_status": rng.choice(RELATIONSHIP[0], n, p=RELATIONSHIP[1]),
+        "daily_active_minutes_instagram": minutes,
+        "reels_watched_per_day": rng.poisson(5 + minutes / 10),
+        "dms_sent_per_week": rng.poisson(20, n),
+        "weekly_work_hours": work_hours,
+        "user_engagement_score": np.clip(rng.normal(2 + minutes / 60, 1.5), 0, 10).round(2),
+        "likes_given_per_day": rng.poisson(10 + minutes / 8),
+        "ads_clicked_per_day": rng.poisson(1 + minutes / 150),
+    })
+
+def generate(n, seed=DEFAULT_SEED):
+    """Yields the rows of an n-row dataset in chunks of GENERATOR_CHUNK_ROWS."""
+    for start in range(0, n, GENERATOR_CHUNK_ROWS):
+        yield generate_chunk(min(GENERATOR_CHUNK_ROWS, n - start), seed, start)
+
+def write_csv(path, n, seed=DEFAULT_SEED):
+    """Writes an n-row dataset to path one chunk at a time."""
+    with open(path, "w", newline="") as f:
+        for i, chunk in enumerate(generate(n, seed)):
+            chunk.to_csv(f, index=False, header=i == 0)
+    return path
+
+
+# 2. MEASUREMENT
+def measure(func, repeat=3):
+    """
+    Runs func `repeat` times for wall time and once more under tracemalloc
+    for peak Python/NumPy memory (allocations inside Polars, Arrow or DuckDB
+    aren't traced). The first call is reported apart, since it pays for
+    whatever later calls find cached.
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    warm = times[1:] or times
+    return {
+        "first_s": round(times[0], 4),
+        "best_s": round(min(warm), 4),
+        "median_s": round(float(np.median(warm)), 4),
+        "peak_mb": round(peak / 1024 ** 2, 2),
+        "repeat": repeat,
+    }
+
+def _closing(plot, **params):
+    def run():
+        fig = plot(**params)
+        if fig is not None:
+            eda.plt.close(fig)
+    return run
+
+def cases(path):
+    """
+    (name, callable) for every benchmarked computation on the data at path.
+    The frame the other cases share is only loaded once the load cases have
+    run, so they don't run with a second copy of the data in memory.
+    """
+    yield "load_data", lambda: eda.load_data(path)
+    yield "load_data(chunksize)", lambda: eda.load_data(path, chunksize=eda.DEFAULT_CHUNKSIZE)
+    df = eda.load_data(path)
+    yield "get_basic_info", lambda: eda.get_basic_info(df)
+    # Data Overview tab
+    yield "overview/profile_dataset", lambda: profiling.profile_dataset(df, duplicates=False)
+    yield "overview/find_duplicates", lambda: duplicates.find_duplicates(df)
+    yield "overview/representative_sample", lambda: sampling.representative_sample(df, 10, outliers=False)
+    # Not cube.build_cube: a cube attached to df would answer the bar charts
+    # below, and their times would depend on the order the cases run in
+    yield "overview/build_cube", lambda: cube.AggregationCube().update(df)
+    for spec in eda.available_plots(df):
+        yield f"plot/{spec.func.__name__}", _closing(spec.func, df=df, **spec.params)
+
+def run_benchmarks(sizes=DEFAULT_SIZES, seed=DEFAULT_SEED, repeat=3, only=None, data_dir=None, log=print):
+    """
+    Benchmarks every case at every size; returns the JSON-ready results.
+    Each size's data is generated when its turn comes and removed after.
+    """
+    results = {}
+    with tempfile.TemporaryDirectory(dir=data_dir) as tmp:
+        for size in sizes:
+            path = write_csv(os.path.join(tmp, f"bench_{size}.csv"), SIZES[size], seed)
+            results[size] = {}
+            for name, func in cases(path):
+                if only and not any(name.startswith(prefix) for prefix in only):
+                    continue
+                results[size][name] = measure(func, repeat)
+                log(f"{size:>5} {name:<45} {results[size][name]['best_s']:8.3f}s "
+                    f"{results[size][name]['peak_mb']:9.1f} MB")
+                eda.plt.close("all")
+            os.remove(path)
+    return {"meta": _meta(seed, repeat), "results": results}
+
+def _meta(seed, repeat):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "seed": seed,
+        "repeat": repeat,
+        "backend": backends.get_backend(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }
+
+
+# 3. IMPORT TIME
+# Each case runs in a fresh interpreter, so every import is cold. "eager
+# plotting stack" imports matplotlib and seaborn up front, as
+# eda_functions used to; the difference to "import eda_functions" is what
+# lazy plotting imports save on every cold start.
+IMPORT_CASES = {
+    "import eda_functions": "import eda_functions",
+    "eager plotting stack": "import matplotlib.pyplot, seaborn; import eda_functions",
+    "load_data + profile": (
+        "import eda_functions, profiling; "
+        "profiling.profile_dataset(eda_functions.load_data(CSV), duplicates=False)"
+    ),
+    "load_data + first plot": (
+        "import eda_functions; "
+        "eda_functions.plot_activity_by_gender(eda_functions.load_data(CSV))"
+    ),
+}
+_IMPORT_PROBE = """
+import resource, sys, time
+start = time.perf_counter()
+{code}
+elapsed = time.perf_counter() - start
+plotting = any(name.split(".")[0] in ("matplotlib", "seaborn", "plotly") for name in sys.modules)
+print(elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, plotting)
+"""
+
+def import_benchmarks(repeat=5, log=print):
+    """Cold-start time, peak RSS and whether plotting modules got loaded, for each of IMPORT_CASES."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        csv = write_csv(os.path.join(tmp, "bench_10k.csv"), SIZES["10k"])
+        for name, code in IMPORT_CASES.items():
+            probe = _IMPORT_PROBE.format(code=code.replace("CSV", repr(csv)))
+            times, rss = [], []
+            for _ in range(repeat):
+                out = subprocess.run([sys.executable, "-c", probe], cwd=here, capture_output=True, text=True,
+                                     check=True, env=dict(os.environ, MPLBACKEND="Agg")).stdout.split()
+                times.append(float(out[0]))
+                rss.append(float(out[1]))
+            results[name] = {
+                "first_s": round(times[0], 4),
+                "best_s": round(min(times), 4),
+                "median_s": round(float(np.median(times)), 4),
+                "peak_mb": round(max(rss), 1),
+                "plotting_loaded": out[2] == "True",
+                "repeat": repeat,
+            }
+            log(f"{name:<45} {results[name]['best_s']:8.3f}s {results[name]['peak_mb']:9.1f} MB"
+                f"{'  (plotting loaded)' if results[name]['plotting_loaded'] else ''}")
+    return {"meta": _meta(None, repeat), "results": {"imports": results}}
+
+
+# 4. COMPARING RUNS
+def compare(old, new, threshold=REGRESSION_THRESHOLD):
+    """
+    Rows of (size, case, metric, old, new, change) for every case in both
+    runs whose best time or peak memory changed by more than `threshold`.
+    """
+    rows = []
+    for size, found in new["results"].items():
+        for name, result in found.items():
+            before = old["results"].get(size, {}).get(name)
+            if before is None:
+                continue
+            for metric in ("best_s", "peak_mb"):
+                if before[metric] > 0:
+                    change = result[metric] / before[metric] - 1
+                    if abs(change) > threshold:
+                        rows.append((size, name, metric, before[metric], result[metric], change))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark eda_functions on synthetic data.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run = commands.add_parser("run", help="run the benchmarks and write JSON results")
+    run.add_argument("--sizes", nargs="+", default=list(DEFAULT_SIZES), choices=list(SIZES))
+    run.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    run.add_argument("--repeat", type=int, default=3, help="timed runs per case")
+    run.add_argument("--only", nargs="+", help="only cases starting with these prefixes (e.g. plot/)")
+    run.add_argument("--data-dir", help="where to write the generated CSVs (default: system temp)")
+    run.add_argument("-o", "--output", default="benchmarks.json")
+    imports = commands.add_parser("imports", help="time cold imports and first use in fresh interpreters")
+    imports.add_argument("--repeat", type=int, default=5)
+    imports.add_argument("-o", "--output", default="import_benchmarks.json")
+    diff = commands.add_parser("compare", help="list cases that changed between two result files")
+    diff.add_argument("old")
+    diff.add_argument("new")
+    diff.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+
+    if args.command in ("run", "imports"):
+        if args.command == "run":
+            results = run_benchmarks(args.sizes, args.seed, args.repeat, args.only, args.data_dir)
+        else:
+            results = import_benchmarks(args.repeat)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"Results written to {args.output}")
+        return
+
+    with open(args.old) as f:
+        old = json.load(f)
+    with open(args.new) as f:
+        new = json.load(f)
+    rows = compare(old, new, args.threshold)
+    for size, name, metric, before, after, change in rows:
+        print(f"{size:>5} {name:<45} {metric:<8} {before:10.3f} -> {after:10.3f} ({change:+.0%})")
+    if not rows:
+        print(f"No changes over {args.threshold:.0%}")
+    # Exit status 1 when anything got slower or bigger, for use in CI
+    sys.exit(1 if any(row[-1] > 0 for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
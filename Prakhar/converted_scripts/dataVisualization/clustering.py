@@ -0,0 +1,120 @@
+# clustering.py
+# Hierarchical clustering of a correlation matrix, for the clustered
+# correlation heatmap. Uses the same defaults as sns.clustermap (average
+# linkage, euclidean distance between the matrix rows) but is computed with
+# the nearest-neighbour chain algorithm in O(k^2), without scipy, and the
+# result is cached so redrawing the same matrix doesn't cluster it again.
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+# Linkages kept in memory, least recently used dropped first
+LINKAGE_CACHE_SIZE = 16
+_linkage_cache = OrderedDict()
+
+
+def _pairwise_distances(rows):
+    sq = (rows * rows).sum(axis=1)
+    d2 = sq[:, None] + sq[None, :] - 2 * rows @ rows.T
+    return np.sqrt(np.maximum(d2, 0))
+
+def average_linkage(rows):
+    """
+    Average-linkage clustering of the rows of a 2-D array, euclidean metric.
+    Returns a scipy-style linkage matrix: one row per merge with the two
+    cluster ids, the merge distance and the new cluster's size, sorted by
+    distance (leaves are 0..k-1, merge i creates cluster k + i).
+    """
+    rows = np.nan_to_num(np.asarray(rows, dtype=np.float64))
+    k = len(rows)
+    if k < 2:
+        return np.zeros((0, 4))
+    dist = _pairwise_distances(rows)
+    np.fill_diagonal(dist, np.inf)
+    size = np.ones(k)
+    active = np.ones(k, dtype=bool)
+    merges = []
+    chain = []
+    # Nearest-neighbour chain: follow nearest neighbours until two clusters
+    # are each other's nearest, merge them, and continue from the chain
+    while len(merges) < k - 1:
+        if not chain:
+            chain.append(int(np.flatnonzero(active)[0]))
+        a = chain[-1]
+        b = int(np.argmin(dist[a]))
+        if len(chain) > 1 and dist[a, chain[-2]] <= dist[a, b]:
+            b = chain[-2]
+        if len(chain) > 1 and b == chain[-2]:
+            chain.pop()
+            chain.pop()
+            merges.append((a, b, dist[a, b], size[a] + size[b]))
+            # Lance-Williams update for average linkage; the merged cluster
+            # reuses slot b
+            new = (size[a] * dist[a] + size[b] * dist[b]) / (size[a] + size[b])
+            new[b] = np.inf
+            dist[b], dist[:, b] = new, new
+            dist[a], dist[:, a] = np.inf, np.inf
+            size[b] += size[a]
+            active[a] = False
+        else:
+            chain.append(b)
+
+    # Sort merges by distance and relabel slots with scipy's cluster ids
+    merges.sort(key=lambda m: m[2])
+    label = np.arange(k)
+    linkage = np.zeros((k - 1, 4))
+    for i, (a, b, d, n) in enumerate(merges):
+        left, right = sorted((label[a], label[b]))
+        linkage[i] = (left, right, d, n)
+        label[b] = k + i
+    return linkage
+
+def leaf_order(linkage, k):
+    """Left-to-right leaf order of the dendrogram (like scipy's leaves_list)."""
+    if k < 2:
+        return list(range(k))
+    order = []
+    stack = [2 * k - 2]
+    while stack:
+        node = stack.pop()
+        if node < k:
+            order.append(node)
+        else:
+            left, right = linkage[node - k, :2].astype(int)
+            stack.extend((right, left))
+    return order
+
+def dendrogram_segments(linkage, order):
+    """Line segments of the dendrogram for leaves at x = 0.5, 1.5, ... in `order`."""
+    k = len(order)
+    x = np.zeros(2 * k - 1)
+    height = np.zeros(2 * k - 1)
+    x[np.asarray(order)] = np.arange(k) + 0.5
+    segments = []
+    for i, (left, right, d, _) in enumerate(linkage):
+        left, right = int(left), int(right)
+        node = k + i
+        x[node] = (x[left] + x[right]) / 2
+        height[node] = d
+        segments.append([(x[left], height[left]), (x[left], d), (x[right], d), (x[right], height[right])])
+    return segments
+
+def cached_clustering(corr, key=None):
+    """
+    (linkage, leaf order) of a correlation DataFrame, cached by `key` (e.g.
+    the dataset fingerprint) or by a hash of the matrix itself.
+    """
+    values = corr.to_numpy(dtype=np.float64)
+    if key is None:
+        key = hashlib.blake2b(np.ascontiguousarray(values).tobytes(), digest_size=16).hexdigest()
+    key = (key, tuple(corr.columns))
+    if key in _linkage_cache:
+        _linkage_cache.move_to_end(key)
+        return _linkage_cache[key]
+    linkage = average_linkage(values)
+    result = linkage, leaf_order(linkage, len(values))
+    _linkage_cache[key] = result
+    while len(_linkage_cache) > LINKAGE_CACHE_SIZE:
+        _linkage_cache.popitem(last=False)
+    return result
@@ -0,0 +1,122 @@
+# correlation.py
+# Pearson correlations from mergeable co-moment accumulators.
+# A CorrelationAccumulator can be fed chunk by chunk, merged with accumulators
+# built elsewhere (other chunks, other processes) and updated when rows are
+# appended, without ever holding the whole dataset. Missing values are
+# handled pairwise, like DataFrame.corr().
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+class CorrelationAccumulator:
+    """
+    Running pairwise statistics for a fixed list of numeric columns.
+
+    For every pair (i, j) it keeps, over the rows where both are present:
+    the row count, the mean and the sum of squared deviations of column i,
+    and the co-moment of i and j. Two accumulators combine with Chan's
+    parallel update, so merging is exact up to floating point.
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.n = np.zeros((k, k))
+        self.mean = np.zeros((k, k))
+        self.m2 = np.zeros((k, k))
+        self.comoment = np.zeros((k, k))
+
+    @classmethod
+    def from_frame(cls, df, columns=None):
+        if columns is None:
+            columns = df.select_dtypes(include=[np.number]).columns
+        return cls(columns).update(df)
+
+    def _chunk_stats(self, df):
+        values = df[self.columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = ~np.isnan(values)
+        # Shift by the column means first: covariances don't change and the
+        # sums below stay well conditioned
+        with np.errstate(all="ignore"):
+            counts = valid.sum(axis=0)
+            shift = np.where(counts > 0, np.nansum(values, axis=0) / np.maximum(counts, 1), 0.0)
+        x = np.where(valid, values - shift, 0.0)
+        mask = valid.astype(np.float64)
+
+        n = mask.T @ mask                     # rows where both i and j are present
+        sums = x.T @ mask                     # sum of x_i over those rows
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.where(n > 0, sums / n, 0.0)
+        comoment = x.T @ x - mean * sums.T    # sum (x_i - mean_i)(x_j - mean_j)
+        m2 = (x * x).T @ mask - mean * sums   # sum (x_i - mean_i)^2
+        return n, mean + shift[:, None], m2, comoment
+
+    def _combine(self, n, mean, m2, comoment):
+        total = self.n + n
+        with np.errstate(invalid="ignore", divide="ignore"):
+            delta = np.where(total > 0, mean - self.mean, 0.0)
+            weight = np.where(total > 0, self.n * n / total, 0.0)
+            frac = np.where(total > 0, n / total, 0.0)
+        self.comoment = self.comoment + comoment + delta * delta.T * weight
+        self.m2 = self.m2 + m2 + delta * delta * weight
+        self.mean = self.mean + delta * frac
+        self.n = total
+        return self
+
+    def update(self, df):
+        """Adds the rows of a dataframe chunk (e.g. newly appended rows)."""
+        if len(df):
+            self._combine(*self._chunk_stats(df))
+        return self
+
+    def merge(self, other):
+        """Folds another accumulator over the same columns into this one."""
+        if other.columns != self.columns:
+            raise ValueError("Can only merge accumulators over the same columns")
+        return self._combine(other.n, other.mean, other.m2, other.comoment)
+
+    def corr(self, min_periods=1):
+        """Pearson correlation matrix, matching DataFrame.corr()."""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = self.comoment / np.sqrt(self.m2 * self.m2.T)
+        corr = np.clip(corr, -1.0, 1.0)
+        corr[self.n < max(min_periods, 2)] = np.nan
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+
+def _accumulate(args):
+    chunk, columns = args
+    return CorrelationAccumulator(columns).update(chunk)
+
+def correlation_from_chunks(chunks, columns=None, max_workers=None):
+    """
+    Builds one accumulator from an iterable of dataframe chunks (such as
+    eda_functions.load_data(..., as_iterator=True)).
+
+    With max_workers > 1 the chunks are reduced in worker processes and the
+    partial accumulators are merged; only a few chunks are in flight at once.
+    """
+    chunks = iter(chunks)
+    first = next(chunks, None)
+    if first is None:
+        return CorrelationAccumulator(columns or [])
+    if columns is None:
+        columns = first.select_dtypes(include=[np.number]).columns.tolist()
+    result = CorrelationAccumulator(columns).update(first)
+
+    if not max_workers or max_workers <= 1:
+        for chunk in chunks:
+            result.update(chunk)
+        return result
+
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        pending = []
+        for chunk in chunks:
+            pending.append(pool.submit(_accumulate, (chunk, columns)))
+            if len(pending) >= 2 * max_workers:
+                result.merge(pending.pop(0).result())
+        for future in pending:
+            result.merge(future.result())
+    return result
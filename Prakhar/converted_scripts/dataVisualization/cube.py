@@ -0,0 +1,305 @@
+# cube.py
+# Precomputed group-by aggregates for the bar and count charts.
+# For every dimension (categorical column, or a numeric one like age kept at
+# raw granularity) and every numeric measure, the cube holds count, sum, sum
+# of squares, min and max per level; a few dimension pairs are kept for hue
+# charts. It is filled chunk by chunk at load time and cubes merge, so a
+# chart reads a handful of numbers instead of grouping the raw rows again.
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from sketches import DEFAULT_K, KLLSketch, grouped_sketches
+
+DEFAULT_DIMENSIONS = ("gender", "education_level", "employment_status", "relationship_status",
+                      "activity_bin", "age")
+DEFAULT_PAIRS = (("gender", "activity_bin"),)
+# (dimension, measure) pairs that also get a quantile sketch per level, for
+# the box and violin plots
+DEFAULT_SKETCHES = (("gender", "ads_clicked_per_day"), ("education_level", "likes_given_per_day"))
+# Dimensions with more distinct values than this are dropped from the cube
+MAX_LEVELS = 500
+# Larger frames passed to update() are reduced this many rows at a time
+BLOCK_ROWS = 500_000
+
+
+def _runs(key):
+    """Stable sort order of key and the start of each run of equal keys in it."""
+    order = np.argsort(key, kind="stable")
+    ordered = key[order]
+    return order, np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1]])
+
+
+class _Grouping:
+    """Aggregates for one tuple of dimensions."""
+
+    def __init__(self, dims, n_measures):
+        self.dims = dims
+        self.levels = {}  # level tuple -> row in the arrays, in order of appearance
+        self.count = np.zeros((0, n_measures), dtype=np.int64)
+        self.sum = np.zeros((0, n_measures))
+        self.sumsq = np.zeros((0, n_measures))
+        self.min = np.zeros((0, n_measures))
+        self.max = np.zeros((0, n_measures))
+        self.rows = np.zeros(0, dtype=np.int64)  # rows per level, measures aside
+
+    def _grow(self, n):
+        extra = n - len(self.rows)
+        if extra > 0:
+            m = self.count.shape[1]
+            self.count = np.vstack([self.count, np.zeros((extra, m), dtype=np.int64)])
+            self.sum = np.vstack([self.sum, np.zeros((extra, m))])
+            self.sumsq = np.vstack([self.sumsq, np.zeros((extra, m))])
+            self.min = np.vstack([self.min, np.full((extra, m), np.inf)])
+            self.max = np.vstack([self.max, np.full((extra, m), -np.inf)])
+            self.rows = np.concatenate([self.rows, np.zeros(extra, dtype=np.int64)])
+
+    def _add(self, ids, count, total, sumsq, lo, hi, rows):
+        self._grow(len(self.levels))
+        self.count[ids] += count
+        self.sum[ids] += total
+        self.sumsq[ids] += sumsq
+        self.min[ids] = np.minimum(self.min[ids], lo)
+        self.max[ids] = np.maximum(self.max[ids], hi)
+        self.rows[ids] += rows
+
+    def update(self, codes, levels, cells):
+        """
+        Adds the cells of a chunk: codes[dim] is the level code of every cell
+        (-1 when missing), levels[dim] the level values, and cells the
+        (count, sum, sumsq, min, max, rows) of every cell.
+        """
+        # Combine the per-dimension codes into one code per cell; cells
+        # missing any dimension are skipped, like groupby does
+        n_cells = len(cells[-1])
+        combined = np.zeros(n_cells, dtype=np.int64)
+        missing = np.zeros(n_cells, dtype=bool)
+        for dim in self.dims:
+            combined = combined * max(len(levels[dim]), 1) + codes[dim]
+            missing |= codes[dim] < 0
+        if missing.all():
+            return
+        if missing.any():
+            combined = combined[~missing]
+            cells = [stat[..., ~missing] for stat in cells]
+        order, starts = _runs(combined)
+        labels = []
+        for code in combined[order[starts]]:
+            label = []
+            for dim in reversed(self.dims):
+                code, i = divmod(int(code), len(levels[dim]))
+                label.append(levels[dim][i])
+            labels.append(tuple(reversed(label)))
+        ids = np.array([self.levels.setdefault(label, len(self.levels)) for label in labels], dtype=np.int64)
+
+        count, total, sumsq, lo, hi, rows = [stat[..., order] for stat in cells]
+        self._add(
+            ids,
+            np.add.reduceat(count, starts, axis=-1).T,
+            np.add.reduceat(total, starts, axis=-1).T,
+            np.add.reduceat(sumsq, starts, axis=-1).T,
+            np.minimum.reduceat(lo, starts, axis=-1).T,
+            np.maximum.reduceat(hi, starts, axis=-1).T,
+            np.add.reduceat(rows, starts),
+        )
+
+    def merge(self, other):
+        ids = np.array([self.levels.setdefault(level, len(self.levels)) for level in other.levels],
+                       dtype=np.int64)
+        if len(ids):
+            self._add(ids, other.count, other.sum, other.sumsq, other.min, other.max, other.rows)
+
+
+class AggregationCube:
+    """
+    Count, sum, sum of squares, min and max of every measure, per level of
+    every dimension and of each dimension pair, plus KLL quantile sketches
+    (see sketches.py) per level for the `sketches` (dimension, measure)
+    pairs. Feed it with update(), one chunk at a time, or merge() cubes built
+    on other chunks.
+    """
+
+    def __init__(self, dimensions=DEFAULT_DIMENSIONS, pairs=DEFAULT_PAIRS, measures=None,
+                 sketches=DEFAULT_SKETCHES, k=DEFAULT_K):
+        self.dimensions = list(dimensions)
+        self.pairs = [tuple(pair) for pair in pairs]
+        self.measures = None if measures is None else list(measures)
+        self.sketched = [tuple(pair) for pair in sketches]
+        self.k = k
+        self.rows = 0
+        self._groupings = {}
+        self._categories = {}
+        self._sketches = {}
+
+    def update(self, chunk):
+        if self.measures is None:
+            self.measures = chunk.select_dtypes(include=[np.number]).columns.tolist()
+        if not self._groupings:
+            self.dimensions = [
+                dim for dim in self.dimensions
+                if dim in chunk.columns and chunk[dim].nunique() <= MAX_LEVELS
+            ]
+            self.pairs = [pair for pair in self.pairs if all(dim in self.dimensions for dim in pair)]
+            self.sketched = [(dim, measure) for dim, measure in self.sketched
+                             if dim in self.dimensions and measure in self.measures]
+            self._sketches = {pair: {} for pair in self.sketched}
+            for dims in [(dim,) for dim in self.dimensions] + self.pairs:
+                self._groupings[dims] = _Grouping(dims, len(self.measures))
+        for dim in self.dimensions:
+            if isinstance(chunk[dim].dtype, pd.CategoricalDtype):
+                known = self._categories.setdefault(dim, [])
+                known.extend(c for c in chunk[dim].cat.categories if c not in known)
+        for start in range(0, len(chunk), BLOCK_ROWS):
+            self._add_block(chunk.iloc[start:start + BLOCK_ROWS])
+        self.rows += len(chunk)
+        return self
+
+    def _add_block(self, chunk):
+        factorized = {dim: pd.factorize(chunk[dim]) for dim in self.dimensions}
+        # Base cells: one per combination of levels of every dimension in
+        # the chunk (missing counts as a level here). The raw rows are sorted
+        # and reduced into cells once; every grouping is a roll-up of cells.
+        key = np.zeros(len(chunk), dtype=np.int64)
+        span = 1
+        for dim in self.dimensions:
+            codes, levels = factorized[dim]
+            if span * (len(levels) + 1) >= 2 ** 62:
+                key, uniques = pd.factorize(key)
+                span = len(uniques)
+            key = key * (len(levels) + 1) + (codes + 1)
+            span *= len(levels) + 1
+        order, starts = _runs(key)
+        first = order[starts]
+
+        # Reductions run along contiguous rows of a (measures, rows) array
+        values = chunk[self.measures].to_numpy(dtype=np.float64, na_value=np.nan).T[:, order]
+        present = ~np.isnan(values)
+        filled = np.where(present, values, 0.0)
+        cells = (
+            np.add.reduceat(present, starts, axis=1, dtype=np.int64),
+            np.add.reduceat(filled, starts, axis=1),
+            np.add.reduceat(filled * filled, starts, axis=1),
+            # fmin/fmax skip NaN; a cell with no values at all stays NaN
+            np.nan_to_num(np.fmin.reduceat(values, starts, axis=1), nan=np.inf),
+            np.nan_to_num(np.fmax.reduceat(values, starts, axis=1), nan=-np.inf),
+            np.diff(np.r_[starts, len(key)]),
+        )
+        codes = {dim: factorized[dim][0][first] for dim in self.dimensions}
+        levels = {dim: factorized[dim][1] for dim in self.dimensions}
+        for grouping in self._groupings.values():
+            grouping.update(codes, levels, cells)
+
+        for (dim, measure), by_level in self._sketches.items():
+            codes, levels = factorized[dim]
+            sketches = [by_level.setdefault(level, KLLSketch(self.k)) for level in levels]
+            grouped_sketches(codes, chunk[measure].to_numpy(dtype=np.float64, na_value=np.nan),
+                             len(levels), sketches=sketches)
+
+    def merge(self, other):
+        for dims, grouping in other._groupings.items():
+            if dims in self._groupings:
+                self._groupings[dims].merge(grouping)
+        for dim, categories in other._categories.items():
+            known = self._categories.setdefault(dim, [])
+            known.extend(c for c in categories if c not in known)
+        for pair, by_level in other._sketches.items():
+            if pair in self._sketches:
+                for level, sketch in by_level.items():
+                    self._sketches[pair].setdefault(level, KLLSketch(self.k)).merge(sketch)
+        self.rows += other.rows
+        return self
+
+    def covers(self, dims, measure=None, sketch=False):
+        dims = tuple(dims)
+        if sketch:
+            return (*dims, measure) in self._sketches
+        return dims in self._groupings and (measure is None or measure in self.measures)
+
+    def _order(self, dim, levels):
+        # Same level order as eda_functions.group_stats: categories in
+        # category order (unobserved ones included), text in order of
+        # appearance, numbers sorted
+        if dim in self._categories:
+            return list(self._categories[dim])
+        if all(isinstance(level, (int, float, np.number)) for level in levels):
+            return sorted(levels)
+        return list(levels)
+
+    def _frame(self, dims, measure):
+        grouping = self._groupings[tuple(dims)]
+        j = self.measures.index(measure)
+        index = pd.MultiIndex.from_tuples(list(grouping.levels), names=list(dims)) if len(dims) > 1 \
+            else pd.Index([level[0] for level in grouping.levels], name=dims[0])
+        return pd.DataFrame({
+            "count": grouping.count[:, j], "sum": grouping.sum[:, j], "sumsq": grouping.sumsq[:, j],
+            "min": grouping.min[:, j], "max": grouping.max[:, j],
+        }, index=index)
+
+    @staticmethod
+    def _finish(raw):
+        count = raw["count"]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = raw["sum"] / count
+            var = (raw["sumsq"] - raw["sum"] * mean) / (count - 1)
+        raw["mean"] = mean.where(count > 0)
+        raw["std"] = np.sqrt(var.clip(lower=0)).where(count > 1)
+        raw["min"] = raw["min"].where(count > 0)
+        raw["max"] = raw["max"].where(count > 0)
+        return raw
+
+    def stats(self, dimension, measure):
+        """count, sum, sumsq, min, max, mean and std (ddof=1) of measure per level of dimension."""
+        raw = self._frame((dimension,), measure)
+        raw = raw.reindex(self._order(dimension, list(raw.index)))
+        raw["count"] = raw["count"].fillna(0).astype(np.int64)
+        raw.index.name = dimension
+        return self._finish(raw)
+
+    def rollup(self, dimension, measure, bins, labels=None, right=True):
+        """
+        stats() for a numeric dimension grouped into bins (like pd.cut with
+        the same bins, labels and right), computed from the raw levels.
+        """
+        raw = self._frame((dimension,), measure)
+        groups = pd.cut(raw.index.to_numpy(dtype=np.float64), bins=bins, labels=labels, right=right)
+        grouped = raw.groupby(groups, observed=False).agg(
+            {"count": "sum", "sum": "sum", "sumsq": "sum", "min": "min", "max": "max"})
+        grouped.index.name = dimension
+        return self._finish(grouped)
+
+    def sketches(self, dimension, measure):
+        """{level: KLLSketch of measure}, in the same level order as stats()."""
+        by_level = self._sketches[(dimension, measure)]
+        return {level: by_level[level] for level in self._order(dimension, list(by_level))
+                if level in by_level}
+
+    def crosstab(self, dimension, hue):
+        """Row counts per (dimension, hue) level pair, as a dimension x hue table."""
+        pair = (dimension, hue) if (dimension, hue) in self._groupings else (hue, dimension)
+        grouping = self._groupings[pair]
+        index = pd.MultiIndex.from_tuples(list(grouping.levels), names=list(pair))
+        table = pd.Series(grouping.rows, index=index).unstack(hue, fill_value=0)
+        if table.index.name != dimension:
+            table = table.T
+        rows = self._order(dimension, [level[0] for level in self._groupings[(dimension,)].levels])
+        cols = self._order(hue, [level[0] for level in self._groupings[(hue,)].levels])
+        return table.reindex(index=rows, columns=cols, fill_value=0).rename_axis(index=dimension, columns=hue)
+
+
+# Cubes attached to in-memory dataframes, by id(df); dropped with the frame
+_attached = {}
+
+def attach(df, cube):
+    if id(df) not in _attached:
+        weakref.finalize(df, _attached.pop, id(df), None)
+    _attached[id(df)] = cube
+    return cube
+
+def attached(df):
+    """The cube attached to df, or None."""
+    return _attached.get(id(df))
+
+def build_cube(df, **kwargs):
+    """Builds a cube over df in one pass and attaches it to df."""
+    return attach(df, AggregationCube(**kwargs).update(df))
@@ -0,0 +1,157 @@
+# data_cache.py
+# Content-addressed on-disk cache for parsed CSVs.
+# The first parse of a file is written as an uncompressed Feather (Arrow IPC)
+# file named after a hash of the CSV bytes; later loads memory-map that file
+# instead of parsing the CSV again.
+import hashlib
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # the cache is optional, loading still works without it
+    pa = None
+    feather = None
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "eda-dashboard", "data")
+DEFAULT_MAX_CACHE_BYTES = 4 * 1024 ** 3  # 4 GB
+HASH_BLOCK_SIZE = 8 * 1024 ** 2
+
+# (path, size, mtime) -> content hash, so an unchanged file on disk is only
+# hashed once per process
+_path_hashes = {}
+# (upload file_id, size) -> content hash. Streamlit keeps the same
+# UploadedFile across reruns, so widget clicks don't hash it again
+_upload_hashes = {}
+MAX_UPLOAD_HASHES = 64
+
+
+# 1. FINGERPRINTS
+def _hash_stream(stream):
+    digest = hashlib.blake2b(digest_size=16)
+    for block in iter(lambda: stream.read(HASH_BLOCK_SIZE), b""):
+        digest.update(block)
+    return digest.hexdigest()
+
+def fingerprint(source):
+    """
+    Content hash of a CSV given as a file path or a file-like object
+    (e.g. a Streamlit UploadedFile). File-like objects are rewound afterwards.
+    """
+    if isinstance(source, (str, os.PathLike)):
+        stat = os.stat(source)
+        key = (os.path.abspath(source), stat.st_size, stat.st_mtime_ns)
+        if key not in _path_hashes:
+            with open(source, "rb") as f:
+                _path_hashes[key] = _hash_stream(f)
+        return _path_hashes[key]
+
+    upload_key = (source.file_id, source.size) if hasattr(source, "file_id") else None
+    if upload_key in _upload_hashes:
+        source.seek(0)
+        return _upload_hashes[upload_key]
+
+    if hasattr(source, "getbuffer"):
+        # BytesIO / UploadedFile: hash the buffer without copying it
+        digest = hashlib.blake2b(source.getbuffer(), digest_size=16).hexdigest()
+    else:
+        source.seek(0)
+        digest = _hash_stream(source)
+    source.seek(0)
+    if upload_key is not None:
+        if len(_upload_hashes) >= MAX_UPLOAD_HASHES:
+            _upload_hashes.pop(next(iter(_upload_hashes)))
+        _upload_hashes[upload_key] = digest
+    return digest
+
+
+# 2. DISK LRU
+def touch(path):
+    """Marks a cache file as recently used (LRU order is file mtime)."""
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+
+def evict_lru(cache_dir, max_bytes, suffix):
+    """
+    Deletes the least recently used files ending in suffix (one suffix or a
+    tuple of them) until those files fit in max_bytes.
+    """
+    entries = []
+    for entry in os.scandir(cache_dir):
+        if entry.is_file() and entry.name.endswith(suffix):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+    return total
+
+def write_atomic(path, write):
+    """Runs write(tmp_path) and moves the result into place in one step."""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        write(tmp_path)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+# 3. CACHED LOADING
+def cache_path(key, variant, cache_dir=DEFAULT_CACHE_DIR):
+    return os.path.join(cache_dir, f"{key}-{variant}.feather")
+
+def cached_file(key, loader=pd.read_csv, cache_dir=DEFAULT_CACHE_DIR):
+    """The Feather file load_cached() wrote for this key and loader, or None if there isn't one."""
+    path = cache_path(key, getattr(loader, "__name__", "loader"), cache_dir)
+    return path if os.path.exists(path) else None
+
+def read_cached(path):
+    """Memory-maps a cached Feather file back into a DataFrame."""
+    table = feather.read_table(path, memory_map=True)
+    return table.to_pandas(split_blocks=True)
+
+def load_cached(source, loader=pd.read_csv, cache_dir=DEFAULT_CACHE_DIR,
+                max_bytes=DEFAULT_MAX_CACHE_BYTES):
+    """
+    Loads a CSV through the on-disk cache.
+
+    source is a file path or a file-like upload, loader is the function that
+    parses it on a cache miss (pd.read_csv, eda_functions.load_data, ...).
+    Returns (df, fingerprint); the fingerprint identifies the file contents and
+    can be used as a key for anything derived from the data.
+    """
+    key = fingerprint(source)
+    if feather is None:
+        return loader(source), key
+
+    variant = getattr(loader, "__name__", "loader")
+    path = cache_path(key, variant, cache_dir)
+    if os.path.exists(path):
+        try:
+            df = read_cached(path)
+            touch(path)
+            return df, key
+        except (OSError, pa.ArrowException):
+            # Corrupt or half-written entry: drop it and parse again
+            os.remove(path)
+
+    df = loader(source)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        write_atomic(path, lambda tmp: feather.write_feather(df, tmp, compression="uncompressed"))
+        evict_lru(cache_dir, max_bytes, ".feather")
+    except (OSError, pa.ArrowException, ValueError, TypeError):
+        # Frames Arrow can't represent (mixed object columns etc.) just skip the cache
+        pass
+    return df, key
@@ -0,0 +1,427 @@
+# dataset.py
+# Out-of-core execution mode. A Dataset is a handle on a CSV or Parquet file
+# that an embedded DuckDB engine scans in place: the aggregations behind the
+# plots and the profile (group stats, counts, histograms, 2-D bins,
+# correlations, missing counts) are pushed down as SQL and only their small
+# results come back into pandas, so files bigger than RAM can be explored.
+# Anything that needs rows (samples, quantile sketches) streams them in
+# batches. Needs the optional duckdb package.
+import os
+from importlib.util import find_spec
+
+import numpy as np
+import pandas as pd
+
+import derived
+import profiling
+from correlation import CorrelationAccumulator, correlation_from_chunks
+from lazy_imports import LazyModule
+from sketches import DEFAULT_K, DISTINCT_EXACT_THRESHOLD, KLLSketch, grouped_sketches
+
+# Optional dependency, imported when the first Dataset is opened
+duckdb = LazyModule("duckdb") if find_spec("duckdb") else None
+
+# Rows per batch when rows have to be streamed into Python
+DEFAULT_BATCH_ROWS = 1_000_000
+# Wider tables get their correlations from streamed chunks instead of one
+# SQL query with an aggregate per column pair
+SQL_CORRELATION_MAX_COLUMNS = 32
+
+_NUMERIC_TYPES = {
+    "TINYINT": "int8", "SMALLINT": "int16", "INTEGER": "int32", "BIGINT": "int64",
+    "UTINYINT": "uint8", "USMALLINT": "uint16", "UINTEGER": "uint32", "UBIGINT": "uint64",
+    "FLOAT": "float32", "DOUBLE": "float64",
+}
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+def _number(name):
+    # Measure and bin source columns as DOUBLE: read_csv_auto types a column
+    # with no values (or a header-only file) as VARCHAR, and text that isn't
+    # a number counts as missing, as it would after pd.to_numeric(errors="coerce")
+    return f"TRY_CAST({_quote(name)} AS DOUBLE)"
+
+def _bins_sql(bins, column_sql):
+    """CASE expression giving the bin number of column_sql (NULL outside), like derived.Bins.codes."""
+    lo_op, hi_op = (">", "<=") if bins.right else (">=", "<")
+    edges = [float(edge) for edge in bins.edges]
+    if len(edges) < 2:
+        # No bins (e.g. every age the same): every row is outside
+        return "NULL"
+    whens = " ".join(
+        f"WHEN {column_sql} {lo_op} {lo!r} AND {column_sql} {hi_op} {hi!r} THEN {i}"
+        for i, (lo, hi) in enumerate(zip(edges[:-1], edges[1:]))
+    )
+    return f"CASE {whens} END"
+
+def _grid_sql(column_sql, lo, hi, bins):
+    # Equal-width bin number as density.bin_points and pairs.pair_aggregates
+    # compute it (NULL stays NULL; least() would skip it)
+    index = f"floor(({column_sql} - {lo!r}) / {(hi - lo)!r} * {bins})::BIGINT"
+    return f"CASE WHEN {index} >= {bins} THEN {bins - 1} ELSE {index} END"
+
+def _histogram_sql(column_sql, lo, hi, bins):
+    # np.histogram's bin number: a first guess from the scaled value, moved
+    # by one where it disagrees with the linspace edges, last bin closed
+    step = (hi - lo) / bins
+    guess = f"floor(({column_sql} - {lo!r}) * {bins / (hi - lo)!r})::BIGINT"
+    guess = f"(CASE WHEN {guess} >= {bins} THEN {bins - 1} ELSE {guess} END)"
+    return (f"{guess} - ({column_sql} < {guess} * {step!r} + {lo!r})::INTEGER "
+            f"+ ({column_sql} >= ({guess} + 1) * {step!r} + {lo!r} AND {guess} < {bins - 1})::INTEGER")
+
+class Dataset:
+    """
+    Handle on a CSV or Parquet file queried in place through DuckDB.
+
+    Plot functions in eda_functions accept it wherever they take a
+    DataFrame. threads and memory_limit (e.g. "4GB") are passed to DuckDB,
+    which spills to disk past the memory limit.
+    """
+
+    def __init__(self, path, threads=None, memory_limit=None):
+        if duckdb is None:
+            raise ImportError("Out-of-core mode needs the duckdb package (pip install duckdb)")
+        self.path = os.fspath(path)
+        self._con = duckdb.connect()
+        if threads:
+            self._con.execute(f"SET threads = {int(threads)}")
+        if memory_limit:
+            self._con.execute(f"SET memory_limit = '{memory_limit}'")
+        literal = "'" + self.path.replace("'", "''") + "'"
+        is_parquet = self.path.lower().endswith((".parquet", ".pq"))
+        self.source = f"read_parquet({literal})" if is_parquet else f"read_csv_auto({literal})"
+        schema = self._con.execute(f"DESCRIBE SELECT * FROM {self.source}").fetchall()
+        self.columns = pd.Index([row[0] for row in schema])
+        self.sql_types = {row[0]: row[1] for row in schema}
+        self._rows = None
+
+    def __len__(self):
+        if self._rows is None:
+            self._rows = self._con.execute(f"SELECT count(*) FROM {self.source}").fetchone()[0]
+        return self._rows
+
+    def __repr__(self):
+        return f"Dataset({self.path!r})"
+
+    @property
+    def shape(self):
+        return len(self), len(self.columns)
+
+    @property
+    def numeric_columns(self):
+        return [
+            col for col in self.columns
+            if self.sql_types[col] in _NUMERIC_TYPES or self.sql_types[col].startswith("DECIMAL")
+        ]
+
+    def query(self, sql, params=None):
+        """Runs SQL (use {source} for the file) and returns the result as a DataFrame."""
+        return self._con.execute(sql.format(source=self.source), params or []).df()
+
+    def head(self, n=5):
+        return self.query(f"SELECT * FROM {{source}} LIMIT {int(n)}")
+
+    def iter_chunks(self, chunksize=DEFAULT_BATCH_ROWS, columns=None):
+        """Streams the rows as DataFrame chunks, with the derived columns added."""
+        select = ", ".join(_quote(col) for col in columns) if columns else "*"
+        reader = self._con.execute(f"SELECT {select} FROM {self.source}").fetch_record_batch(chunksize)
+        for batch in reader:
+            yield derived.add_columns(batch.to_pandas())
+
+    def to_frame(self):
+        """The whole file as a DataFrame (only for data that fits in memory)."""
+        return derived.add_columns(self.query("SELECT * FROM {source}"))
+
+    # Grouping
+    def level_sql(self, name, bins=None):
+        """SQL for a grouping column: the column itself, or bin numbers for a derived column."""
+        if bins is None and name not in self.columns and derived.is_derived(name):
+            bins = derived.DERIVED_COLUMNS[name][1](self)
+        if bins is not None:
+            return _bins_sql(bins, _number(bins.source)), bins
+        return _quote(name), None
+
+    def _ordered(self, frame, bins, fill=None):
+        # Bins come back as numbers and get their labels in bin order (every
+        # bin, like groupby(observed=False)); other levels are sorted
+        if bins is None:
+            return frame.sort_index()
+        frame = frame.reindex(range(len(bins.labels)), fill_value=fill)
+        frame.index = pd.CategoricalIndex(bins.labels, categories=list(bins.labels), ordered=True)
+        return frame
+
+    def column_range(self, column):
+        lo, hi = self._con.execute(f"SELECT min({_number(column)}), max({_number(column)}) FROM {self.source}").fetchone()
+        return lo, hi
+
+    def nunique(self, column):
+        return self._con.execute(f"SELECT count(DISTINCT {_quote(column)}) FROM {self.source}").fetchone()[0]
+
+    def group_stats(self, x, y, bins=None):
+        """count, mean and std of y per level of x (or per bin of `bins`), like eda_functions.group_stats."""
+        level, bins = self.level_sql(x, bins)
+        stats = self.query(
+            f"SELECT {level} AS level, count({_number(y)}) AS count, avg({_number(y)}) AS mean, "
+            f"stddev_samp({_number(y)}) AS std FROM {{source}} "
+            f"WHERE level IS NOT NULL GROUP BY level"
+        ).set_index("level")
+        stats = self._ordered(stats, bins)
+        stats["count"] = stats["count"].fillna(0).astype(np.int64)
+        stats.index.name = x
+        return stats
+
+    def group_counts(self, x, hue):
+        """Row counts per (x, hue) pair as an x by hue table."""
+        x_sql, x_bins = self.level_sql(x)
+        hue_sql, hue_bins = self.level_sql(hue)
+        counts = self.query(
+            f"SELECT {x_sql} AS x, {hue_sql} AS hue, count(*) AS n FROM {{source}} "
+            f"WHERE x IS NOT NULL AND hue IS NOT NULL GROUP BY x, hue"
+        ).pivot(index="x", columns="hue", values="n").fillna(0).astype(np.int64)
+        counts = self._ordered(counts, x_bins, fill=0)
+        counts = self._ordered(counts.T, hue_bins, fill=0).T
+        return counts.rename_axis(index=x, columns=hue)
+
+    def sketches(self, x, y, k=DEFAULT_K, batch_rows=DEFAULT_BATCH_ROWS):
+        """{level of x: KLLSketch of y}, streaming the two columns in batches."""
+        level, bins = self.level_sql(x)
+        reader = self._con.execute(
+            f"SELECT {level} AS level, {_number(y)} AS value FROM {self.source} WHERE level IS NOT NULL"
+        ).fetch_record_batch(batch_rows)
+        found = {}
+        for batch in reader:
+            chunk = batch.to_pandas()
+            codes, levels = pd.factorize(chunk["level"])
+            sketches = [found.setdefault(level, KLLSketch(k)) for level in levels]
+            grouped_sketches(codes, chunk["value"].to_numpy(dtype=np.float64, na_value=np.nan),
+                             len(levels), k=k, sketches=sketches)
+        order = sorted(found) if bins is None else [i for i in range(len(bins.labels)) if i in found]
+        names = list(order) if bins is None else [bins.labels[i] for i in order]
+        return {name: found[level] for name, level in zip(names, order)}
+
+    # Distributions
+    def histogram(self, column, bins=10, value_range=None):
+        """(counts, edges) like np.histogram(column, bins)."""
+        lo, hi = value_range or self.column_range(column)
+        if lo is None:
+            return np.zeros(bins, dtype=np.int64), np.linspace(0, 1, bins + 1)
+        lo, hi = float(lo), float(hi)
+        if lo == hi:
+            lo, hi = lo - 0.5, hi + 0.5
+        col = _number(column)
+        counts = self.query(
+            f"SELECT {_histogram_sql(col, lo, hi, bins)} AS bin, count(*) AS n FROM {{source}} "
+            f"WHERE {col} BETWEEN {lo!r} AND {hi!r} GROUP BY bin"
+        )
+        hist = np.zeros(bins, dtype=np.int64)
+        hist[counts["bin"].to_numpy(dtype=np.int64)] = counts["n"].to_numpy()
+        return hist, np.linspace(lo, hi, bins + 1)
+
+    def bin_points(self, x, y, grid, hue=None):
+        """Like density.bin_points(df[x], df[y], grid, categories=df[hue]), counted in SQL."""
+        nx, ny = grid
+        xs, ys = _number(x), _number(y)
+        where = f"{xs} IS NOT NULL AND {ys} IS NOT NULL" + (f" AND {_quote(hue)} IS NOT NULL" if hue else "")
+        x0, x1, y0, y1 = self._con.execute(
+            f"SELECT min({xs}), max({xs}), min({ys}), max({ys}) FROM {self.source} WHERE {where}"
+        ).fetchone()
+        if x0 is None:
+            return np.zeros((1, ny, nx)), (0, 1, 0, 1), [None]
+        (x0, x1), (y0, y1) = [
+            (float(lo) - 0.5, float(hi) + 0.5) if lo == hi else (float(lo), float(hi))
+            for lo, hi in ((x0, x1), (y0, y1))
+        ]
+        cells = self.query(
+            f"SELECT {_grid_sql(xs, x0, x1, nx)} AS ix, {_grid_sql(ys, y0, y1, ny)} AS iy, "
+            f"{_quote(hue) if hue else 'NULL'} AS category, count(*) AS n "
+            f"FROM {{source}} WHERE {where} GROUP BY ix, iy, category"
+        )
+        if hue:
+            codes, labels = pd.factorize(cells["category"], sort=True)
+        else:
+            codes, labels = np.zeros(len(cells), dtype=np.int64), [None]
+        counts = np.zeros((len(labels), ny, nx), dtype=np.int64)
+        counts[codes, cells["iy"].to_numpy(dtype=np.int64), cells["ix"].to_numpy(dtype=np.int64)] = cells["n"]
+        return counts, (x0, x1, y0, y1), list(labels)
+
+    def linear_fit(self, x, y):
+        """Least-squares (slope, intercept) of y on x, like density.linear_fit."""
+        slope, intercept = self._con.execute(
+            f"SELECT regr_slope({_number(y)}, {_number(x)}), regr_intercept({_number(y)}, {_number(x)}) "
+            f"FROM {self.source}"
+        ).fetchone()
+        return (np.nan, np.nan) if slope is None else (slope, intercept)
+
+    def correlation_accumulator(self, columns=None):
+        """A CorrelationAccumulator over the numeric columns, filled from pairwise SQL aggregates."""
+        columns = list(self.numeric_columns if columns is None else columns)
+        if not columns:
+            # Nothing to select (e.g. a header-only or all-text file)
+            return CorrelationAccumulator(columns)
+        if len(columns) > SQL_CORRELATION_MAX_COLUMNS:
+            return correlation_from_chunks(self.iter_chunks(columns=columns), columns=columns)
+        acc = CorrelationAccumulator(columns)
+        pairs = [(i, j) for i in range(len(columns)) for j in range(i, len(columns))]
+        aggregates = []
+        for i, j in pairs:
+            a, b = _quote(columns[i]), _quote(columns[j])
+            # regr_*(y, x) only use rows where both are present, which is
+            # how the accumulator (and DataFrame.corr) pairs them
+            aggregates += [f"regr_count({a}, {b})", f"regr_avgy({a}, {b})", f"regr_avgx({a}, {b})",
+                           f"regr_syy({a}, {b})", f"regr_sxx({a}, {b})", f"regr_sxy({a}, {b})"]
+        row = self._con.execute(f"SELECT {', '.join(aggregates)} FROM {self.source}").fetchone()
+        values = np.array([np.nan if v is None else float(v) for v in row]).reshape(len(pairs), 6)
+        values = np.nan_to_num(values)
+        for (i, j), (n, mean_i, mean_j, m2_i, m2_j, comoment) in zip(pairs, values):
+            acc.n[i, j] = acc.n[j, i] = n
+            acc.mean[i, j], acc.mean[j, i] = mean_i, mean_j
+            acc.m2[i, j], acc.m2[j, i] = m2_i, m2_j
+            acc.comoment[i, j] = acc.comoment[j, i] = comoment
+        return acc
+
+    def pair_aggregates(self, columns, hue=None, bins=None):
+        """pairs.pair_aggregates for the file: every 1-D and 2-D count from one GROUPING SETS query."""
+        import pairs
+        bins = bins or pairs.PAIR_BINS
+        columns = list(columns)
+        k = len(columns)
+        bounds = self._con.execute(
+            "SELECT " + ", ".join(f"min({_number(c)}), max({_number(c)})" for c in columns) + f" FROM {self.source}"
+        ).fetchone()
+        ranges = []
+        for lo, hi in zip(bounds[::2], bounds[1::2]):
+            if lo is None:
+                lo, hi = 0.0, 1.0
+            elif lo == hi:
+                lo, hi = lo - 0.5, hi + 0.5
+            ranges.append((float(lo), float(hi)))
+        binned = ", ".join(
+            f"{_grid_sql(_number(c), lo, hi, bins)} AS b{i}" for i, (c, (lo, hi)) in enumerate(zip(columns, ranges))
+        )
+        hue_sql = _quote(hue) if hue else "NULL"
+        sets = [f"(h, b{i})" for i in range(k)] + [f"(h, b{i}, b{j})" for i in range(k) for j in range(i)]
+        keys = ", ".join(f"b{i}" for i in range(k))
+        result = self.query(
+            f"SELECT h, {keys}, {', '.join(f'grouping(b{i}) AS g{i}' for i in range(k))}, count(*) AS n "
+            f"FROM (SELECT {hue_sql} AS h, {binned} FROM {{source}}) "
+            f"WHERE {'h IS NOT NULL' if hue else 'true'} "
+            f"GROUP BY GROUPING SETS ({', '.join(sets)})"
+        )
+        if hue:
+            hue_codes, hue_levels = pd.factorize(result["h"], sort=True)
+            hue_levels = list(hue_levels)
+        else:
+            hue_codes, hue_levels = np.zeros(len(result), dtype=np.int64), [None]
+        hist = np.zeros((k, len(hue_levels), bins), dtype=np.int64)
+        joint = {(i, j): np.zeros((len(hue_levels), bins, bins), dtype=np.int64) for i in range(k) for j in range(i)}
+        grouped = result[[f"g{i}" for i in range(k)]].to_numpy() == 0
+        codes = result[[f"b{i}" for i in range(k)]].to_numpy(dtype=np.float64, na_value=np.nan)
+        n = result["n"].to_numpy()
+        for r in range(len(result)):
+            present = np.flatnonzero(grouped[r])
+            # Rows with a missing value land in a NULL bin and are dropped
+            if np.isnan(codes[r, present]).any():
+                continue
+            if len(present) == 1:
+                i = present[0]
+                hist[i, hue_codes[r], int(codes[r, i])] += n[r]
+            else:
+                j, i = present
+                joint[i, j][hue_codes[r], int(codes[r, i]), int(codes[r, j])] += n[r]
+        edges = [np.linspace(lo, hi, bins + 1) for lo, hi in ranges]
+        return pairs.PairAggregates(columns, edges, hist, joint, hue_levels)
+
+    # Profile
+    def profile(self, bins=profiling.DEFAULT_HIST_BINS, exact_distinct=None,
+                distinct_threshold=DISTINCT_EXACT_THRESHOLD):
+        """
+        A profiling.DatasetProfile computed in SQL (duplicate rows aren't
+        counted). Above distinct_threshold rows, distinct counts and
+        quartiles are DuckDB's approximations.
+        """
+        n_rows = len(self)
+        exact = n_rows <= distinct_threshold if exact_distinct is None else exact_distinct
+        numeric = self.numeric_columns
+        aggregates = []
+        for col in self.columns:
+            c = _quote(col)
+            aggregates += [f"count({c})", f"count(DISTINCT {c})" if exact else f"approx_count_distinct({c})"]
+            if col in numeric:
+                quartiles = (f"quantile_cont({c}, [0.25, 0.5, 0.75])" if exact
+                             else f"approx_quantile({c}, [0.25, 0.5, 0.75])")
+                aggregates += [f"min({c})::DOUBLE", f"max({c})::DOUBLE", f"avg({c})",
+                               f"stddev_samp({c})", quartiles]
+        row = list(self._con.execute(f"SELECT {', '.join(aggregates)} FROM {self.source}").fetchone())
+
+        stats = {}
+        for col in self.columns:
+            count, distinct = row.pop(0), row.pop(0)
+            stats[col] = {"count": count, "distinct": distinct}
+            if col in numeric:
+                stats[col].update(zip(["min", "max", "mean", "std", "quartiles"], row[:5]))
+                del row[:5]
+
+        hists = self._grouped_histograms(numeric, stats, bins)
+        tops = self._top_values([
+            col for col in self.columns
+            if col not in numeric and stats[col]["distinct"] <= profiling.TOP_VALUES_MAX_DISTINCT
+        ])
+        columns = {}
+        for col in self.columns:
+            s = stats[col]
+            info = dict(name=col, dtype=np.dtype(_NUMERIC_TYPES.get(self.sql_types[col], "object")),
+                        count=int(s["count"]), null_count=int(n_rows - s["count"]), distinct=int(s["distinct"]),
+                        is_numeric=col in numeric, distinct_exact=bool(exact))
+            if col in numeric:
+                nan = lambda v: np.nan if v is None else float(v)
+                info.update(min=nan(s["min"]), max=nan(s["max"]), mean=nan(s["mean"]), std=nan(s["std"]),
+                            quartiles=tuple(nan(q) for q in (s["quartiles"] or [None] * 3)),
+                            hist_counts=hists[col][0], hist_edges=hists[col][1])
+            else:
+                info.update(top_values=tops.get(col))
+            columns[col] = profiling.ColumnProfile(**info)
+        return profiling.DatasetProfile(n_rows=n_rows, n_columns=len(self.columns), columns=columns)
+
+    def _grouped_histograms(self, numeric, stats, bins):
+        # Every numeric column's histogram from one scan
+        ranges = {}
+        for col in numeric:
+            lo, hi = stats[col]["min"], stats[col]["max"]
+            if lo is None:
+                lo, hi = 0.0, 1.0
+            elif hi == lo:
+                hi = lo + 1.0
+            ranges[col] = (lo, hi)
+        hists = {col: (np.zeros(bins, dtype=np.int64), np.linspace(lo, hi, bins + 1))
+                 for col, (lo, hi) in ranges.items()}
+        if not numeric:
+            return hists
+        binned = ", ".join(f"{_grid_sql(_quote(c), *ranges[c], bins)} AS b{i}" for i, c in enumerate(numeric))
+        sets = ", ".join(f"(b{i})" for i in range(len(numeric)))
+        result = self.query(
+            f"SELECT {', '.join(f'b{i}' for i in range(len(numeric)))}, "
+            f"{', '.join(f'grouping(b{i}) AS g{i}' for i in range(len(numeric)))}, count(*) AS n "
+            f"FROM (SELECT {binned} FROM {{source}}) GROUP BY GROUPING SETS ({sets})"
+        )
+        for i, col in enumerate(numeric):
+            rows = result[(result[f"g{i}"] == 0) & result[f"b{i}"].notna()]
+            hists[col][0][rows[f"b{i}"].to_numpy(dtype=np.int64)] = rows["n"].to_numpy()
+        return hists
+
+    def _top_values(self, columns):
+        if not columns:
+            return {}
+        sets = ", ".join(f"(v{i})" for i in range(len(columns)))
+        result = self.query(
+            f"SELECT {', '.join(f'{_quote(c)} AS v{i}' for i, c in enumerate(columns))}, "
+            f"{', '.join(f'grouping({_quote(c)}) AS g{i}' for i, c in enumerate(columns))}, count(*) AS n "
+            f"FROM {{source}} GROUP BY GROUPING SETS ({sets})"
+        )
+        tops = {}
+        for i, col in enumerate(columns):
+            rows = result[(result[f"g{i}"] == 0) & result[f"v{i}"].notna()]
+            top = rows.set_index(f"v{i}")["n"].sort_values(ascending=False, kind="stable").head(profiling.TOP_VALUES)
+            tops[col] = top.rename_axis(col).rename("count")
+        return tops
@@ -0,0 +1,97 @@
+# density.py
+# Rasterized density rendering for scatter-style plots with many points.
+# Points are binned into a fixed 2-D grid with vectorized NumPy (one
+# bincount), and the grid is shaded into an image, so drawing cost depends on
+# the grid size rather than on the number of rows.
+import numpy as np
+import pandas as pd
+
+DEFAULT_GRID = (400, 300)  # (x bins, y bins)
+
+
+def data_range(values):
+    """(min, max) ignoring NaNs, widened a little if the data is constant."""
+    lo, hi = np.nanmin(values), np.nanmax(values)
+    if lo == hi:
+        lo, hi = lo - 0.5, hi + 0.5
+    return float(lo), float(hi)
+
+def bin_points(x, y, grid=DEFAULT_GRID, x_range=None, y_range=None, categories=None):
+    """
+    Counts points per grid cell.
+
+    x, y: array-likes of equal length. categories: optional array-like of
+    labels; counts are then kept per category.
+    Returns (counts, extent, labels): counts has shape (n_categories, ny, nx)
+    (n_categories is 1 without categories), extent is (x0, x1, y0, y1) for
+    imshow and labels are the category labels in counts order.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    nx, ny = grid
+    valid = ~(np.isnan(x) | np.isnan(y))
+
+    if categories is not None:
+        codes, labels = pd.factorize(pd.Series(categories), sort=True)
+        valid &= codes >= 0
+        n_categories = len(labels)
+    else:
+        codes, labels, n_categories = None, [None], 1
+
+    if not valid.any():
+        return np.zeros((n_categories, ny, nx)), (0, 1, 0, 1), list(labels)
+
+    x0, x1 = x_range or data_range(x[valid])
+    y0, y1 = y_range or data_range(y[valid])
+    x, y = x[valid], y[valid]
+    ix = np.clip(((x - x0) / (x1 - x0) * nx).astype(np.int64), 0, nx - 1)
+    iy = np.clip(((y - y0) / (y1 - y0) * ny).astype(np.int64), 0, ny - 1)
+    cell = iy * nx + ix
+    if codes is not None:
+        cell += codes[valid].astype(np.int64) * (nx * ny)
+    counts = np.bincount(cell, minlength=n_categories * nx * ny).reshape(n_categories, ny, nx)
+    return counts, (x0, x1, y0, y1), list(labels)
+
+def shade_categories(counts, colors, min_alpha=0.25):
+    """
+    Blends per-category count grids into one RGBA image: each cell gets the
+    count-weighted mean of the category colours, and an opacity that grows
+    with the log of its total count. Empty cells are transparent.
+    """
+    colors = np.asarray(colors, dtype=np.float64)[:, :3]
+    total = counts.sum(axis=0)
+    occupied = total > 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        rgb = np.einsum("kyx,kc->yxc", counts, colors) / total[..., None]
+    log_total = np.log1p(total)
+    alpha = np.where(occupied, min_alpha + (1 - min_alpha) * log_total / max(log_total.max(), 1e-12), 0.0)
+    image = np.zeros(total.shape + (4,))
+    image[..., :3] = np.nan_to_num(rgb)
+    image[..., 3] = alpha
+    return image
+
+def occupied_cells(counts, extent):
+    """
+    (x, y, count) of the non-empty cells of a 2-D count grid, at the cell
+    centres. Lets binned data stand in for raw points (e.g. as hexbin
+    weights) at a cost that doesn't grow with the row count.
+    """
+    ny, nx = counts.shape
+    x0, x1, y0, y1 = extent
+    iy, ix = np.nonzero(counts)
+    x = x0 + (ix + 0.5) * (x1 - x0) / nx
+    y = y0 + (iy + 0.5) * (y1 - y0) / ny
+    return x, y, counts[iy, ix]
+
+def linear_fit(x, y):
+    """Least-squares (slope, intercept) of y on x over rows where both are present."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    valid = ~(np.isnan(x) | np.isnan(y))
+    x, y = x[valid], y[valid]
+    if len(x) < 2:
+        return np.nan, np.nan
+    dx = x - x.mean()
+    var = dx @ dx
+    slope = (dx @ (y - y.mean())) / var if var > 0 else 0.0
+    return slope, y.mean() - slope * x.mean()
@@ -0,0 +1,116 @@
+# derived.py
+# Binned columns (activity_bin, age_group, ...) declared once and computed on
+# demand. A binning is a set of edges over a source column; its values are
+# a compact integer code array from one vectorized searchsorted, memoized per
+# dataframe and parameter set, so every plot that groups by it shares the
+# same codes and nothing copies the base frame to add a column.
+import weakref
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+ACTIVITY_BINS = [0, 100, 200, 300, 400, 500]
+ACTIVITY_LABELS = ["0–100", "100–200", "200–300", "300–400", "400–500"]
+
+
+@dataclass(frozen=True)
+class Bins:
+    """Edges over a source column, with pd.cut's meaning of labels and right."""
+    source: str
+    edges: tuple
+    labels: tuple
+    right: bool = True
+
+    def codes(self, values):
+        """Bin number of every value, -1 outside the edges or missing (like pd.cut's NaN)."""
+        values = np.asarray(values, dtype=np.float64)
+        edges = np.asarray(self.edges, dtype=np.float64)
+        # right=True bins are (a, b], right=False bins are [a, b)
+        codes = np.searchsorted(edges, values, side="left" if self.right else "right") - 1
+        codes[(codes < 0) | (codes >= len(edges) - 1) | np.isnan(values)] = -1
+        dtype = np.int8 if len(edges) < 128 else np.int32
+        return codes.astype(dtype)
+
+    def series(self, df, name):
+        """The binned column as an ordered categorical Series on df's index (like pd.cut)."""
+        codes = self.codes(df[self.source].to_numpy(dtype=np.float64, na_value=np.nan))
+        return _as_series(codes, self.labels, df.index, name)
+
+
+def _as_series(codes, labels, index, name):
+    categorical = pd.Categorical.from_codes(codes, categories=list(labels), ordered=True, validate=False)
+    return pd.Series(categorical, index=index, name=name)
+
+
+def activity_bins(df):
+    return Bins("daily_active_minutes_instagram", tuple(ACTIVITY_BINS), tuple(ACTIVITY_LABELS))
+
+def age_bins(df, bin_size=5, age_range=None):
+    """
+    [18-23), [23-28), ... groups starting at the youngest age. age_range
+    (min, max) skips scanning df['age'] when it's already known.
+    """
+    lo, hi = age_range if age_range is not None else (df["age"].min(), df["age"].max())
+    if pd.isna(lo):
+        # No ages at all: no groups
+        return Bins("age", (), (), right=False)
+    edges = list(range(int(lo), int(hi) + bin_size, bin_size))
+    labels = [f"{edges[i]}-{edges[i+1]}" for i in range(len(edges)-1)]
+    return Bins("age", tuple(edges), tuple(labels), right=False)
+
+# name -> (source column, function (df, **params) -> Bins)
+DERIVED_COLUMNS = {
+    "activity_bin": ("daily_active_minutes_instagram", activity_bins),
+    "age_group": ("age", age_bins),
+}
+
+
+def add_columns(df, names=("activity_bin",)):
+    """Adds the derived columns in place (those whose source df has) and returns df."""
+    for name in names:
+        source, make_bins = DERIVED_COLUMNS[name]
+        if source in df.columns:
+            df[name] = make_bins(df).series(df, name)
+    return df
+
+def is_derived(name):
+    return name in DERIVED_COLUMNS
+
+def can_derive(df, name):
+    """True if df has `name` or the source column it is derived from."""
+    if name in df.columns:
+        return True
+    return is_derived(name) and DERIVED_COLUMNS[name][0] in df.columns
+
+# Memoized (codes, labels) per dataframe (by id) and (name, params); dropped
+# with the frame. Frames are treated as read-only once loaded.
+_memo = {}
+
+def codes(df, name, **params):
+    """(integer codes, labels) of the derived column `name` over df's rows."""
+    key = (name, tuple(sorted(params.items())))
+    entry = _memo.get(id(df))
+    if entry is None:
+        entry = _memo[id(df)] = {}
+        weakref.finalize(df, _memo.pop, id(df), None)
+    if key not in entry:
+        if name in df.columns and not params and isinstance(df[name].dtype, pd.CategoricalDtype):
+            # Already materialized: reuse the categorical's own codes
+            existing = df[name]
+            entry[key] = existing.cat.codes.to_numpy(), tuple(existing.cat.categories)
+        else:
+            bins = DERIVED_COLUMNS[name][1](df, **params)
+            entry[key] = bins.codes(df[bins.source].to_numpy(dtype=np.float64, na_value=np.nan)), bins.labels
+    return entry[key]
+
+def column(df, name, **params):
+    """
+    The derived column as an ordered categorical Series on df's index, built
+    from the memoized codes (no copy of the frame). An existing df[name]
+    is returned as is when no parameters are given.
+    """
+    if name in df.columns and not params:
+        return df[name]
+    values, labels = codes(df, name, **params)
+    return _as_series(values, labels, df.index, name)
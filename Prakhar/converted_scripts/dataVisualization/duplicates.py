@@ -0,0 +1,127 @@
+# duplicates.py
+# Duplicate-row detection that doesn't need a hash table of every full row.
+# Rows are reduced to 64-bit fingerprints in chunks; only rows whose
+# fingerprint appears more than once are compared for real, so the result is
+# the same as df.duplicated().sum(). When the fingerprints don't fit the
+# memory budget they are partitioned into files on disk and processed one
+# partition at a time.
+import os
+import tempfile
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_CHUNKSIZE = 1_000_000
+DEFAULT_MEMORY_BUDGET_MB = 256
+
+# Each row costs a 64-bit fingerprint plus a 64-bit row position
+_RECORD = np.dtype([("hash", np.uint64), ("row", np.int64)])
+
+
+@dataclass
+class DuplicateReport:
+    duplicate_rows: int
+    # Up to `sample_groups` groups of identical rows, as lists of index labels
+    groups: list = field(default_factory=list)
+    partitions: int = 1
+
+    def to_dict(self):
+        return {
+            "duplicate_rows": self.duplicate_rows,
+            "groups": [[str(label) for label in group] for group in self.groups],
+            "partitions": self.partitions,
+        }
+
+
+def row_fingerprints(df, chunksize=DEFAULT_CHUNKSIZE):
+    """Yields (first row position, uint64 fingerprints) for each chunk of rows."""
+    for start in range(0, len(df), chunksize):
+        chunk = df.iloc[start:start + chunksize]
+        yield start, pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+
+def _candidate_rows(records):
+    """Row positions whose fingerprint occurs more than once in `records`."""
+    repeated = pd.Series(records["hash"]).duplicated(keep=False).to_numpy()
+    candidates = records[repeated]
+    candidates.sort(order="row")
+    return candidates
+
+def _verify(df, candidates, groups, sample_groups):
+    """
+    Compares the actual candidate rows. Rows that are equal always share a
+    fingerprint, so duplicated() over the candidates alone is exact.
+    """
+    if not len(candidates):
+        return 0
+    rows = df.iloc[candidates["row"]]
+    duplicated = int(rows.duplicated().sum())
+    if duplicated and len(groups) < sample_groups:
+        mask = rows.duplicated(keep=False).to_numpy()
+        labels = pd.Series(rows.index[mask]).groupby(candidates["hash"][mask], sort=False)
+        for _, group in labels:
+            if len(groups) >= sample_groups:
+                break
+            groups.append(group.tolist())
+    return duplicated
+
+def find_duplicates(df, chunksize=DEFAULT_CHUNKSIZE, memory_budget_mb=DEFAULT_MEMORY_BUDGET_MB,
+                    spill_dir=None, sample_groups=5, progress=None):
+    """
+    Counts duplicate rows exactly (same as df.duplicated().sum()) and collects
+    a few sample groups of identical rows.
+
+    progress, if given, is called as progress(fraction, message) while the
+    detector runs (e.g. a Streamlit progress bar's .progress method).
+    """
+    def report(fraction, message):
+        if progress is not None:
+            progress(min(1.0, fraction), message)
+
+    n_rows = len(df)
+    budget = memory_budget_mb * 1024 ** 2
+    # Number of partitions as a power of two, so the top bits of the
+    # fingerprint pick the partition
+    bits = 0
+    while n_rows * _RECORD.itemsize > budget * (1 << bits):
+        bits += 1
+    n_parts = 1 << bits
+
+    groups = []
+    if n_parts == 1:
+        records = np.empty(n_rows, dtype=_RECORD)
+        for start, hashes in row_fingerprints(df, chunksize):
+            records["hash"][start:start + len(hashes)] = hashes
+            report(0.5 * (start + len(hashes)) / max(1, n_rows), "Fingerprinting rows")
+        records["row"] = np.arange(n_rows)
+        report(0.5, "Comparing candidate rows")
+        duplicated = _verify(df, _candidate_rows(records), groups, sample_groups)
+        report(1.0, "Done")
+        return DuplicateReport(duplicated, groups, n_parts)
+
+    with tempfile.TemporaryDirectory(dir=spill_dir, prefix="eda-duplicates-") as tmp_dir:
+        paths = [os.path.join(tmp_dir, f"part-{i:04d}.bin") for i in range(n_parts)]
+        files = [open(path, "ab") for path in paths]
+        try:
+            for start, hashes in row_fingerprints(df, chunksize):
+                chunk = np.empty(len(hashes), dtype=_RECORD)
+                chunk["hash"] = hashes
+                chunk["row"] = np.arange(start, start + len(hashes))
+                part = (hashes >> np.uint64(64 - bits)).astype(np.intp)
+                order = np.argsort(part, kind="stable")
+                bounds = np.searchsorted(part[order], np.arange(n_parts + 1))
+                for i in range(n_parts):
+                    if bounds[i] < bounds[i + 1]:
+                        chunk[order[bounds[i]:bounds[i + 1]]].tofile(files[i])
+                report(0.5 * (start + len(hashes)) / n_rows, "Fingerprinting rows (spilling to disk)")
+        finally:
+            for f in files:
+                f.close()
+
+        duplicated = 0
+        for i, path in enumerate(paths):
+            records = np.fromfile(path, dtype=_RECORD)
+            os.remove(path)
+            duplicated += _verify(df, _candidate_rows(records), groups, sample_groups)
+            report(0.5 + 0.5 * (i + 1) / n_parts, f"Comparing partition {i + 1}/{n_parts}")
+    return DuplicateReport(duplicated, groups, n_parts)
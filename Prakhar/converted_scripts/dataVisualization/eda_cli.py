@@ -0,0 +1,250 @@
+# eda_cli.py
+# Headless batch EDA over many CSV files, for nightly jobs and CI. Each file
+# is loaded, profiled and has every applicable registered plot rendered, in
+# a pool of worker processes (one file per worker at a time). Results go to
+# one directory per file:
+#
+#   <output>/<name>/profile.json
+#   <output>/<name>/charts/<plot function>.png
+#
+# <output>/manifest.json records the content fingerprint (data_cache) each
+# file was processed at, with the chart format and the registered plots, so
+# a rerun skips files whose data and requested outputs haven't changed. Files
+# are hashed in the workers too, so checking a large unchanged batch is
+# spread over the pool as well.
+#
+# Usage: python eda_cli.py exports/ -o eda_out
+#        python eda_cli.py "exports/2024-*.csv" -o eda_out --workers 8 --format svg
+import argparse
+import glob
+import json
+import multiprocessing
+import os
+import sys
+import time
+import warnings
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+import data_cache
+import eda_functions as eda
+import profiling
+import rendering
+from figure_cache import render_figure
+
+MANIFEST = "manifest.json"
+
+
+# 1. INPUTS
+def find_csvs(patterns):
+    """CSV paths from directories (their *.csv files), glob patterns and plain paths, sorted and without repeats."""
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths.update(glob.glob(os.path.join(pattern, "*.csv")))
+        elif glob.has_magic(pattern):
+            paths.update(glob.glob(pattern, recursive=True))
+        elif os.path.isfile(pattern):
+            paths.add(pattern)
+    return sorted(os.path.abspath(path) for path in paths if os.path.isfile(path))
+
+def load_manifest(out_dir):
+    try:
+        with open(os.path.join(out_dir, MANIFEST), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_manifest(out_dir, manifest):
+    def write(tmp_path):
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+    data_cache.write_atomic(os.path.join(out_dir, MANIFEST), write)
+
+def output_names(paths, manifest):
+    """
+    Output directory name per path: the one it already has in the manifest,
+    else the file name without .csv, with a number added when two inputs
+    share a name.
+    """
+    names = {path: manifest[path]["output"] for path in paths if path in manifest}
+    taken = set(names.values()) | {entry["output"] for entry in manifest.values()}
+    for path in paths:
+        if path in names:
+            continue
+        stem = os.path.splitext(os.path.basename(path))[0]
+        name, n = stem, 1
+        while name in taken:
+            n += 1
+            name = f"{stem}-{n}"
+        names[path] = name
+        taken.add(name)
+    return names
+
+
+# 2. PER-FILE WORK (runs in the worker processes)
+def _init_worker():
+    # The chart titles' emoji aren't in matplotlib's default font; one
+    # warning per chart per file would bury the progress lines
+    warnings.filterwarnings("ignore", message="Glyph .* missing from font")
+    import matplotlib
+    matplotlib.use("Agg", force=True)
+
+def _json_default(value):
+    # numpy scalars and arrays left in the profile
+    if isinstance(value, (np.generic, np.ndarray)):
+        return value.tolist()
+    return str(value)
+
+def plot_set():
+    """Names of the registered plots; a change means every file's charts are out of date."""
+    return sorted(eda.PLOT_REGISTRY)
+
+def is_current(entry, fingerprint, fmt):
+    """True if a manifest entry was made from these file contents, in this format, with the current plots."""
+    return (entry is not None and entry.get("fingerprint") == fingerprint
+            and entry.get("format") == fmt and entry.get("plots") == plot_set())
+
+def process_file(path, out_dir, known=None, fmt="png", force=False):
+    """
+    Profiles one CSV and renders its charts into out_dir, unless its
+    manifest entry `known` is still current (see is_current) and the outputs
+    are there. Returns a summary dict; "status" is "done", "skipped" or "failed".
+    """
+    start = time.perf_counter()
+    result = {"path": path, "bytes": os.path.getsize(path), "charts": 0, "errors": {}}
+    try:
+        result["fingerprint"] = data_cache.fingerprint(path)
+        profile_path = os.path.join(out_dir, "profile.json")
+        if not force and is_current(known, result["fingerprint"], fmt) and os.path.exists(profile_path):
+            result.update(status="skipped", seconds=time.perf_counter() - start)
+            return result
+
+        df = eda.load_data(path)
+        result["rows"] = len(df)
+        charts_dir = os.path.join(out_dir, "charts")
+        os.makedirs(charts_dir, exist_ok=True)
+
+        for spec in eda.available_plots(df):
+            try:
+                fig = spec.func(df, **spec.params)
+                if fig is None:
+                    continue
+                data = render_figure(fig, fmt)
+            except Exception as e:
+                # One broken chart shouldn't cost the rest of the file
+                result["errors"][spec.name] = f"{type(e).__name__}: {e}"
+                eda.plt.close("all")
+                continue
+            with open(os.path.join(charts_dir, f"{spec.func.__name__}.{fmt}"), "wb") as f:
+                f.write(data)
+            result["charts"] += 1
+
+        # profile.json goes last: it marks the file as complete for reruns
+        profile = profiling.profile_dataset(df).to_dict()
+        def write(tmp_path):
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(profile, f, indent=2, default=_json_default)
+        data_cache.write_atomic(profile_path, write)
+        result["status"] = "done"
+    except Exception as e:
+        result.update(status="failed", error=f"{type(e).__name__}: {e}")
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+# 3. BATCH
+def run_batch(paths, out_dir, max_workers=None, fmt="png", force=False, start_method=None, report=print):
+    """
+    Processes every path across a process pool and keeps the manifest up to
+    date as files finish, so an interrupted batch resumes where it stopped.
+    Returns the per-file results and the batch's wall time in seconds.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = load_manifest(out_dir)
+    names = output_names(paths, manifest)
+    start = time.perf_counter()
+    results = []
+    pool = ProcessPoolExecutor(
+        max_workers=max_workers or os.cpu_count(),
+        mp_context=multiprocessing.get_context(start_method or rendering.default_start_method()),
+        initializer=_init_worker,
+    )
+    try:
+        futures = [
+            pool.submit(process_file, path, os.path.join(out_dir, names[path]),
+                        manifest.get(path), fmt, force)
+            for path in paths
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            path = result["path"]
+            if result["status"] == "done":
+                manifest[path] = {
+                    "output": names[path],
+                    "fingerprint": result["fingerprint"],
+                    "format": fmt,
+                    "plots": plot_set(),
+                    "rows": result["rows"],
+                    "charts": result["charts"],
+                    "processed_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                }
+                save_manifest(out_dir, manifest)
+            report(_describe(result, names[path]))
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+    return results, time.perf_counter() - start
+
+def _describe(result, name):
+    if result["status"] == "failed":
+        return f"FAILED  {name}: {result['error']}"
+    if result["status"] == "skipped":
+        return f"skipped {name} (unchanged)"
+    line = f"done    {name}: {result['rows']:,} rows, {result['charts']} charts in {result['seconds']:.1f}s"
+    for chart, error in result["errors"].items():
+        line += f"\n        chart {chart!r} failed: {error}"
+    return line
+
+def summarize(results, seconds):
+    """Throughput of a batch: counts per status, and files/s and MB/s over the files actually processed."""
+    done = [r for r in results if r["status"] == "done"]
+    mb = sum(r["bytes"] for r in done) / 1024 ** 2
+    return {
+        "files": len(results),
+        "processed": len(done),
+        "skipped": sum(r["status"] == "skipped" for r in results),
+        "failed": sum(r["status"] == "failed" for r in results),
+        "seconds": seconds,
+        "mb": mb,
+        "files_per_s": len(done) / seconds if seconds else 0.0,
+        "mb_per_s": mb / seconds if seconds else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile and chart many CSV files in parallel.")
+    parser.add_argument("inputs", nargs="+", help="CSV files, directories or glob patterns")
+    parser.add_argument("-o", "--output", default="eda_out", help="output directory")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--format", default="png", choices=["png", "svg", "pdf"], help="chart format")
+    parser.add_argument("--force", action="store_true", help="reprocess files even if unchanged")
+    args = parser.parse_args(argv)
+
+    paths = find_csvs(args.inputs)
+    if not paths:
+        parser.error("no CSV files found")
+    print(f"{len(paths)} CSV files -> {args.output}")
+    results, seconds = run_batch(paths, args.output, max_workers=args.workers, fmt=args.format, force=args.force)
+
+    summary = summarize(results, seconds)
+    print(f"\n{summary['processed']} processed, {summary['skipped']} skipped, {summary['failed']} failed "
+          f"in {summary['seconds']:.1f}s")
+    print(f"Throughput: {summary['files_per_s']:.2f} files/s, {summary['mb_per_s']:.1f} MB/s "
+          f"({summary['mb']:.1f} MB processed)")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
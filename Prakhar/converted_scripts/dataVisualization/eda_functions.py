@@ -1,35 +1,217 @@
 # eda_functions.py
 import pandas as pd
 import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
+from dataclasses import dataclass, field
+from statistics import NormalDist
+from pandas.api.types import union_categoricals
 
-# Set a consistent style for all plots
-sns.set_style("whitegrid")
+import backends
+import clustering
+import cube
+import dataset
+import density
+import derived
+import kde
+import pairs
+import profiling
+import sampling
+import sketches
+from correlation import CorrelationAccumulator, correlation_from_chunks
+from lazy_imports import LazyModule
+
+# The plotting stack is imported on first draw, so loading and profiling
+# don't pay for it (see lazy_imports.py)
+def _set_style(seaborn):
+    # Set a consistent style for all plots
+    seaborn.set_style("whitegrid")
+
+def _load_seaborn(pyplot):
+    # Drawing with pyplot first still gets the seaborn style: touching sns
+    # imports seaborn, which sets it
+    sns.axes_style()
+
+sns = LazyModule("seaborn", on_load=_set_style)
+plt = LazyModule("matplotlib.pyplot", on_load=_load_seaborn)
+mcollections = LazyModule("matplotlib.collections")
+mcolors = LazyModule("matplotlib.colors")
 
 # 1. DATA LOADING FUNCTION
-def load_data(file_path):
+# Default number of rows per chunk when streaming a CSV
+DEFAULT_CHUNKSIZE = 100_000
+# Rows parsed first when a memory limit is set, to measure the bytes per row
+# before reading full-sized chunks
+PROBE_ROWS = 1_000
+
+def add_activity_bin(df):
+    """
+    Adds the 'activity_bin' column in place (if the source column exists).
+    The binning is declared in derived.py; plots also derive it on the fly
+    for frames loaded without it.
+    """
+    return derived.add_columns(df, ["activity_bin"])
+
+def downcast_dtypes(df, max_category_ratio=0.5):
+    """
+    Shrinks a dataframe in place: ints/floats go to the smallest dtype that
+    holds the values, and low-cardinality text columns become categoricals.
+    """
+    for col in df.columns:
+        series = df[col]
+        if pd.api.types.is_integer_dtype(series) and not isinstance(series.dtype, pd.CategoricalDtype):
+            df[col] = pd.to_numeric(series, downcast='integer')
+        elif pd.api.types.is_float_dtype(series):
+            df[col] = pd.to_numeric(series, downcast='float')
+        elif pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series):
+            if len(series) and series.nunique() / len(series) <= max_category_ratio:
+                df[col] = series.astype('category')
+    return df
+
+def _split_columns(chunk):
+    """The chunk as separate per-column Series, so no 2-D block keeps the whole chunk alive."""
+    return {col: chunk[col].copy() for col in chunk.columns}
+
+def _concat_chunks(pieces, columns):
+    """
+    Concatenates downcast chunks (split by _split_columns) one column at a
+    time, dropping each column's pieces once it's joined, so the peak is the
+    finished frame plus one column instead of two copies of the data.
+    Categorical columns are unioned so they stay categorical (plain pd.concat
+    falls back to object when categories differ).
+    """
+    merged = []
+    for col in columns:
+        parts = [piece.pop(col) for piece in pieces]
+        if all(isinstance(part.dtype, pd.CategoricalDtype) for part in parts):
+            merged.append(pd.Series(union_categoricals(parts), name=col))
+        else:
+            merged.append(pd.concat(parts, ignore_index=True))
+        del parts
+    # axis=1 concat keeps one block per column rather than consolidating (copying) them
+    return pd.concat(merged, axis=1, copy=False)
+
+def iter_chunks(file_path, chunksize=DEFAULT_CHUNKSIZE, max_memory_mb=None, downcast=True):
+    """
+    Streams the CSV in chunks, adding 'activity_bin' to each one.
+
+    With max_memory_mb set, a small probe chunk is read first and every later
+    read is sized from the bytes per row measured so far, so parsed chunks stay
+    under the limit. The limit covers the parsed frames, not pandas' own
+    parser buffers.
+    """
+    budget = None if max_memory_mb is None else max_memory_mb * 1024 ** 2
+    reader = pd.read_csv(file_path, chunksize=chunksize)
+    rows = chunksize if budget is None else min(chunksize, PROBE_ROWS)
+    with reader:
+        while True:
+            try:
+                chunk = reader.get_chunk(rows)
+            except StopIteration:
+                return
+            if budget is not None and len(chunk):
+                chunk_bytes = chunk.memory_usage(deep=True).sum()
+                if chunk_bytes > budget and len(chunk) == 1:
+                    raise MemoryError(
+                        f"A single row needs {chunk_bytes:,} bytes, over the "
+                        f"{max_memory_mb} MB limit"
+                    )
+                # Re-size the next read from the bytes/row we just measured
+                bytes_per_row = chunk_bytes / len(chunk)
+                rows = max(1, min(chunksize, int(budget / bytes_per_row)))
+            add_activity_bin(chunk)
+            if downcast:
+                downcast_dtypes(chunk)
+            yield chunk
+
+def _feed(chunks, consumers):
+    for chunk in chunks:
+        for consumer in consumers:
+            consumer.update(chunk)
+        yield chunk
+
+def _attach(df, sampler, aggregates):
+    if sampler is not None:
+        sampling.attach(df, sampler)
+    if aggregates is not None:
+        cube.attach(df, aggregates)
+
+def load_data(file_path, chunksize=None, max_memory_mb=None, as_iterator=False, sampler=None,
+              aggregates=None, out_of_core=False):
     """
     Loads the dataset from a given file path.
     Adjusts for the fact the original path was Windows-specific.
+
+    Passing chunksize (or max_memory_mb) switches to streaming mode: the CSV is
+    read in chunks, 'activity_bin' is built per chunk and dtypes are downcast.
+    - as_iterator=True returns the chunk iterator (see iter_chunks) instead of
+      one frame, for callers that can work chunk by chunk.
+    - max_memory_mb caps the data held: chunks are sized to fit under it,
+      the combined frame is built a column at a time (peaking at the frame
+      plus one column) and a MemoryError is raised if it would go over.
+    - sampler (a sampling.Sampler) is fed every chunk as it is read, so plot
+      samples are ready without another pass; it is attached to the result.
+    - aggregates (a cube.AggregationCube) is filled the same way, so the bar
+      and count charts draw from it instead of grouping the rows again.
+
+    out_of_core=True returns a dataset.Dataset instead: nothing is loaded,
+    the CSV or Parquet file is queried in place by DuckDB and the plots
+    below push their aggregations down to it.
     """
-    df = pd.read_csv(file_path)
-    
-    # Create the 'activity_bin' column if the original column exists
-    if 'daily_active_minutes_instagram' in df.columns:
-        df["activity_bin"] = pd.cut(
-            df["daily_active_minutes_instagram"],
-            bins=[0, 100, 200, 300, 400, 500],
-            labels=["0–100", "100–200", "200–300", "300–400", "400–500"]
-        )
+    if out_of_core:
+        return dataset.Dataset(file_path)
+    consumers = [c for c in (sampler, aggregates) if c is not None]
+    if chunksize is None and max_memory_mb is None and not as_iterator:
+        df = pd.read_csv(file_path)
+
+        # Create the 'activity_bin' column if the original column exists
+        add_activity_bin(df)
+
+        # Note: 'df_filtered' from the original script is undefined.
+        # We'll handle age filtering inside a specific function later.
+        for consumer in consumers:
+            consumer.update(df)
+        _attach(df, sampler, aggregates)
+        return df
 
-    # Note: 'df_filtered' from the original script is undefined.
-    # We'll handle age filtering inside a specific function later.
+    chunksize = chunksize or DEFAULT_CHUNKSIZE
+    if as_iterator:
+        chunks = iter_chunks(file_path, chunksize=chunksize, max_memory_mb=max_memory_mb)
+        return _feed(chunks, consumers) if consumers else chunks
+
+    # Keep half of the budget for the chunk being parsed, half for the result
+    chunk_budget = None if max_memory_mb is None else max_memory_mb / 2
+    pieces = []
+    columns = None
+    total_bytes = 0
+    chunks_read = iter_chunks(file_path, chunksize=chunksize, max_memory_mb=chunk_budget)
+    if consumers:
+        chunks_read = _feed(chunks_read, consumers)
+    for chunk in chunks_read:
+        total_bytes += chunk.memory_usage(deep=True).sum()
+        if max_memory_mb is not None and total_bytes > max_memory_mb * 1024 ** 2:
+            raise MemoryError(
+                f"Dataset is over the {max_memory_mb} MB limit after downcasting; "
+                "use load_data(..., as_iterator=True) to process it chunk by chunk"
+            )
+        columns = chunk.columns
+        pieces.append(_split_columns(chunk))
+        del chunk
+    if not pieces:
+        return add_activity_bin(pd.read_csv(file_path))
+    df = _concat_chunks(pieces, columns)
+    _attach(df, sampler, aggregates)
     return df
 
 # 2. BASIC DATA INFO FUNCTION
-def get_basic_info(df):
-    """Returns basic dataframe info as strings for display."""
+def get_basic_info(df, profile=None):
+    """
+    Returns basic dataframe info as strings for display.
+    Pass a profiling.DatasetProfile to reuse it instead of rescanning the data.
+    """
+    if profile is None:
+        if isinstance(df, dataset.Dataset):
+            profile = df.profile()
+        else:
+            profile = profiling.profile_dataset(df, duplicates=False)
     buffer = []
     buffer.append(f"Dataset Shape: {df.shape[0]} rows, {df.shape[1]} columns")
     buffer.append("\n--- First 5 Rows ---")
@@ -37,28 +219,202 @@ def get_basic_info(df):
     buffer.append("\n--- Column Names ---")
     buffer.append(", ".join(df.columns))
     buffer.append("\n--- Summary Statistics ---")
-    buffer.append(df.describe().to_string())
-    buffer.append(f"\n--- Missing Values ---\n{df.isna().sum().to_string()}")
+    buffer.append(profile.describe().to_string())
+    buffer.append(f"\n--- Missing Values ---\n{profile.missing.to_string()}")
     return "\n".join(buffer)
 
 # 3. VISUALIZATION FUNCTIONS (One per plot from the original script)
+
+# Every plot registers itself here with the columns it needs, its default
+# parameters and a rough render cost (1 = a simple bar chart). The dashboard
+# builds its plot menu from the registry and pre-renders the applicable plots
+# in the background (see rendering.py).
+@dataclass(frozen=True)
+class PlotSpec:
+    name: str
+    func: object
+    columns: tuple = ()
+    params: dict = field(default_factory=dict)
+    cost: float = 1.0
+    section: str = "visualizations"
+
+    def is_available(self, df):
+        return all(derived.can_derive(df, col) for col in self.columns)
+
+PLOT_REGISTRY = {}
+
+def register_plot(name, columns=(), cost=1.0, section="visualizations", **params):
+    """Decorator adding a plot function to PLOT_REGISTRY under `name`."""
+    def decorator(func):
+        PLOT_REGISTRY[name] = PlotSpec(name, func, tuple(columns), dict(params), cost, section)
+        return func
+    return decorator
+
+def available_plots(df, section=None):
+    """Registered plots whose required columns are all in df."""
+    return [
+        spec for spec in PLOT_REGISTRY.values()
+        if spec.is_available(df) and (section is None or spec.section == section)
+    ]
+
+# Bar charts aggregate first (count/mean/std per group, one groupby) and draw
+# closed-form confidence intervals, instead of handing raw rows to
+# sns.barplot, which bootstraps 1000 resamples per bar.
+def _keeps_order(series):
+    # Text columns keep order of appearance (like seaborn); categoricals and
+    # numbers are sorted
+    return not isinstance(series.dtype, pd.CategoricalDtype) and (
+        pd.api.types.is_object_dtype(series) or pd.api.types.is_string_dtype(series)
+    )
+
+def _column(df, name):
+    # Derived columns (derived.py) resolve even when df doesn't carry them
+    if name not in df.columns and derived.is_derived(name):
+        return derived.column(df, name)
+    return df[name]
+
+def category_order(series):
+    """Levels of a grouping column in the order seaborn puts them on the axis."""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return list(series.cat.categories)
+    levels = series.dropna().unique()
+    return list(levels) if _keeps_order(series) else sorted(levels)
+
+# When the frame has an aggregation cube attached (see cube.py, built at load
+# time), the stats are read from it instead of grouping the rows. A
+# dataset.Dataset (out-of-core mode) computes them in SQL; its text levels
+# come back sorted. Otherwise the rows are grouped by the selected backend
+# (backends.py).
+def group_stats(df, x, y):
+    """count, mean and std of y for each level of x, in seaborn's bar order."""
+    if isinstance(df, dataset.Dataset):
+        return df.group_stats(x, y)
+    aggregates = cube.attached(df)
+    if aggregates is not None and aggregates.covers([x], y):
+        return aggregates.stats(x, y)[['count', 'mean', 'std']]
+    engine = backends.engine()
+    if engine is not None:
+        return engine.group_stats(df, x, y)
+    key = _column(df, x)
+    return df[y].groupby(key, observed=False, sort=not _keeps_order(key)).agg(['count', 'mean', 'std'])
+
+def group_counts(df, x, hue):
+    """Row counts per (x, hue) pair as an x by hue table, in seaborn's order."""
+    if isinstance(df, dataset.Dataset):
+        return df.group_counts(x, hue)
+    aggregates = cube.attached(df)
+    if aggregates is not None and aggregates.covers([x, hue]):
+        return aggregates.crosstab(x, hue)
+    engine = backends.engine()
+    if engine is not None:
+        return engine.group_counts(df, x, hue)
+    keys = _column(df, x), _column(df, hue)
+    counts = df.groupby(list(keys), observed=False).size().unstack(hue, fill_value=0)
+    return counts.reindex(index=category_order(keys[0]), columns=category_order(keys[1]), fill_value=0)
+
+def draw_bars(ax, stats, ci=95, palette=None, edgecolor=None):
+    """
+    Draws one bar per row of a group_stats() frame, looking like sns.barplot.
+    ci is the confidence level of the error bars (normal approximation of the
+    mean's sampling distribution); ci=None draws no error bars.
+    """
+    positions = np.arange(len(stats))
+    if palette is None:
+        colors = sns.desaturate('C0', .75)
+    else:
+        colors = [sns.desaturate(c, .75) for c in sns.color_palette(palette, len(stats))]
+    bars = ax.bar(positions, stats['mean'], width=.8, color=colors, edgecolor=edgecolor)
+
+    if ci is not None:
+        z = NormalDist().inv_cdf(0.5 + ci / 200)
+        half_width = z * stats['std'] / np.sqrt(stats['count'])
+        ax.vlines(positions, stats['mean'] - half_width, stats['mean'] + half_width,
+                  color='.26', linewidth=1.5 * plt.rcParams['lines.linewidth'])
+
+    ax.set_xticks(positions)
+    ax.set_xticklabels([str(level) for level in stats.index])
+    ax.set_xlim(-.5, len(stats) - .5)
+    ax.xaxis.grid(False)
+    ax.set_xlabel(stats.index.name)
+    return bars
+
+def draw_count_bars(ax, counts):
+    """
+    Draws a group_counts() table like sns.countplot(x=..., hue=...): one
+    group of dodged bars per row, one colour per column, with a legend.
+    """
+    positions = np.arange(len(counts))
+    n_hue = max(len(counts.columns), 1)
+    width = .8 / n_hue
+    colors = sns.color_palette(n_colors=n_hue)
+    for i, level in enumerate(counts.columns):
+        offset = -.4 + width * (i + .5)
+        ax.bar(positions + offset, counts[level], width=width,
+               color=sns.desaturate(colors[i], .75), label=str(level))
+    ax.set_xticks(positions)
+    ax.set_xticklabels([str(level) for level in counts.index])
+    ax.set_xlim(-.5, len(counts) - .5)
+    ax.xaxis.grid(False)
+    ax.set_xlabel(counts.index.name)
+    ax.set_ylabel("count")
+    ax.legend(title=counts.columns.name)
+
+def annotate_bars(ax, fmt='{:.2f}'):
+    """Writes each bar's height above it."""
+    for p in ax.patches:
+        height = p.get_height()
+        if not np.isnan(height):
+            ax.annotate(
+                fmt.format(height),
+                (p.get_x()+p.get_width()/ 2., height),
+                ha='center',
+                va='bottom',
+                xytext=(0, 5),
+                textcoords='offset points',
+                fontsize=10,
+                fontweight='bold',
+                color='black'
+            )
+
+# Bins of the histogram the KDE is estimated from in out-of-core mode
+KDE_HISTOGRAM_BINS = 1024
+
+@register_plot("Daily Activity Distribution", columns=["daily_active_minutes_instagram"], cost=3)
 def plot_activity_distribution(df):
     """Histogram of daily active minutes."""
     if 'daily_active_minutes_instagram' not in df.columns:
         return None
     fig, ax = plt.subplots(figsize=(10, 6))
-    sns.histplot(df['daily_active_minutes_instagram'], bins=20, kde=True, ax=ax)
+    if isinstance(df, dataset.Dataset):
+        # Histograms come back from the engine: the bars are drawn from the
+        # counts and the KDE runs over a fine histogram's bin centres
+        counts, edges = df.histogram('daily_active_minutes_instagram', 20)
+        bars = pd.DataFrame({'daily_active_minutes_instagram': (edges[:-1] + edges[1:]) / 2, 'count': counts})
+        sns.histplot(bars, x='daily_active_minutes_instagram', weights='count', bins=list(edges), ax=ax)
+        weights, fine_edges = df.histogram('daily_active_minutes_instagram', KDE_HISTOGRAM_BINS)
+        values = (fine_edges[:-1] + fine_edges[1:]) / 2
+    else:
+        values, weights = df['daily_active_minutes_instagram'], None
+        sns.histplot(values, bins=20, ax=ax)
+    # KDE from the binned FFT engine instead of histplot(kde=True), with
+    # histplot's settings (cut=0, 200 points) and scaled to the bar counts
+    support, pdf = kde.kde_curves(values, gridsize=200, cut=0, weights=weights)[None]
+    if not np.isnan(pdf).all():
+        bin_width = ax.patches[0].get_width() if ax.patches else 0
+        total = values.count() if weights is None else weights.sum()
+        ax.plot(support, pdf * total * bin_width, color='C0')
     ax.set_title("Distribution of Daily Active Minutes on Instagram", fontsize=14)
     ax.set_xlabel("Daily Active Minutes", fontsize=12)
     ax.set_ylabel("User Count", fontsize=12)
     return fig
 
+@register_plot("Activity by Gender", columns=["gender", "activity_bin"], cost=2)
 def plot_activity_by_gender(df):
     """Count plot of activity bins by gender."""
-    if 'activity_bin' not in df.columns or 'gender' not in df.columns:
+    if not derived.can_derive(df, 'activity_bin') or 'gender' not in df.columns:
         return None
     fig, ax = plt.subplots(figsize=(10, 6))
-    sns.countplot(data=df, x="gender", hue="activity_bin", ax=ax)
+    draw_count_bars(ax, group_counts(df, "gender", "activity_bin"))
     ax.set_title("Instagram Activity by Gender")
     ax.set_xlabel("Gender")
     ax.set_ylabel("User Count")
@@ -66,33 +422,47 @@ def plot_activity_by_gender(df):
     return fig
 
 #this function was modified, undo this one to fix stuff incase everything breaks
-def plot_reels_by_activity(df):
-    """Bar plot: average reels watched per activity bin."""
+@register_plot("Reels Watched by Activity", columns=["activity_bin", "reels_watched_per_day"], ci=95)
+def plot_reels_by_activity(df, ci=95):
+    """Bar plot: average reels watched per activity bin (ci=None hides error bars)."""
     # ... (Implement similar to above for the 'reels_watched_per_day' plot)
     # Use the original plotting code but ensure it returns 'fig'
-    if 'activity_bin' not in df.columns or 'reels_watched_per_day' not in df.columns:
+    if not derived.can_derive(df, 'activity_bin') or 'reels_watched_per_day' not in df.columns:
         return None
     fig, ax = plt.subplots(figsize=(8,6))
-    sns.barplot(data=df, x='activity_bin',y="reels_watched_per_day", estimator='mean', ax=ax)
-    for p in ax.patches:
-        height = p.get_height()
-        if not np.isnan(height):
-            ax.annotate(
-                f'{height:.2f}',
-                (p.get_x()+p.get_width()/ 2., height),
-                ha='center',
-                va='bottom',
-                xytext=(0, 5),
-                textcoords='offset points',
-                fontsize=10,
-                fontweight='bold',
-                color='black'
-            )
+    draw_bars(ax, group_stats(df, 'activity_bin', 'reels_watched_per_day'), ci=ci)
+    annotate_bars(ax, '{:.2f}')
     ax.set_title("Average Reels Watched per Day by Activity")
     ax.set_ylabel("Averyage Reels Watcged per Day")
     ax.set_xlabel("Daily Active Minutes")
     return fig
 
+def age_group_stats(df, y, bin_size=5):
+    """
+    mean and count of y per age group ('age_group' column), with groups like
+    [18-23), [23-28), ... starting at the youngest age (see derived.age_bins).
+    """
+    if isinstance(df, dataset.Dataset):
+        bins = derived.age_bins(df, bin_size, age_range=df.column_range('age'))
+        stats = df.group_stats('age', y, bins=bins)
+        return stats[['mean', 'count']].rename_axis('age_group').reset_index()
+    aggregates = cube.attached(df)
+    if aggregates is not None and aggregates.covers(['age'], y):
+        # Raw ages from the cube are rolled up into the groups
+        ages = aggregates.stats('age', y).index
+        bins = derived.age_bins(df, bin_size, age_range=(ages.min(), ages.max()))
+        stats = aggregates.rollup('age', y, bins=list(bins.edges), labels=list(bins.labels), right=bins.right)
+        return stats[['mean', 'count']].rename_axis('age_group').reset_index()
+    # Otherwise from the memoized age group codes, without touching df
+    codes, labels = derived.codes(df, 'age_group', bin_size=bin_size)
+    values = df[y].to_numpy(dtype=np.float64, na_value=np.nan)
+    keep = (codes >= 0) & ~np.isnan(values)
+    count = np.bincount(codes[keep], minlength=len(labels))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.bincount(codes[keep], values[keep], minlength=len(labels)) / count
+    return pd.DataFrame({'age_group': list(labels), 'mean': mean, 'count': count})
+
+@register_plot("Instagram Activity by Age", columns=["age", "daily_active_minutes_instagram"], cost=1.5, bin_size=5)
 def plot_activity_by_age(df, bin_size=5):
     """
     Bar plot: Instagram Activity by Age Groups.
@@ -102,21 +472,8 @@ def plot_activity_by_age(df, bin_size=5):
     if 'daily_active_minutes_instagram' not in df.columns or 'age' not in df.columns:
         return None
     
-    # Create a working copy to avoid modifying original
-    plot_df = df.copy()
-    
-    # 1. Create age bins
-    min_age = plot_df['age'].min()
-    max_age = plot_df['age'].max()
-    
-    # Create bins like [18-23), [23-28), etc.
-    bins = list(range(int(min_age), int(max_age) + bin_size, bin_size))
-    labels = [f"{bins[i]}-{bins[i+1]}" for i in range(len(bins)-1)]
-    
-    plot_df['age_group'] = pd.cut(plot_df['age'], bins=bins, labels=labels, right=False)
-    
-    # 2. Calculate average for each group (for clean plotting)
-    age_stats = plot_df.groupby('age_group', observed=False)['daily_active_minutes_instagram'].agg(['mean', 'count']).reset_index()
+    # 1-2. Average for each age group (from the cube when there is one)
+    age_stats = age_group_stats(df, 'daily_active_minutes_instagram', bin_size)
     
     # 3. Create figure
     fig, ax = plt.subplots(figsize=(12, 7))  # Wider figure for more groups
@@ -173,27 +530,430 @@ def plot_activity_by_age(df, bin_size=5):
     plt.tight_layout()
     return fig
 
-def plot_dms_by_relationship_status(df):
-    """DMs sent per week by Relationship Status"""
-    if "weekly_work_hours" not in df.columns or "user_engagement_score" not in df.columns:
+@register_plot("DMs sent by Relationship Status", columns=["relationship_status", "dms_sent_per_week"], ci=95)
+def plot_dms_by_relationship_status(df, ci=95):
+    """DMs sent per week by Relationship Status (ci=None hides error bars)."""
+    if "relationship_status" not in df.columns or "dms_sent_per_week" not in df.columns:
         return None
     fig, ax = plt.subplots(figsize=(9,6))
-    ax = sns.barplot(x="relationship_status", y="dms_sent_per_week", data=df)
+    draw_bars(ax, group_stats(df, "relationship_status", "dms_sent_per_week"), ci=ci)
     ax.set_title("DMs Sent per Week by Relationship Status")
     ax.set_xlabel("Relationship Status")
     ax.set_ylabel("DMs Sent per Week")
     return fig
 
+@register_plot("Activity by Employment Status", columns=["employment_status", "daily_active_minutes_instagram"], ci=None)
+def plot_activity_by_employment(df, ci=None):
+    """Bar plot: average daily active minutes by employment status (no error bars by default, like eda.py)."""
+    if 'employment_status' not in df.columns or 'daily_active_minutes_instagram' not in df.columns:
+        return None
+    fig, ax = plt.subplots(figsize=(9,6))
+    draw_bars(ax, group_stats(df, 'employment_status', 'daily_active_minutes_instagram'),
+              ci=ci, palette="Spectral", edgecolor="black")
+    annotate_bars(ax, '{:.1f}')
+    ax.set_title("📱 Daily Instagram Activity by Employment Status", fontsize=15, fontweight='bold', color="#333")
+    ax.set_xlabel("Employment Status", fontsize=12, color="#555")
+    ax.set_ylabel("Average Daily Active Minutes", fontsize=12, color="#555")
+    ax.tick_params(axis='x', rotation=30, labelsize=11)
+    ax.grid(axis='y', linestyle='--', alpha=0.6)
+    fig.tight_layout()
+    return fig
+
+@register_plot("Activity by Education Level", columns=["education_level", "daily_active_minutes_instagram"], ci=95)
+def plot_activity_by_education(df, ci=95):
+    """Bar plot: average daily active minutes by education level."""
+    if 'education_level' not in df.columns or 'daily_active_minutes_instagram' not in df.columns:
+        return None
+    fig, ax = plt.subplots(figsize=(10, 6))
+    draw_bars(ax, group_stats(df, 'education_level', 'daily_active_minutes_instagram'),
+              ci=ci, palette='dark', edgecolor='black')
+    annotate_bars(ax, '{:.1f}')
+    ax.set_title("📚 Instagram Activity by Education Level", fontsize=15, fontweight='bold')
+    ax.set_xlabel("Education Level", fontsize=12)
+    ax.set_ylabel("Avg Daily Active Minutes", fontsize=12)
+    ax.tick_params(axis='x', rotation=30, labelsize=11)
+    ax.grid(axis='y', linestyle='--', alpha=0.5)
+    fig.tight_layout()
+    return fig
+
+# Box and violin plots are drawn from KLL quantile sketches (sketches.py), one
+# per group: kept in the aggregation cube when it has them, otherwise built
+# from the frame in one pass. Quartiles are within the sketch's rank error.
+def group_sketches(df, x, y):
+    """{level of x: KLLSketch of y}, in seaborn's order."""
+    if isinstance(df, dataset.Dataset):
+        return df.sketches(x, y)
+    aggregates = cube.attached(df)
+    if aggregates is not None and aggregates.covers([x], y, sketch=True):
+        return aggregates.sketches(x, y)
+    key = _column(df, x)
+    order = category_order(key)
+    codes = pd.Categorical(key, categories=order).codes
+    found = sketches.grouped_sketches(codes, df[y].to_numpy(dtype=np.float64, na_value=np.nan), len(order))
+    return {level: sketch for level, sketch in zip(order, found) if sketch.n}
+
+def layout_with_error_note(fig, group):
+    """tight_layout, plus a footnote with the quantile error bound if any sketch is approximate."""
+    error = max((sketch.rank_error() for sketch in group.values()), default=0)
+    if not error:
+        fig.tight_layout()
+        return
+    fig.text(.99, .01, f"Quartiles from quantile sketches: within ±{error:.1%} in rank (99% confidence)",
+             ha='right', va='bottom', fontsize=8, color='.4')
+    fig.tight_layout(rect=(0, .04, 1, 1))
+
+@register_plot("Likes by Education Level", columns=["education_level", "likes_given_per_day"], cost=1.5)
+def plot_likes_by_education(df):
+    """Violin plot of likes given per day by education level, with avg & max labels."""
+    if 'education_level' not in df.columns or 'likes_given_per_day' not in df.columns:
+        return None
+    group = group_sketches(df, 'education_level', 'likes_given_per_day')
+    order = list(group)
+    # All violins come from one batched KDE pass over points read off the
+    # sketches (weighted by how many values each stands for), with
+    # sns.violinplot's defaults (Scott bandwidth, cut=2, 100 points)
+    items = [sketch.quantile_points() for sketch in group.values()] or [(np.empty(0), np.empty(0))]
+    curves = kde.kde_curves(
+        np.concatenate([values for values, _ in items]),
+        np.repeat(np.arange(len(items)), [len(values) for values, _ in items]),
+        order=list(range(len(items))), gridsize=100, cut=2,
+        weights=np.concatenate([weights for _, weights in items]))
+    means = group_stats(df, 'education_level', 'likes_given_per_day')['mean']
+    peaks = [pdf.max() for _, pdf in curves.values() if len(pdf) and not np.isnan(pdf).all()]
+    peak = max(peaks, default=1)
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    colors = [sns.desaturate(c, .75) for c in sns.color_palette("muted", len(order))]
+    for i, level in enumerate(order):
+        support, pdf = curves[i]
+        if not len(support):
+            continue
+        if np.isnan(pdf).all():
+            # A single repeated value: draw a flat line, like seaborn
+            ax.plot([i - .4, i + .4], [support[0]] * 2, color='.26')
+            continue
+        # density_norm="area": every violin is scaled by the same peak
+        span = pdf / peak * .4
+        ax.fill_betweenx(support, i - span, i + span, facecolor=colors[i], edgecolor='.26')
+        for q, dashes in zip(group[level].quantile([.25, .5, .75]), [(1.25, .75), (2.5, 1), (1.25, .75)]):
+            half = np.interp(q, support, span)
+            ax.plot([i - half, i + half], [q, q], color='.26', dashes=dashes)
+
+        ax.annotate(f'Avg: {means[level]:.1f}', xy=(i, means[level]),
+                    xytext=(0, 5), textcoords='offset points',
+                    ha='center', color='blue', fontsize=9, fontweight='bold')
+        top = group[level].max
+        ax.annotate(f'Max: {top:g}', xy=(i, top),
+                    xytext=(0, -15), textcoords='offset points',
+                    ha='center', color='red', fontsize=9, fontweight='bold')
+
+    ax.set_xticks(range(len(order)))
+    ax.set_xticklabels([str(level) for level in order], rotation=30, fontsize=11)
+    ax.set_xlim(-.5, len(order) - .5)
+    ax.xaxis.grid(False)
+    ax.set_title("🎻 Likes Given per Day by Education Level (with Avg & Max)", fontsize=15, fontweight="bold")
+    ax.set_xlabel("Education Level", fontsize=12)
+    ax.set_ylabel("Likes Given per Day", fontsize=12)
+    ax.grid(axis="y", linestyle="--", alpha=0.5)
+    layout_with_error_note(fig, group)
+    return fig
+
+@register_plot("Ads Clicked by Gender", columns=["gender", "ads_clicked_per_day"], cost=1.5)
+def plot_ads_by_gender(df):
+    """Box plot of ads clicked per day by gender, with averages."""
+    if 'gender' not in df.columns or 'ads_clicked_per_day' not in df.columns:
+        return None
+    # Genders with no ads values get no box; no box at all, no plot
+    group = {level: sketch for level, sketch in group_sketches(df, 'gender', 'ads_clicked_per_day').items()
+             if sketch.n}
+    if not group:
+        return None
+    means = group_stats(df, 'gender', 'ads_clicked_per_day')['mean']
+    fig, ax = plt.subplots(figsize=(8, 6))
+    colors = [sns.desaturate(c, .75) for c in sns.color_palette("dark", len(group))]
+    boxes = ax.bxp([sketch.box_stats() for sketch in group.values()], positions=range(len(group)),
+                   widths=.8, patch_artist=True, showfliers=True,
+                   boxprops=dict(edgecolor='.26', linewidth=2.5),
+                   whiskerprops=dict(color='.26', linewidth=2.5),
+                   capprops=dict(color='.26', linewidth=2.5),
+                   medianprops=dict(color='.26', linewidth=2.5),
+                   flierprops=dict(marker='d', markersize=4, markerfacecolor='.26', markeredgecolor='.26'))
+    for patch, color in zip(boxes['boxes'], colors):
+        patch.set_facecolor(color)
+
+    for i, level in enumerate(group):
+        ax.annotate(f'Avg: {means[level]:.1f}', xy=(i, means[level]),
+                    xytext=(0, 5), textcoords='offset points',
+                    ha='center', color='white', fontsize=10, fontweight='bold')
+
+    ax.set_xticks(range(len(group)))
+    ax.set_xticklabels([str(level) for level in group], fontsize=11)
+    ax.set_xlim(-.5, len(group) - .5)
+    ax.xaxis.grid(False)
+    ax.set_title("Spending Behavior by Gender (Ads Clicked per Day)", fontsize=16, fontweight="bold", color="#333")
+    ax.set_xlabel("Gender", fontsize=13)
+    ax.set_ylabel("Ads Clicked per Day", fontsize=13)
+    ax.tick_params(axis='y', labelsize=11)
+    ax.grid(axis="y", linestyle="--", alpha=0.4)
+    layout_with_error_note(fig, group)
+    return fig
+
+# Scatter-style plots switch from one marker per row to a rasterized density
+# grid (density.py) above this many rows, so render time stops growing with
+# the data and millions of points don't turn into one solid blob.
+DENSITY_THRESHOLD = 20_000
+
+# Points mode on data over the threshold draws a sample stratified by the
+# hue column, so small employment groups keep their points
+SCATTER_STRATA = ("employment_status",)
+
+def scatter_sample(df):
+    """The representative sample the work hours scatter draws in points mode."""
+    return sampling.representative_sample(df, DENSITY_THRESHOLD, strata=SCATTER_STRATA)
+
+def _frame(df):
+    # Rows to draw one by one: a Dataset is only read in when it's this small
+    return df.to_frame() if isinstance(df, dataset.Dataset) else df
+
+def _bin_points(df, x, y, grid, hue=None):
+    if isinstance(df, dataset.Dataset):
+        return df.bin_points(x, y, grid, hue=hue)
+    return density.bin_points(df[x], df[y], grid=grid, categories=df[hue] if hue else None)
+
+def _linear_fit(df, x, y):
+    if isinstance(df, dataset.Dataset):
+        return df.linear_fit(x, y)
+    return density.linear_fit(df[x], df[y])
+
+def _use_density(df, mode):
+    if mode not in ("auto", "points", "density"):
+        raise ValueError(f"mode must be 'auto', 'points' or 'density', not {mode!r}")
+    return mode == "density" or (mode == "auto" and len(df) > DENSITY_THRESHOLD)
+
+@register_plot("Work Hours vs Engagement", columns=["weekly_work_hours", "user_engagement_score"],
+               cost=2, mode="auto")
+def plot_work_hours_vs_engagement(df, mode="auto", grid=density.DEFAULT_GRID):
+    """
+    Scatter of weekly work hours vs engagement score, coloured by employment
+    status, with a regression line. mode="density" (or "auto" on large data)
+    shades a 2-D count grid instead of drawing every point; mode="points" on
+    large data draws scatter_sample(df).
+    """
+    if 'weekly_work_hours' not in df.columns or 'user_engagement_score' not in df.columns:
+        return None
+    hue = "employment_status" if "employment_status" in df.columns else None
+    fig, ax = plt.subplots(figsize=(9, 6))
+
+    if not _use_density(df, mode):
+        sampled = len(df) > DENSITY_THRESHOLD
+        points = scatter_sample(df).frame if sampled else _frame(df)
+        sns.scatterplot(
+            x="weekly_work_hours", y="user_engagement_score", data=points, hue=hue,
+            size="age" if "age" in df.columns else None,
+            palette="dark" if hue else None, alpha=0.7, edgecolor="black", ax=ax
+        )
+        if sampled:
+            # The trend line still comes from every row
+            slope, intercept = _linear_fit(df, "weekly_work_hours", "user_engagement_score")
+            xs = np.array(ax.get_xlim())
+            ax.plot(xs, intercept + slope * xs, color="gray", linestyle="--", linewidth=2)
+        else:
+            sns.regplot(
+                x="weekly_work_hours", y="user_engagement_score", data=points, scatter=False,
+                color="gray", line_kws={"linestyle": "--", "linewidth": 2}, ax=ax
+            )
+    else:
+        counts, extent, labels = _bin_points(df, "weekly_work_hours", "user_engagement_score", grid, hue=hue)
+        if hue:
+            colors = sns.color_palette("dark", len(labels))
+            ax.imshow(density.shade_categories(counts, colors), extent=extent, origin="lower",
+                      aspect="auto", interpolation="nearest")
+            handles = [plt.Rectangle((0, 0), 1, 1, color=c) for c in colors]
+            ax.legend(handles, [str(label) for label in labels], title=hue)
+        else:
+            image = ax.imshow(np.ma.masked_equal(counts[0], 0), extent=extent, origin="lower",
+                              aspect="auto", interpolation="nearest", cmap="viridis",
+                              norm=mcolors.LogNorm())
+            fig.colorbar(image, ax=ax, label="Count in bin")
+        # Closed-form least squares; regplot's bootstrapped band is what
+        # makes it slow on large data
+        slope, intercept = _linear_fit(df, "weekly_work_hours", "user_engagement_score")
+        xs = np.array(extent[:2])
+        ax.plot(xs, intercept + slope * xs, color="gray", linestyle="--", linewidth=2)
+
+    ax.set_title(" Weekly Work Hours vs Engagement Score", fontsize=15, fontweight="bold")
+    ax.set_xlabel("Weekly Work Hours", fontsize=12)
+    ax.set_ylabel("User Engagement Score", fontsize=12)
+    ax.grid(True, linestyle="--", alpha=0.5)
+    fig.tight_layout()
+    return fig
+
+@register_plot("Work Hours vs Engagement (Hexbin)", columns=["weekly_work_hours", "user_engagement_score"],
+               cost=1.5, mode="auto")
+def plot_work_hours_hexbin(df, mode="auto", gridsize=30, grid=density.DEFAULT_GRID):
+    """
+    Hexbin of weekly work hours vs engagement score. In density mode the
+    points are first binned into a fine grid, and hexbin sums the grid cells
+    instead of placing every row.
+    """
+    if 'weekly_work_hours' not in df.columns or 'user_engagement_score' not in df.columns:
+        return None
+    fig, ax = plt.subplots(figsize=(9, 6))
+    if _use_density(df, mode):
+        counts, extent, _ = _bin_points(df, "weekly_work_hours", "user_engagement_score", grid)
+        cx, cy, weights = density.occupied_cells(counts[0], extent)
+        hb = ax.hexbin(cx, cy, C=weights, reduce_C_function=np.sum, gridsize=gridsize,
+                       cmap="Spectral", extent=extent)
+    else:
+        points = _frame(df)
+        x, y = points["weekly_work_hours"], points["user_engagement_score"]
+        valid = x.notna() & y.notna()
+        hb = ax.hexbin(x[valid], y[valid], gridsize=gridsize, cmap="Spectral", mincnt=1)
+    fig.colorbar(hb, ax=ax, label="Count in bin")
+    ax.set_title("Hexbin Plot: Weekly Work Hours vs Engagement Score", fontsize=15, fontweight="bold")
+    ax.set_xlabel("Weekly Work Hours", fontsize=12)
+    ax.set_ylabel("User Engagement Score", fontsize=12)
+    ax.grid(True, linestyle="--", alpha=0.5)
+    fig.tight_layout()
+    return fig
+
 # 4. CORRELATION MATRIX FUNCTION
+# Per-cell text only pays off on small matrices; past this many columns the
+# plain heatmap is drawn without annotations
+ANNOTATE_MAX_COLUMNS = 15
+# Tick labels are left off matrices wider than this
+TICK_LABEL_MAX_COLUMNS = 60
+
+def _correlation_accumulator(df):
+    if isinstance(df, CorrelationAccumulator):
+        return df
+    if isinstance(df, dataset.Dataset):
+        return df.correlation_accumulator()
+    if isinstance(df, pd.DataFrame):
+        return CorrelationAccumulator.from_frame(df)
+    return correlation_from_chunks(df)
+
+@register_plot("Feature Correlation Matrix", cost=2, section="correlations")
 def plot_correlation_matrix(df):
-    """Plots a heatmap of the correlation matrix."""
-    numeric_df = df.select_dtypes(include=[np.number])
-    if numeric_df.shape[1] < 2:
+    """
+    Plots a heatmap of the correlation matrix.
+
+    df can be a dataframe, an iterator of chunks (load_data(..., as_iterator=True)),
+    a dataset.Dataset or a ready CorrelationAccumulator, so files that don't
+    fit in memory work too.
+    """
+    acc = _correlation_accumulator(df)
+    if len(acc.columns) < 2:
         return None
-    corr = numeric_df.corr()
+    corr = acc.corr()
     fig, ax = plt.subplots(figsize=(12, 8))
-    sns.heatmap(corr, annot=True, fmt=".2f", cmap='coolwarm', center=0, ax=ax)
+    sns.heatmap(corr, annot=len(corr) <= ANNOTATE_MAX_COLUMNS, fmt=".2f", cmap='coolwarm', center=0, ax=ax)
     ax.set_title("Feature Correlation Matrix")
     return fig
 
+@register_plot("Clustered Correlation Matrix", cost=2, section="correlations", top_k=10)
+def plot_clustered_correlation(df, top_k=10, cache_key=None):
+    """
+    Correlation matrix reordered by average-linkage clustering (like
+    sns.clustermap in matx.py), with a dendrogram on top. The matrix is one
+    image and only the top_k strongest pairs are annotated, so it stays fast
+    with hundreds of columns. The linkage is cached per cache_key (e.g. the
+    dataset fingerprint), or per matrix when no key is given. df takes the
+    same inputs as plot_correlation_matrix.
+    """
+    acc = _correlation_accumulator(df)
+    if len(acc.columns) < 2:
+        return None
+    corr = acc.corr()
+    linkage, order = clustering.cached_clustering(corr, key=cache_key)
+    values = corr.to_numpy()[np.ix_(order, order)]
+    labels = [str(corr.columns[i]) for i in order]
+    k = len(order)
+
+    fig, (ax_tree, ax) = plt.subplots(2, 1, figsize=(12, 10), sharex=True,
+                                      gridspec_kw={"height_ratios": [1, 5]})
+    ax_tree.add_collection(mcollections.LineCollection(clustering.dendrogram_segments(linkage, order), colors=".3",
+                                          linewidths=.8))
+    ax_tree.set_ylim(0, max(linkage[:, 2].max() * 1.05, 1e-12))
+    ax_tree.axis("off")
+
+    image = ax.imshow(values, cmap='coolwarm', vmin=-1, vmax=1, extent=(0, k, k, 0),
+                      interpolation="nearest", aspect="auto")
+    ax.grid(False)
+    fig.colorbar(image, ax=[ax_tree, ax], shrink=.6, label="Pearson r")
+    if k <= TICK_LABEL_MAX_COLUMNS:
+        ax.set_xticks(np.arange(k) + .5)
+        ax.set_xticklabels(labels, rotation=90)
+        ax.set_yticks(np.arange(k) + .5)
+        ax.set_yticklabels(labels)
+    else:
+        ax.set_xticks([])
+        ax.set_yticks([])
+
+    # Annotate the strongest off-diagonal pairs (upper triangle, by |r|)
+    rows, cols = np.triu_indices(k, 1)
+    strength = np.nan_to_num(np.abs(values[rows, cols]), nan=-1)
+    for idx in np.argsort(-strength, kind="stable")[:top_k]:
+        i, j = rows[idx], cols[idx]
+        ax.text(j + .5, i + .5, f"{values[i, j]:.2f}", ha="center", va="center",
+                fontsize=8 if k <= TICK_LABEL_MAX_COLUMNS else 6)
+    ax.set_xlim(0, k)
+    ax_tree.set_title("Clustered Feature Correlations")
+    return fig
+
+# 5. PAIRPLOT FUNCTION
+# Replaces sns.pairplot(df, hue=...) from sb.py for wide data: aggregates
+# come from one pass (pairs.py) and the whole grid is one image. Only the
+# first PAIRPLOT_MAX_COLUMNS columns are drawn unless max_columns says otherwise.
+PAIRPLOT_MAX_COLUMNS = 8
+
+def pairplot_columns(df, max_columns=PAIRPLOT_MAX_COLUMNS):
+    """Default pairplot columns: numeric columns that aren't row ids, capped at max_columns."""
+    numeric = df.numeric_columns if isinstance(df, dataset.Dataset) else df.select_dtypes(include=[np.number]).columns
+    columns = [
+        col for col in numeric
+        if not (col.lower() == 'id' or col.lower().endswith('_id'))
+    ]
+    return columns[:max_columns]
+
+@register_plot("Pairplot", cost=3, section="pairplot", hue="gender", max_columns=PAIRPLOT_MAX_COLUMNS)
+def plot_pairplot(df, columns=None, hue="gender", max_columns=PAIRPLOT_MAX_COLUMNS, bins=pairs.PAIR_BINS):
+    """
+    Pairplot of numeric columns: histograms on the diagonal and binned
+    densities elsewhere, coloured by `hue` when that column exists.
+    Panels share no value axes; each spans its column's min to max.
+    """
+    columns = list(pairplot_columns(df, max_columns) if columns is None else columns)[:max_columns]
+    if len(columns) < 2:
+        return None
+    out_of_core = isinstance(df, dataset.Dataset)
+    if hue not in df.columns or (df.nunique(hue) if out_of_core else df[hue].nunique()) > pairs.MAX_HUE_LEVELS:
+        hue = None
+    if out_of_core:
+        agg = df.pair_aggregates(columns, hue=hue, bins=bins)
+    else:
+        agg = pairs.pair_aggregates(df, columns, hue=hue, bins=bins)
+    colors = sns.color_palette(n_colors=len(agg.hue_levels))
+    mosaic = pairs.pair_mosaic(agg, colors)
+
+    k = len(columns)
+    size = min(max(2 * k, 6), 16)
+    fig, ax = plt.subplots(figsize=(size, size))
+    ax.imshow(mosaic, extent=(0, k, k, 0), interpolation="nearest")
+    ax.set_xticks(np.arange(k) + .5)
+    ax.set_xticklabels(columns, rotation=90)
+    ax.set_yticks(np.arange(k) + .5)
+    ax.set_yticklabels(columns)
+    ax.grid(False)
+    for edge in range(1, k):
+        ax.axhline(edge, color=".8", linewidth=1)
+        ax.axvline(edge, color=".8", linewidth=1)
+    if hue is not None:
+        handles = [plt.Rectangle((0, 0), 1, 1, color=c) for c in colors]
+        fig.legend(handles, [str(level) for level in agg.hue_levels], title=hue,
+                   loc="upper left", bbox_to_anchor=(1.0, 0.95))
+    ax.set_title("Pairwise Distributions", fontsize=15, fontweight="bold")
+    fig.tight_layout()
+    return fig
+
 # Add more functions for each visualization in your original script...
@@ -0,0 +1,189 @@
+# export.py
+# Streaming export of the processed dataset (with the derived columns the
+# loader adds, like activity_bin). Rows are turned into CSV text or Arrow
+# tables one chunk at a time and written straight into a compressor or a
+# Parquet writer, so memory stays at a chunk's worth however big the data
+# is, instead of one string of the whole CSV plus a bytes copy of it.
+# Out-of-core Datasets (dataset.py) stream their chunks from DuckDB, so they
+# can be exported without ever being loaded.
+#
+# Formats: csv, csv.gz, csv.zst (needs zstandard) and parquet (needs pyarrow).
+#
+# Usage: python export.py instagram_users_lifestyle.csv processed.csv.zst
+import argparse
+import gzip
+import os
+from dataclasses import dataclass
+from importlib.util import find_spec
+
+import data_cache
+import derived
+from lazy_imports import LazyModule
+
+# Optional dependencies, imported on the first export that needs them
+zstd = LazyModule("zstandard") if find_spec("zstandard") else None
+pa = LazyModule("pyarrow") if find_spec("pyarrow") else None
+pq = LazyModule("pyarrow.parquet") if pa is not None else None
+
+# Rows converted at a time; a 100k-row chunk of the Instagram data is about
+# 8 MB of CSV text
+DEFAULT_CHUNK_ROWS = 100_000
+# Derived columns written along with the data (the ones load_data adds)
+EXPORT_DERIVED = ("activity_bin",)
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+EXPORT_CACHE_DIR = os.path.join(os.path.dirname(data_cache.DEFAULT_CACHE_DIR), "exports")
+EXPORT_CACHE_BYTES = 2 * 1024 ** 3  # 2 GB
+
+
+@dataclass(frozen=True)
+class ExportFormat:
+    label: str
+    extension: str
+    mime: str
+    # "pyarrow", "zstandard" or None
+    requires: str = None
+
+FORMATS = {
+    "csv": ExportFormat("CSV", ".csv", "text/csv"),
+    "csv.gz": ExportFormat("CSV (gzip)", ".csv.gz", "application/gzip"),
+    "csv.zst": ExportFormat("CSV (zstd)", ".csv.zst", "application/zstd", requires="zstandard"),
+    "parquet": ExportFormat("Parquet", ".parquet", "application/vnd.apache.parquet", requires="pyarrow"),
+}
+
+def available_formats():
+    """Names of the formats whose optional dependency is installed."""
+    installed = {"zstandard": zstd is not None, "pyarrow": pa is not None, None: True}
+    return [name for name, fmt in FORMATS.items() if installed[fmt.requires]]
+
+def format_for_path(path):
+    """The format a file name asks for through its extension (e.g. "csv.gz")."""
+    for name, fmt in sorted(FORMATS.items(), key=lambda item: -len(item[1].extension)):
+        if path.endswith(fmt.extension):
+            return name
+    raise ValueError(f"Can't tell the export format of {path!r}; use one of "
+                     + ", ".join(fmt.extension for fmt in FORMATS.values()))
+
+
+# 1. CHUNKS
+def iter_chunks(df, chunksize=DEFAULT_CHUNK_ROWS, columns=EXPORT_DERIVED):
+    """
+    df's rows as DataFrame chunks, with the derived `columns` added to the
+    chunks when df doesn't have them yet. df can be a DataFrame or a Dataset.
+    """
+    if hasattr(df, "iter_chunks"):
+        # Datasets add the loader's derived columns to every chunk themselves
+        yield from df.iter_chunks(chunksize)
+        return
+    missing = [name for name in columns if name not in df.columns and derived.can_derive(df, name)]
+    for start in range(0, len(df), chunksize):
+        chunk = df.iloc[start:start + chunksize]
+        if missing:
+            chunk = derived.add_columns(chunk.copy(), missing)
+        yield chunk
+
+
+# 2. WRITERS
+def _csv_blocks(chunks):
+    """UTF-8 CSV text of each chunk, with the header on the first one only."""
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=header).encode("utf-8")
+        header = False
+
+def write_csv(chunks, f, compression=None):
+    """Writes the chunks as CSV to the binary file f, compressed with None, "gzip" or "zstd"."""
+    if compression == "gzip":
+        # No name or time in the header, so the same data gives the same file
+        out = gzip.GzipFile(filename="", fileobj=f, mode="wb", compresslevel=GZIP_LEVEL, mtime=0)
+    elif compression == "zstd":
+        if zstd is None:
+            raise ImportError("zstd export needs the zstandard package")
+        out = zstd.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(f, closefd=False)
+    else:
+        out = None
+    for block in _csv_blocks(chunks):
+        (out or f).write(block)
+    if out is not None:
+        out.close()  # flushes the compressor; f stays open
+
+def write_parquet(chunks, f):
+    """Writes the chunks as one Parquet file (a row group per chunk) to f."""
+    if pa is None:
+        raise ImportError("Parquet export needs the pyarrow package")
+    writer = None
+    try:
+        for chunk in chunks:
+            # Later chunks are cast to the first one's schema, so a column
+            # that happens to be all missing in one chunk still matches
+            table = pa.Table.from_pandas(chunk, preserve_index=False,
+                                         schema=None if writer is None else writer.schema)
+            if writer is None:
+                writer = pq.ParquetWriter(f, table.schema, compression="zstd")
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+def export(df, dest, fmt=None, chunksize=DEFAULT_CHUNK_ROWS):
+    """
+    Writes df (a DataFrame or Dataset) to dest, a path or a binary file
+    object, in the format fmt (default: from dest's extension).
+    """
+    if fmt is None:
+        fmt = format_for_path(os.fspath(dest))
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if not hasattr(dest, "write"):
+        with open(dest, "wb") as f:
+            return export(df, f, fmt, chunksize)
+    chunks = iter_chunks(df, chunksize)
+    if fmt == "parquet":
+        write_parquet(chunks, dest)
+    else:
+        write_csv(chunks, dest, {"csv": None, "csv.gz": "gzip", "csv.zst": "zstd"}[fmt])
+
+
+# 3. CACHED EXPORTS
+def cached_export(df, data_key, fmt, cache_dir=EXPORT_CACHE_DIR, max_bytes=EXPORT_CACHE_BYTES):
+    """
+    Path of df exported as fmt, written on the first request for this
+    dataset fingerprint and format and reused after that.
+    """
+    path = os.path.join(cache_dir, f"{data_key}{FORMATS[fmt].extension}")
+    if os.path.exists(path):
+        data_cache.touch(path)
+        return path
+    os.makedirs(cache_dir, exist_ok=True)
+
+    def write(tmp_path):
+        export(df, tmp_path, fmt)
+        # Make room before the new file is moved in, so it can't evict
+        # itself; only finished exports count, not other writers' .tmp files
+        data_cache.evict_lru(cache_dir, max_bytes - os.path.getsize(tmp_path),
+                             tuple(export_format.extension for export_format in FORMATS.values()))
+    data_cache.write_atomic(path, write)
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export a dataset with its derived columns, chunk by chunk.")
+    parser.add_argument("source", help="CSV (or, with --out-of-core, Parquet) file to export")
+    parser.add_argument("output", help="output file; the extension picks the format")
+    parser.add_argument("--out-of-core", action="store_true",
+                        help="stream the rows through DuckDB instead of loading the file")
+    parser.add_argument("--chunksize", type=int, default=DEFAULT_CHUNK_ROWS, help="rows per chunk")
+    args = parser.parse_args(argv)
+
+    import eda_functions as eda
+
+    df = eda.load_data(args.source, out_of_core=args.out_of_core)
+    export(df, args.output, chunksize=args.chunksize)
+    size = os.path.getsize(args.output)
+    print(f"Wrote {args.output} ({size / 1024 ** 2:.1f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# figure_cache.py
+# Cache of rendered plots, keyed by (dataset fingerprint, plot function,
+# plot parameters, image format). Rendered PNG/SVG bytes are kept in a
+# memory tier and a disk tier, both with LRU eviction, so showing a plot
+# that was already drawn for the same data skips matplotlib entirely.
+# Keys also cover the code that drew the plot (the source of the plot
+# function's module) and the matplotlib version, so the disk tier doesn't
+# serve images from before an upgrade or a change to the plots.
+import functools
+import hashlib
+import inspect
+import io
+import os
+import sys
+import threading
+from collections import OrderedDict
+from importlib import metadata
+
+from data_cache import evict_lru, touch, write_atomic
+
+DEFAULT_FIGURE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "eda-dashboard", "figures")
+DEFAULT_MAX_MEMORY_BYTES = 64 * 1024 ** 2
+DEFAULT_MAX_DISK_BYTES = 512 * 1024 ** 2
+
+# Same settings st.pyplot uses, so cached images look like the live ones
+SAVEFIG_KWARGS = {"bbox_inches": "tight", "dpi": 200}
+# Bump to drop every cached figure, e.g. after changing a helper module the
+# plot functions' own module doesn't show
+CACHE_VERSION = 1
+
+
+def render_figure(fig, fmt="png"):
+    """Rasterizes (or vectorizes) a matplotlib figure to bytes and closes it."""
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt, **SAVEFIG_KWARGS)
+    # Close through pyplot so the figure manager lets go of it too
+    import matplotlib.pyplot as plt
+    plt.close(fig)
+    return buffer.getvalue()
+
+def _write_bytes(path, data):
+    with open(path, "wb") as f:
+        f.write(data)
+
+@functools.lru_cache(maxsize=None)
+def _matplotlib_version():
+    try:
+        return metadata.version("matplotlib")
+    except metadata.PackageNotFoundError:
+        return None
+
+@functools.lru_cache(maxsize=None)
+def _module_digest(module_name):
+    # Hash of a module's source file, read once per process
+    path = getattr(sys.modules.get(module_name), "__file__", None)
+    try:
+        with open(path, "rb") as f:
+            return hashlib.blake2b(f.read(), digest_size=8).hexdigest()
+    except (OSError, TypeError):
+        return None
+
+def _code_version(plot_func):
+    """The code a plot comes from: its module's source, or the function's bytecode without one."""
+    plot_func = inspect.unwrap(plot_func)  # perf.traced wrappers key like the function
+    digest = _module_digest(plot_func.__module__)
+    if digest is None and hasattr(plot_func, "__code__"):
+        digest = hashlib.blake2b(plot_func.__code__.co_code, digest_size=8).hexdigest()
+    return digest
+
+def figure_key(fingerprint, plot_func, params=None, fmt="png"):
+    """Cache key for one plot of one dataset, drawn by this code with this matplotlib."""
+    if isinstance(plot_func, str):
+        name, code = plot_func, None
+    else:
+        name, code = f"{plot_func.__module__}.{plot_func.__qualname__}", _code_version(plot_func)
+    params = sorted((params or {}).items())
+    raw = repr((fingerprint, name, params, fmt, sorted(SAVEFIG_KWARGS.items()),
+                CACHE_VERSION, code, _matplotlib_version()))
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+class FigureCache:
+    """
+    Two-tier LRU cache of rendered figures. Set disk_dir=None for memory only.
+    Safe to share between threads.
+    """
+
+    def __init__(self, max_memory_bytes=DEFAULT_MAX_MEMORY_BYTES, disk_dir=DEFAULT_FIGURE_DIR,
+                 max_disk_bytes=DEFAULT_MAX_DISK_BYTES):
+        self.max_memory_bytes = max_memory_bytes
+        self.disk_dir = disk_dir
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        if disk_dir is not None:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    def _disk_path(self, key, fmt):
+        return os.path.join(self.disk_dir, f"{key}.{fmt}")
+
+    def _remember(self, key, data):
+        # Caller holds the lock
+        if key in self._memory:
+            self._memory_bytes -= len(self._memory.pop(key))
+        self._memory[key] = data
+        self._memory_bytes += len(data)
+        while self._memory_bytes > self.max_memory_bytes and len(self._memory) > 1:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= len(evicted)
+
+    def get(self, key, fmt="png"):
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        if self.disk_dir is None:
+            return None
+        path = self._disk_path(key, fmt)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        touch(path)
+        with self._lock:
+            self._remember(key, data)
+        return data
+
+    def put(self, key, data, fmt="png"):
+        with self._lock:
+            self._remember(key, data)
+        if self.disk_dir is not None:
+            try:
+                path = self._disk_path(key, fmt)
+                write_atomic(path, lambda tmp: _write_bytes(tmp, data))
+                evict_lru(self.disk_dir, self.max_disk_bytes, f".{fmt}")
+            except OSError:
+                pass
+
+    def get_or_render(self, fingerprint, plot_func, df, fmt="png", **params):
+        """
+        Returns the rendered bytes of plot_func(df, **params), drawing it only
+        on a cache miss. Returns None when the plot function returns None
+        (e.g. required columns are missing).
+        """
+        key = figure_key(fingerprint, plot_func, params, fmt)
+        data = self.get(key, fmt)
+        if data is not None:
+            return data
+        fig = plot_func(df, **params)
+        if fig is None:
+            return None
+        data = render_figure(fig, fmt)
+        self.put(key, data, fmt)
+        return data
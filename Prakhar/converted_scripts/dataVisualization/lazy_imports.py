@@ -0,0 +1,46 @@
+# lazy_imports.py
+# Deferred imports for the plotting stack. matplotlib and seaborn take
+# longer to import than everything else the loader and profiler need, so
+# modules that only draw on request hold a LazyModule instead: it imports
+# the real module the first time one of its attributes is used.
+import importlib
+import threading
+
+_lock = threading.RLock()
+
+
+class LazyModule:
+    """
+    Stands in for the module `name` until it's first used. on_load(module)
+    runs once, right after the import (e.g. to set a plotting style).
+    """
+
+    def __init__(self, name, on_load=None):
+        self.__dict__.update(_name=name, _on_load=on_load, _module=None)
+
+    def _load(self):
+        if self._module is None:
+            with _lock:
+                if self._module is None:
+                    module = importlib.import_module(self._name)
+                    if self._on_load is not None:
+                        self._on_load(module)
+                    self.__dict__["_module"] = module
+        return self._module
+
+    @property
+    def loaded(self):
+        return self._module is not None
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<lazy module {self._name!r} ({state})>"
@@ -0,0 +1,126 @@
+# pairs.py
+# Aggregates and image tiles for a pairplot that scales to wide data.
+# sns.pairplot draws k^2 matplotlib panels, each re-scanning the raw rows.
+# Here every column is binned once per chunk of rows, all 1-D histograms and
+# 2-D binned counts come from bincounts over those codes, and the panels are
+# shaded from the counts into one RGBA mosaic (tiles are shaded in parallel
+# threads), which is drawn with a single imshow.
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from density import shade_categories
+
+PAIR_BINS = 40
+DEFAULT_CHUNKSIZE = 1_000_000
+# A hue column with more levels than this is ignored
+MAX_HUE_LEVELS = 10
+
+
+@dataclass
+class PairAggregates:
+    columns: list
+    # Bin edges for each column
+    edges: list
+    # 1-D counts, shape (columns, hue levels, bins)
+    hist: np.ndarray
+    # 2-D counts for every pair i > j, shape (hue levels, bins of i, bins of j)
+    joint: dict
+    hue_levels: list
+
+
+def _bin_codes(values, lo, hi, bins):
+    """Bin index of every value; missing values go to an extra bin `bins`."""
+    with np.errstate(invalid="ignore"):
+        codes = np.clip(np.floor((values - lo) / (hi - lo) * bins), 0, bins - 1)
+    return np.nan_to_num(codes, nan=bins).astype(np.intp)
+
+def pair_aggregates(df, columns, hue=None, bins=PAIR_BINS, chunksize=DEFAULT_CHUNKSIZE):
+    """
+    Every 1-D histogram and every pairwise 2-D count grid of `columns`,
+    split by the levels of `hue`, from one pass over the rows.
+    """
+    columns = list(columns)
+    k = len(columns)
+    ranges = []
+    for col in columns:
+        lo, hi = df[col].min(), df[col].max()
+        if pd.isna(lo):
+            lo, hi = 0.0, 1.0
+        elif lo == hi:
+            lo, hi = lo - 0.5, hi + 0.5
+        ranges.append((float(lo), float(hi)))
+    edges = [np.linspace(lo, hi, bins + 1) for lo, hi in ranges]
+
+    if hue is not None:
+        hue_codes, hue_levels = pd.factorize(df[hue], sort=True)
+        hue_levels = list(hue_levels)
+    else:
+        hue_codes, hue_levels = np.zeros(len(df), dtype=np.intp), [None]
+    h = len(hue_levels)
+
+    # Missing values (and rows with a missing hue) are counted in an extra
+    # bin / level so no per-pair masking is needed; they're dropped at the end
+    nb, nh = bins + 1, h + 1
+    hist = np.zeros((k, nh, nb), dtype=np.int64)
+    joint = {(i, j): np.zeros((nh, nb, nb), dtype=np.int64) for i in range(k) for j in range(i)}
+    for start in range(0, len(df), chunksize):
+        rows = slice(start, start + chunksize)
+        hc = np.asarray(hue_codes[rows], dtype=np.intp)
+        hc = np.where(hc < 0, h, hc)
+        codes = [
+            _bin_codes(df[col].iloc[rows].to_numpy(dtype=np.float64, na_value=np.nan), lo, hi, bins)
+            for col, (lo, hi) in zip(columns, ranges)
+        ]
+        for i in range(k):
+            # Shift by the hue level so one bincount covers every level
+            ci = hc * nb + codes[i]
+            hist[i] += np.bincount(ci, minlength=nh * nb).reshape(nh, nb)
+            ci *= nb
+            for j in range(i):
+                joint[i, j] += np.bincount(ci + codes[j], minlength=nh * nb * nb).reshape(nh, nb, nb)
+    hist = hist[:, :h, :bins]
+    joint = {pair: counts[:h, :bins, :bins] for pair, counts in joint.items()}
+    return PairAggregates(columns, edges, hist, joint, hue_levels)
+
+def _shade_hist(hist, colors, alpha=0.6):
+    """Overlaid filled histograms (one per hue level) as an RGBA tile."""
+    bins = hist.shape[1]
+    tile = np.zeros((bins, bins, 4))
+    peak = max(hist.max(), 1)
+    # Pixel row r (0 at the bottom) is covered where the bar reaches past it
+    levels = np.arange(bins)[:, None]
+    for counts, color in zip(hist, colors):
+        covered = (levels < np.ceil(counts / peak * bins)[None, :])[..., None]
+        layer = np.append(np.asarray(color, dtype=np.float64)[:3], alpha)
+        # "over" compositing of this level on top of the tile so far
+        out_alpha = alpha + tile[..., 3:] * (1 - alpha)
+        blended = (layer[:3] * alpha + tile[..., :3] * tile[..., 3:] * (1 - alpha)) / np.maximum(out_alpha, 1e-12)
+        tile = np.where(covered, np.concatenate([blended, out_alpha], axis=-1), tile)
+    return tile
+
+def pair_mosaic(agg, colors, max_workers=None):
+    """
+    Shades every panel of the grid into one RGBA image of shape
+    (k * bins, k * bins, 4), row 0 at the top. Diagonal panels are
+    histograms; off-diagonal panels are density shades, blended by hue.
+    """
+    k = len(agg.columns)
+    bins = agg.hist.shape[2]
+    mosaic = np.zeros((k * bins, k * bins, 4))
+
+    def shade(i, j):
+        if i == j:
+            tile = _shade_hist(agg.hist[i], colors)
+        elif i > j:
+            tile = shade_categories(agg.joint[i, j], colors)
+        else:
+            tile = shade_categories(agg.joint[j, i].transpose(0, 2, 1), colors)
+        # Tiles have y increasing with the row index; the mosaic runs top down
+        mosaic[i * bins:(i + 1) * bins, j * bins:(j + 1) * bins] = tile[::-1]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        list(pool.map(lambda ij: shade(*ij), [(i, j) for i in range(k) for j in range(k)]))
+    return mosaic
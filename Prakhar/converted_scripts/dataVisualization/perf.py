@@ -0,0 +1,246 @@
+# perf.py
+# Lightweight instrumentation for the dashboard. A Tracer records nested
+# spans (wall time, CPU time and, optionally, peak allocation through
+# tracemalloc) grouped into runs, one per Streamlit rerun. span() marks a
+# stage of app.py; instrument() wraps a module's functions so every call
+# becomes a span while a tracer is active on the calling thread and costs
+# one attribute lookup otherwise. Runs export as JSON or in the Chrome trace
+# event format (chrome://tracing, Perfetto).
+#
+# Peak memory comes from tracemalloc, which is process-wide: it's switched
+# on only while a memory-tracing run is in progress and off again when the
+# last one ends, and runs that overlap (two sessions with ?perf=1 at once)
+# see each other's allocations in their peaks.
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+import weakref
+from collections import deque
+from dataclasses import asdict, dataclass, field
+
+# Runs kept per tracer
+MAX_RUNS = 20
+
+_local = threading.local()
+
+# Memory-tracing runs in progress; tracemalloc is stopped when the last one
+# ends (unless something else had started it)
+_tracing_runs = 0
+_started_tracing = False
+_tracing_lock = threading.Lock()
+
+
+def _acquire_tracing():
+    global _tracing_runs, _started_tracing
+    with _tracing_lock:
+        if _tracing_runs == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+        _tracing_runs += 1
+
+def _release_tracing(state):
+    global _tracing_runs, _started_tracing
+    if not state["tracing"]:
+        return
+    state["tracing"] = False
+    with _tracing_lock:
+        _tracing_runs -= 1
+        if _tracing_runs == 0 and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+
+
+@dataclass
+class Span:
+    name: str
+    category: str
+    # Seconds from the start of the run
+    start: float
+    depth: int
+    wall_s: float = 0.0
+    cpu_s: float = 0.0
+    # Peak traced allocation above the level at the start of the span
+    peak_mb: float = None
+
+
+@dataclass
+class Run:
+    label: str
+    started_at: float
+    spans: list = field(default_factory=list)
+
+    @property
+    def wall_s(self):
+        return sum(span.wall_s for span in self.spans if span.depth == 0)
+
+
+class Tracer:
+    """
+    Records the spans of the last MAX_RUNS runs. memory=True keeps
+    tracemalloc on from new_run() to end_run() (for the whole process, which
+    slows allocation-heavy code down) so spans also get their peak allocation.
+    """
+
+    def __init__(self, memory=False, max_runs=MAX_RUNS):
+        self.memory = memory
+        self.runs = deque(maxlen=max_runs)
+        self._stack = []
+        # Whether this tracer holds tracemalloc on; released if it's dropped mid-run
+        self._tracing = {"tracing": False}
+        weakref.finalize(self, _release_tracing, self._tracing)
+
+    def new_run(self, label=None):
+        """Starts a run (e.g. one rerun of the script) and makes this the thread's active tracer."""
+        # A run cut short (st.stop(), an exception) ends here at the latest
+        self.end_run()
+        if self.memory:
+            _acquire_tracing()
+            self._tracing["tracing"] = True
+        self._stack = []
+        run = Run(label or time.strftime("%H:%M:%S"), time.time())
+        self.runs.append(run)
+        self._origin = time.perf_counter()
+        activate(self)
+        return run
+
+    def end_run(self):
+        """Ends the current run: stops recording on this thread and releases tracemalloc."""
+        if active() is self:
+            activate(None)
+        _release_tracing(self._tracing)
+
+    @property
+    def current_run(self):
+        return self.runs[-1] if self.runs else None
+
+    def _enter(self, name, category):
+        if not self.runs:
+            self.new_run()
+        span = Span(name, category, time.perf_counter() - self._origin, len(self._stack))
+        frame = [span, time.perf_counter(), time.process_time(), None, 0]
+        if self.memory and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            # reset_peak() clears the enclosing span's peak too, so keep it
+            if self._stack:
+                self._stack[-1][4] = max(self._stack[-1][4], peak)
+            tracemalloc.reset_peak()
+            frame[3] = current
+        self._stack.append(frame)
+        return span
+
+    def _exit(self):
+        span, wall, cpu, base, peak_seen = self._stack.pop()
+        span.wall_s = time.perf_counter() - wall
+        span.cpu_s = time.process_time() - cpu
+        if base is not None and tracemalloc.is_tracing():
+            peak = max(tracemalloc.get_traced_memory()[1], peak_seen)
+            span.peak_mb = (peak - base) / 1024 ** 2
+            if self._stack:
+                self._stack[-1][4] = max(self._stack[-1][4], peak)
+        self.runs[-1].spans.append(span)
+
+    def span(self, name, category="app"):
+        return _SpanContext(self, name, category)
+
+    def timeline(self, run=None):
+        """The spans of a run (default: the current one) in start order, as rows for a table."""
+        run = run or self.current_run
+        if run is None:
+            return []
+        return [
+            {
+                "stage": "  " * span.depth + span.name,
+                "start_ms": round(span.start * 1000, 1),
+                "wall_ms": round(span.wall_s * 1000, 1),
+                "cpu_ms": round(span.cpu_s * 1000, 1),
+                "peak_mb": None if span.peak_mb is None else round(span.peak_mb, 2),
+            }
+            for span in sorted(run.spans, key=lambda span: (span.start, span.depth))
+        ]
+
+    def to_json(self, indent=2):
+        """Every kept run with its spans."""
+        runs = [{"label": run.label, "started_at": run.started_at, "spans": [asdict(s) for s in run.spans]}
+                for run in self.runs]
+        return json.dumps({"runs": runs}, indent=indent)
+
+    def to_chrome_trace(self):
+        """The kept runs as Chrome trace events (complete "X" events, times in microseconds)."""
+        events = []
+        first = self.runs[0].started_at if self.runs else 0.0
+        for tid, run in enumerate(self.runs):
+            offset = (run.started_at - first) * 1e6
+            events.append({"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid,
+                           "args": {"name": f"run {run.label}"}})
+            for span in run.spans:
+                args = {"cpu_ms": round(span.cpu_s * 1000, 3)}
+                if span.peak_mb is not None:
+                    args["peak_mb"] = round(span.peak_mb, 3)
+                events.append({
+                    "name": span.name, "cat": span.category, "ph": "X", "pid": os.getpid(), "tid": tid,
+                    "ts": round(offset + span.start * 1e6, 1), "dur": round(span.wall_s * 1e6, 1),
+                    "args": args,
+                })
+        return json.dumps({"traceEvents": events, "displayTimeUnit": "ms"})
+
+
+class _SpanContext:
+    def __init__(self, tracer, name, category):
+        self.tracer, self.name, self.category = tracer, name, category
+
+    def __enter__(self):
+        if self.tracer is not None:
+            return self.tracer._enter(self.name, self.category)
+
+    def __exit__(self, *exc):
+        if self.tracer is not None:
+            self.tracer._exit()
+        return False
+
+
+def activate(tracer):
+    """Makes tracer the one spans on this thread are recorded in (None turns recording off)."""
+    _local.tracer = tracer
+
+def active():
+    return getattr(_local, "tracer", None)
+
+def span(name, category="app"):
+    """Context manager timing a stage in the active tracer; does nothing without one."""
+    return _SpanContext(active(), name, category)
+
+def traced(func, name=None, category=None):
+    """func wrapped so calls are spans of the active tracer. Name, module and docstring are kept."""
+    if getattr(func, "_perf_traced", False):
+        return func
+    name = name or f"{func.__module__}.{func.__name__}"
+    category = category or func.__module__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        tracer = active()
+        if tracer is None:
+            return func(*args, **kwargs)
+        with tracer.span(name, category):
+            return func(*args, **kwargs)
+    wrapper._perf_traced = True
+    return wrapper
+
+def instrument(module, names=None):
+    """
+    Replaces the module's public functions (or just `names`) with traced()
+    versions, so calls between its own functions are traced too. Safe to
+    call again; functions are only wrapped once.
+    """
+    if names is None:
+        names = [
+            name for name, value in vars(module).items()
+            if callable(value) and not isinstance(value, type) and not name.startswith("_")
+            and getattr(value, "__module__", None) == module.__name__
+        ]
+    for name in names:
+        setattr(module, name, traced(getattr(module, name)))
+    return module
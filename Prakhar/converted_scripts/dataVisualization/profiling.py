@@ -0,0 +1,244 @@
+# profiling.py
+# One-pass dataset profile shared by every tab of the dashboard.
+# Instead of calling isna(), describe(), nunique() and duplicated() separately
+# (each a full scan), profile_dataset() works out all per-column statistics
+# together and returns a DatasetProfile that the tabs read from.
+import warnings
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+import backends
+from duplicates import find_duplicates
+from sketches import DISTINCT_EXACT_THRESHOLD, distinct_count
+
+DEFAULT_HIST_BINS = 30
+TOP_VALUES = 10
+# Text columns with an estimated distinct count above this don't get a
+# top-values table (it would need an exact count of every value)
+TOP_VALUES_MAX_DISTINCT = 1000
+
+# Numeric columns are converted to float in blocks of about this many bytes
+BLOCK_BYTES = 256 * 1024 ** 2
+
+
+@dataclass
+class ColumnProfile:
+    """Statistics for one column. Numeric-only fields are None otherwise."""
+    name: str
+    dtype: object
+    count: int
+    null_count: int
+    distinct: int
+    is_numeric: bool
+    distinct_exact: bool = True
+    min: float = None
+    max: float = None
+    mean: float = None
+    std: float = None
+    quartiles: tuple = None
+    hist_counts: np.ndarray = None
+    hist_edges: np.ndarray = None
+    top_values: pd.Series = None
+
+    @property
+    def is_constant(self):
+        return self.distinct == 1
+
+    def to_dict(self):
+        info = {
+            "dtype": str(self.dtype),
+            "count": self.count,
+            "null_count": self.null_count,
+            "distinct": self.distinct,
+            "distinct_exact": self.distinct_exact,
+            "is_constant": self.is_constant,
+        }
+        if self.is_numeric:
+            info.update({
+                "min": self.min, "max": self.max, "mean": self.mean, "std": self.std,
+                "quartiles": list(self.quartiles),
+                "hist_counts": self.hist_counts.tolist(),
+                "hist_edges": self.hist_edges.tolist(),
+            })
+        if self.top_values is not None:
+            info["top_values"] = {str(k): int(v) for k, v in self.top_values.items()}
+        return info
+
+
+@dataclass
+class DatasetProfile:
+    n_rows: int
+    n_columns: int
+    columns: dict = field(default_factory=dict)
+    duplicate_rows: int = None
+
+    def column(self, name):
+        return self.columns[name]
+
+    @property
+    def dtypes(self):
+        return pd.Series({name: col.dtype for name, col in self.columns.items()}, dtype=object)
+
+    @property
+    def missing(self):
+        return pd.Series({name: col.null_count for name, col in self.columns.items()}, dtype="int64")
+
+    @property
+    def missing_total(self):
+        return int(self.missing.sum())
+
+    @property
+    def numeric_columns(self):
+        return [name for name, col in self.columns.items() if col.is_numeric]
+
+    @property
+    def constant_columns(self):
+        return [name for name, col in self.columns.items() if col.is_constant]
+
+    def high_missing(self, pct=50):
+        """Columns with more than pct percent missing values."""
+        if not self.n_rows:
+            return []
+        missing_pct = self.missing / self.n_rows * 100
+        return missing_pct[missing_pct > pct].index.tolist()
+
+    def describe(self):
+        """Same layout as DataFrame.describe() for the numeric columns."""
+        rows = {}
+        for name in self.numeric_columns:
+            col = self.columns[name]
+            q25, q50, q75 = col.quartiles
+            rows[name] = [col.count, col.mean, col.std, col.min, q25, q50, q75, col.max]
+        return pd.DataFrame(rows, index=["count", "mean", "std", "min", "25%", "50%", "75%", "max"], dtype=float)
+
+    def to_dict(self):
+        return {
+            "n_rows": self.n_rows,
+            "n_columns": self.n_columns,
+            "duplicate_rows": self.duplicate_rows,
+            "columns": {name: col.to_dict() for name, col in self.columns.items()},
+        }
+
+
+def _numeric_blocks(df, columns):
+    """Yields (column names, 2-D float array) blocks of at most BLOCK_BYTES."""
+    per_block = max(1, BLOCK_BYTES // max(1, 8 * len(df)))
+    for start in range(0, len(columns), per_block):
+        names = columns[start:start + per_block]
+        yield names, df[names].to_numpy(dtype=np.float64, na_value=np.nan)
+
+def _profile_numeric(df, columns, bins, exact, threshold):
+    """Vectorized statistics for a block of numeric columns at a time."""
+    profiles = {}
+    for names, values in _numeric_blocks(df, columns):
+        valid = ~np.isnan(values)
+        counts = valid.sum(axis=0)
+        with np.errstate(all="ignore"), warnings.catch_warnings():
+            # nan-reductions warn on all-NaN columns; those just come out as NaN
+            warnings.simplefilter("ignore", RuntimeWarning)
+            mins = np.nanmin(values, axis=0)
+            maxs = np.nanmax(values, axis=0)
+            means = np.nanmean(values, axis=0)
+            stds = np.nanstd(values, axis=0, ddof=1)
+            quartiles = np.nanquantile(values, [0.25, 0.5, 0.75], axis=0)
+
+            # Histograms for the whole block with a single bincount: each
+            # column gets its own range of `bins` slots
+            span = np.where(maxs > mins, maxs - mins, 1.0)
+            idx = np.floor((values - mins) / span * bins)
+            idx = np.clip(np.nan_to_num(idx, nan=-1), -1, bins - 1).astype(np.int64)
+        offsets = np.arange(len(names)) * bins
+        flat = (idx + offsets)[valid]
+        hist = np.bincount(flat, minlength=bins * len(names)).reshape(len(names), bins)
+
+        for i, name in enumerate(names):
+            series = df[name]
+            distinct, distinct_exact = distinct_count(series, exact=exact, threshold=threshold)
+            lo, hi = mins[i], maxs[i]
+            if not np.isfinite(lo):
+                lo, hi = 0.0, 1.0
+            elif hi == lo:
+                hi = lo + 1.0
+            profiles[name] = ColumnProfile(
+                name=name,
+                dtype=series.dtype,
+                count=int(counts[i]),
+                null_count=int(len(df) - counts[i]),
+                distinct=distinct,
+                is_numeric=True,
+                distinct_exact=distinct_exact,
+                min=float(mins[i]),
+                max=float(maxs[i]),
+                mean=float(means[i]),
+                std=float(stds[i]),
+                quartiles=tuple(float(q) for q in quartiles[:, i]),
+                hist_counts=hist[i],
+                hist_edges=np.linspace(lo, hi, bins + 1),
+            )
+    return profiles
+
+def _profile_other(df, columns, exact, threshold):
+    """
+    Text/categorical columns: one value_counts gives distinct and top values.
+    Large high-cardinality columns get a HyperLogLog estimate instead.
+    Counting runs on the selected backend (backends.py).
+    """
+    profiles = {}
+    engine = backends.engine()
+    if engine is not None:
+        nulls = pd.Series({name: engine.null_count(df, name) for name in columns}, dtype="int64")
+    else:
+        nulls = df[columns].isna().sum() if columns else pd.Series(dtype="int64")
+    if exact is None:
+        exact = len(df) <= threshold
+    for name in columns:
+        series = df[name]
+        distinct, distinct_exact = None, True
+        if not exact and not isinstance(series.dtype, pd.CategoricalDtype):
+            distinct, distinct_exact = distinct_count(series, exact=False)
+        top_values = None
+        if distinct is None or distinct <= TOP_VALUES_MAX_DISTINCT:
+            value_counts = series.value_counts() if engine is None else engine.value_counts(df, name)
+            distinct, distinct_exact = int((value_counts > 0).sum()), True
+            top_values = value_counts.head(TOP_VALUES)
+        profiles[name] = ColumnProfile(
+            name=name,
+            dtype=series.dtype,
+            count=int(len(df) - nulls[name]),
+            null_count=int(nulls[name]),
+            distinct=distinct,
+            is_numeric=False,
+            distinct_exact=distinct_exact,
+            top_values=top_values,
+        )
+    return profiles
+
+def profile_dataset(df, bins=DEFAULT_HIST_BINS, duplicates=True, exact_distinct=None,
+                    distinct_threshold=DISTINCT_EXACT_THRESHOLD):
+    """
+    Builds a DatasetProfile for a dataframe.
+
+    Per column: dtype, null count, distinct count and constant flag; numeric
+    columns also get min/max/mean/std, quartiles and a histogram with `bins`
+    bins, and other columns get their most frequent values.
+
+    Distinct counts are exact up to distinct_threshold rows and HyperLogLog
+    estimates above it (see sketches.distinct_count); exact_distinct=True
+    forces exact counts everywhere and exact_distinct=False estimates everywhere.
+    """
+    numeric = df.select_dtypes(include=[np.number]).columns.tolist()
+    other = [col for col in df.columns if col not in set(numeric)]
+
+    profiles = _profile_numeric(df, numeric, bins, exact_distinct, distinct_threshold)
+    profiles.update(_profile_other(df, other, exact_distinct, distinct_threshold))
+
+    profile = DatasetProfile(
+        n_rows=len(df),
+        n_columns=df.shape[1],
+        columns={name: profiles[name] for name in df.columns},
+    )
+    if duplicates:
+        profile.duplicate_rows = find_duplicates(df).duplicate_rows
+    return profile
@@ -0,0 +1,209 @@
+# rendering.py
+# Renders registered plots (eda_functions.PLOT_REGISTRY) in a process pool.
+# matplotlib drawing holds the GIL, so threads don't help; separate worker
+# processes let every core draw a different plot at the same time.
+import multiprocessing
+import os
+import sys
+import threading
+import time
+import types
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager, nullcontext
+
+import data_cache
+import eda_functions as eda
+from figure_cache import figure_key, render_figure
+
+# Dataset each worker process renders from, set once by _init_worker
+_worker_df = None
+
+
+def default_start_method():
+    """
+    "fork" where the OS has it, otherwise "spawn".
+
+    Forked workers start fast and inherit the dataframe without it being
+    pickled. Only fork from a single-threaded process (a CLI's main thread);
+    pools started from a thread of the dashboard use
+    background_start_method().
+    """
+    return "fork" if "fork" in multiprocessing.get_all_start_methods() else "spawn"
+
+def background_start_method():
+    """
+    "forkserver" where the OS has it, otherwise "spawn", for pools started
+    from a thread of a multithreaded process like the Streamlit server.
+    fork() there copies locks other threads hold (Tornado, pyarrow,
+    matplotlib) and the child can deadlock on them. Pass make_pool() a
+    cached Feather file so these workers memory-map the data.
+    """
+    return "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+
+_main_lock = threading.Lock()
+
+@contextmanager
+def _hidden_main_script():
+    # Spawned and forkserver workers re-run __main__'s file when they start,
+    # and under `streamlit run` that's the dashboard script: hide it while
+    # workers are started, so they only import what the tasks need
+    with _main_lock:
+        main = sys.modules.get("__main__")
+        sys.modules["__main__"] = types.ModuleType("__main__")
+        try:
+            yield
+        finally:
+            sys.modules["__main__"] = main
+
+def _init_worker(df, cache_file):
+    import matplotlib
+    matplotlib.use("Agg", force=True)
+    global _worker_df
+    # A cached Feather file is memory-mapped instead of shipping the frame
+    _worker_df = data_cache.read_cached(cache_file) if cache_file else df
+
+def _render_task(name, params, fmt):
+    spec = eda.PLOT_REGISTRY[name]
+    start = time.perf_counter()
+    try:
+        fig = spec.func(_worker_df, **params)
+        if fig is None:
+            data = None
+        elif fmt is None:
+            # The Figure itself, pickled back to the caller (e.g. to save
+            # it as a vector PDF page)
+            eda.plt.close(fig)
+            data = fig
+        else:
+            data = render_figure(fig, fmt)
+    except Exception:
+        # Don't leave a half-drawn figure behind in the worker
+        eda.plt.close("all")
+        raise
+    return name, data, time.perf_counter() - start
+
+def make_pool(df, cache_file=None, max_workers=None, start_method=None):
+    """
+    Process pool whose workers hold the dataset. With the "spawn" method,
+    pass cache_file (a data_cache Feather file) so workers memory-map it
+    rather than each receiving a pickled copy of df.
+    """
+    start_method = start_method or default_start_method()
+    context = multiprocessing.get_context(start_method)
+    if start_method == "fork":
+        cache_file = None  # forked workers already share the parent's frame
+    elif cache_file:
+        df = None
+    if start_method == "forkserver":
+        # Workers fork from a server that has already imported the plotting code
+        context.set_forkserver_preload(["rendering"])
+    pool = ProcessPoolExecutor(
+        max_workers=max_workers or os.cpu_count(),
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(df, cache_file),
+    )
+    pool.start_method = start_method
+    return pool
+
+def submit_plots(pool, specs, fmt="png", params=None):
+    """
+    Submits plots to a pool from make_pool(), most expensive first.
+    params maps a plot name to parameters overriding the registered defaults.
+    fmt=None returns the matplotlib Figures themselves instead of image bytes.
+    Returns {future: spec}; each future's result is (name, bytes or None, seconds).
+    """
+    params = params or {}
+    futures = {}
+    # Non-fork pools start their workers as tasks are submitted
+    hide_main = getattr(pool, "start_method", None) != "fork"
+    with _hidden_main_script() if hide_main else nullcontext():
+        for spec in sorted(specs, key=lambda spec: -spec.cost):
+            plot_params = {**spec.params, **params.get(spec.name, {})}
+            futures[pool.submit(_render_task, spec.name, plot_params, fmt)] = spec
+    return futures
+
+def iter_completed(futures, return_exceptions=False):
+    """
+    Yields (spec, bytes or None, seconds) as each submitted plot finishes.
+    Finished futures are dropped from `futures`, so rendered images that were
+    already consumed can be freed. A plot that raised re-raises here, or with
+    return_exceptions=True is yielded as (spec, exception, None).
+    """
+    for future in as_completed(list(futures)):
+        spec = futures.pop(future)
+        try:
+            _, data, seconds = future.result()
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            yield spec, e, None
+            continue
+        yield spec, data, seconds
+
+def render_plots_parallel(df, specs=None, fmt="png", params=None, **pool_kwargs):
+    """
+    Renders plots in worker processes and yields (spec, bytes or None,
+    seconds) as each one finishes.
+    """
+    if specs is None:
+        specs = eda.available_plots(df)
+    pool = make_pool(df, **pool_kwargs)
+    try:
+        yield from iter_completed(submit_plots(pool, specs, fmt, params))
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+class PrerenderJob:
+    """
+    Background pre-rendering of a dataset's plots into a FigureCache, with
+    the registered default parameters. By default that's the plots of the
+    Visualizations tab; the correlation and pairplot sections are the most
+    expensive and drawn on demand. Runs in a thread that feeds a process
+    pool (started with background_start_method(); pass the dataset's cached
+    Feather file as cache_file), so the caller returns immediately.
+    """
+
+    def __init__(self, df, fingerprint, cache, specs=None, fmt="png", section="visualizations", **pool_kwargs):
+        self.fingerprint = fingerprint
+        self.cache = cache
+        self.fmt = fmt
+        specs = eda.available_plots(df, section=section) if specs is None else specs
+        # Plots already in the cache (e.g. from an earlier session) are skipped
+        self.specs = [
+            spec for spec in specs
+            if cache.get(figure_key(fingerprint, spec.func, spec.params, fmt), fmt) is None
+        ]
+        self.timings = {}
+        self.error = None
+        self._df = df
+        self._pool_kwargs = {"start_method": background_start_method(), **pool_kwargs}
+        self._thread = threading.Thread(target=self._run, name="plot-prerender", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        try:
+            if self.specs:
+                for spec, data, seconds in render_plots_parallel(
+                    self._df, self.specs, fmt=self.fmt, **self._pool_kwargs
+                ):
+                    if data is not None:
+                        key = figure_key(self.fingerprint, spec.func, spec.params, self.fmt)
+                        self.cache.put(key, data, self.fmt)
+                    self.timings[spec.name] = seconds
+        except Exception as e:  # a failed pre-render just means drawing on demand
+            self.error = e
+        finally:
+            self._df = None
+
+    @property
+    def progress(self):
+        return len(self.timings), len(self.specs)
+
+    def done(self):
+        return not self._thread.is_alive()
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+        return self.done()
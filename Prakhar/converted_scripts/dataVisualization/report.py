@@ -0,0 +1,200 @@
+# report.py
+# Builds one HTML or PDF report with every registered plot plus the profile
+# tables, for handing to people who don't use the dashboard.
+# Plots are rendered in parallel worker processes (rendering.py) and written
+# into the report file in registry order, the order of the table of
+# contents: each one is written as soon as it and the plots before it have
+# finished, so only plots that finish early are held in memory. PDF reports
+# get the figures themselves from the workers and save them as vector
+# pages. A plot that fails is noted in the report instead of stopping it.
+#
+# Usage: python report.py instagram_users_lifestyle.csv -o report.html
+import argparse
+import base64
+import html
+import os
+import time
+
+import pandas as pd
+
+import data_cache
+import eda_functions as eda
+import profiling
+import rendering
+
+
+def _profile_tables(profile):
+    """(title, DataFrame) pairs shown at the top of the report."""
+    overview = pd.DataFrame({
+        "Data Type": profile.dtypes.astype(str),
+        "Missing": profile.missing,
+        "Unique": [col.distinct for col in profile.columns.values()],
+    })
+    tables = [("Columns", overview)]
+    if profile.numeric_columns:
+        tables.append(("Numeric Columns Summary", profile.describe().round(3)))
+    return tables
+
+
+def _seconds(seconds):
+    return "failed" if seconds is None else f"{seconds:.2f}"
+
+
+class _HtmlWriter:
+    def __init__(self, path, title, specs):
+        self.f = open(path, "w", encoding="utf-8")
+        self.f.write(
+            "<!DOCTYPE html>\n<html><head><meta charset='utf-8'>"
+            f"<title>{html.escape(title)}</title>"
+            "<style>body{font-family:sans-serif;margin:2em auto;max-width:1100px}"
+            "img{max-width:100%}table{border-collapse:collapse;font-size:12px}"
+            "td,th{border:1px solid #ccc;padding:2px 6px}</style></head><body>\n"
+            f"<h1>{html.escape(title)}</h1>\n<ul>\n"
+        )
+        # The table of contents can be written up front: the plot list is known
+        for spec in specs:
+            self.f.write(f"<li><a href='#{self._anchor(spec.name)}'>{html.escape(spec.name)}</a></li>\n")
+        self.f.write("</ul>\n")
+
+    @staticmethod
+    def _anchor(name):
+        return "plot-" + "".join(c if c.isalnum() else "-" for c in name.lower())
+
+    def table(self, title, df):
+        self.f.write(f"<h2>{html.escape(title)}</h2>\n{df.to_html()}\n")
+
+    def plot(self, spec, png, seconds):
+        self.f.write(f"<h2 id='{self._anchor(spec.name)}'>{html.escape(spec.name)}</h2>\n")
+        if png is None:
+            self.f.write("<p>Required columns not found in data.</p>\n")
+        else:
+            self.f.write("<img src='data:image/png;base64,")
+            self.f.write(base64.b64encode(png).decode("ascii"))
+            self.f.write(f"'>\n<p><small>Rendered in {seconds:.2f}s</small></p>\n")
+        self.f.flush()
+
+    def failed(self, spec, error):
+        self.f.write(f"<h2 id='{self._anchor(spec.name)}'>{html.escape(spec.name)}</h2>\n"
+                     f"<p>This plot failed: {html.escape(error)}</p>\n")
+        self.f.flush()
+
+    def close(self, timings):
+        rows = "".join(f"<tr><td>{html.escape(name)}</td><td>{_seconds(seconds)}</td></tr>"
+                       for name, seconds in timings.items())
+        self.f.write(f"<h2>Render Timings (s)</h2><table>{rows}</table>\n</body></html>\n")
+        self.f.close()
+
+
+class _PdfWriter:
+    def __init__(self, path, title, specs):
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+        from matplotlib.backends.backend_pdf import PdfPages
+        self.plt = plt
+        self.pdf = PdfPages(path)
+        fig = plt.figure(figsize=(11, 8.5))
+        fig.text(0.5, 0.6, title, ha="center", fontsize=24, fontweight="bold")
+        fig.text(0.5, 0.5, "\n".join(spec.name for spec in specs), ha="center", va="top", fontsize=12)
+        self._page(fig)
+
+    def _page(self, fig):
+        self.pdf.savefig(fig)
+        self.plt.close(fig)
+
+    def table(self, title, df):
+        fig, ax = self.plt.subplots(figsize=(11, 8.5))
+        ax.axis("off")
+        ax.set_title(title, fontsize=16, fontweight="bold")
+        text = df.astype(str).to_numpy()
+        table = ax.table(cellText=text, rowLabels=df.index.astype(str), colLabels=df.columns.astype(str),
+                         loc="center")
+        table.auto_set_font_size(False)
+        table.set_fontsize(7)
+        self._page(fig)
+
+    def plot(self, spec, fig, seconds):
+        # fig is the Figure itself (see build_report), so the page stays vector
+        if fig is not None:
+            self._page(fig)
+
+    def failed(self, spec, error):
+        fig = self.plt.figure(figsize=(11, 8.5))
+        fig.text(0.5, 0.6, spec.name, ha="center", fontsize=18, fontweight="bold")
+        fig.text(0.5, 0.5, f"This plot failed: {error}", ha="center", va="top", fontsize=11, wrap=True)
+        self._page(fig)
+
+    def close(self, timings):
+        self.table("Render Timings (s)", pd.DataFrame(
+            {"Seconds": [_seconds(s) for s in timings.values()]}, index=list(timings)
+        ))
+        self.pdf.close()
+
+
+def build_report(source, out_path, fmt=None, title="Instagram Usage & Lifestyle Report",
+                 max_workers=None, start_method=None):
+    """
+    Writes the report to out_path (format from fmt or the file extension:
+    "html" or "pdf"). source is a dataframe or a CSV path.
+    Returns per-plot render times in seconds (None for plots that failed),
+    plus "total".
+    """
+    started = time.perf_counter()
+    fmt = (fmt or os.path.splitext(out_path)[1].lstrip(".") or "html").lower()
+    if fmt not in ("html", "pdf"):
+        raise ValueError(f"Unsupported report format: {fmt}")
+
+    cache_file = None
+    if isinstance(source, (str, os.PathLike)):
+        df, key = data_cache.load_cached(source, loader=eda.load_data)
+        cache_file = data_cache.cached_file(key, loader=eda.load_data)
+    else:
+        df = source
+
+    specs = eda.available_plots(df)
+    writer = (_HtmlWriter if fmt == "html" else _PdfWriter)(out_path, title, specs)
+    timings = {}
+    pool = rendering.make_pool(df, cache_file=cache_file, max_workers=max_workers,
+                               start_method=start_method)
+    try:
+        # PDF pages are saved from the Figures themselves, HTML embeds PNGs
+        futures = rendering.submit_plots(pool, specs, fmt=None if fmt == "pdf" else "png")
+        # Profile the data in this process while the workers draw
+        for table_title, table in _profile_tables(profiling.profile_dataset(df)):
+            writer.table(table_title, table)
+        # Results wait here until the plots before them are written
+        finished = {}
+        upcoming = iter(specs)
+        following = next(upcoming, None)
+        for spec, result, seconds in rendering.iter_completed(futures, return_exceptions=True):
+            finished[spec.name] = (result, seconds)
+            while following is not None and following.name in finished:
+                result, seconds = finished.pop(following.name)
+                if isinstance(result, Exception):
+                    writer.failed(following, f"{type(result).__name__}: {result}")
+                else:
+                    writer.plot(following, result, seconds)
+                timings[following.name] = seconds
+                following = next(upcoming, None)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        writer.close(timings)
+    timings["total"] = time.perf_counter() - started
+    return timings
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build an EDA report with every registered plot.")
+    parser.add_argument("csv", help="CSV file to report on")
+    parser.add_argument("-o", "--output", default="eda_report.html", help="output .html or .pdf file")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args(argv)
+
+    timings = build_report(args.csv, args.output, max_workers=args.workers)
+    for name, seconds in timings.items():
+        print(f"{name:<40} {'failed' if seconds is None else f'{seconds:7.2f}s':>8}")
+    print(f"Report written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
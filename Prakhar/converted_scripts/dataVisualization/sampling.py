@@ -0,0 +1,300 @@
+# sampling.py
+# Representative row samples for plots, built while the data streams in.
+# Every row gets a uniform random key; for each stratum (combination of the
+# strata columns, e.g. gender x activity_bin) the rows with the `capacity`
+# smallest keys are kept. The k smallest keys of a stratum are a uniform
+# sample of it for any k, so one pass supports samples of any size, uniform
+# or stratified. The most extreme rows of each numeric column are kept
+# explicitly so tails aren't lost.
+import weakref
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_SAMPLE_SIZE = 10_000
+DEFAULT_STRATA = ("gender", "activity_bin")
+# Rows kept at each end of every numeric column
+OUTLIERS_PER_COLUMN = 20
+# Rare strata get at least this many rows (or all of their rows) in a
+# stratified sample, even when their proportional share rounds to zero
+MIN_PER_STRATUM = 50
+DEFAULT_CHUNKSIZE = 1_000_000
+
+
+@dataclass
+class Sample:
+    # Sampled rows; the index is the row's position in the full dataset
+    frame: pd.DataFrame
+    # Number of full-dataset rows each sampled row stands for
+    weights: pd.Series
+    provenance: dict = field(default_factory=dict)
+
+    def __len__(self):
+        return len(self.frame)
+
+    def describe(self):
+        """One-line description of how the sample was drawn, for captions."""
+        p = self.provenance
+        if p["method"] == "all rows":
+            return f"All {p['source_rows']:,} rows (no sampling needed)."
+        text = f"{p['sample_rows']:,} of {p['source_rows']:,} rows, "
+        if p["method"] == "stratified" and p["strata"]:
+            text += f"stratified by {', '.join(p['strata'])} ({p['n_strata']} strata)"
+        else:
+            text += "uniform random sample"
+        if p["outlier_rows"]:
+            text += f", plus {p['outlier_rows']} extreme rows"
+        return text + f" (seed {p['seed']})."
+
+
+def _cap_allocation(allocation, floor, population, size):
+    """
+    Trims a floored allocation to `size` rows in total: first from the rows
+    strata have above their floor, in proportion to those, then (when there
+    are more strata than rows) down to one row from each of the largest strata.
+    """
+    excess = allocation.sum() - size
+    if excess <= 0:
+        return allocation
+    spare = allocation - np.minimum(floor, allocation)
+    if spare.sum() >= excess:
+        cut = np.floor(excess * spare / spare.sum()).astype(np.int64)
+        # The rounding leftover comes off the strata with the most rows to spare
+        leftover = excess - cut.sum()
+        cut[np.argsort(cut - spare, kind="stable")[:leftover]] += 1
+        return allocation - cut
+    allocation = np.zeros_like(allocation)
+    allocation[np.argsort(-population, kind="stable")[:size]] = 1
+    return allocation
+
+
+class Sampler:
+    """
+    Streaming reservoir sampler. Call update() with every chunk of the
+    dataset (in order), then sample() as often as needed.
+    """
+
+    def __init__(self, capacity=DEFAULT_SAMPLE_SIZE, strata=DEFAULT_STRATA, outlier_columns=None,
+                 outliers_per_column=OUTLIERS_PER_COLUMN, seed=42):
+        self.capacity = capacity
+        self.strata = tuple(strata)
+        self.outlier_columns = outlier_columns
+        self.outliers_per_column = outliers_per_column
+        self.seed = seed
+        self.rows_seen = 0
+        self._rng = np.random.default_rng(seed)
+        self._strata_present = None
+        self._stratum_ids = {}
+        self._population = np.zeros(0, dtype=np.int64)
+        self._reservoir = None
+        self._outliers = None
+        self._dtypes = None
+
+    def _stratum_codes(self, chunk):
+        if not self._strata_present:
+            return np.zeros(len(chunk), dtype=np.int64)
+        # Combine per-column codes into one integer per row, then map this
+        # chunk's combinations to ids that stay stable across chunks
+        combined = np.zeros(len(chunk), dtype=np.int64)
+        uniques = []
+        for col in self._strata_present:
+            codes, levels = pd.factorize(chunk[col], use_na_sentinel=False)
+            combined = combined * len(levels) + codes
+            uniques.append(levels)
+        found, inverse = np.unique(combined, return_inverse=True)
+        ids = np.empty(len(found), dtype=np.int64)
+        for i, value in enumerate(found):
+            label = []
+            for levels in reversed(uniques):
+                value, code = divmod(value, len(levels))
+                label.append(levels[code])
+            ids[i] = self._stratum_ids.setdefault(tuple(reversed(label)), len(self._stratum_ids))
+        return ids[inverse]
+
+    def update(self, chunk):
+        """Adds the next chunk of rows."""
+        if self._dtypes is None:
+            self._dtypes = chunk.dtypes
+            self._strata_present = [col for col in self.strata if col in chunk.columns]
+            if self.outlier_columns is None:
+                self.outlier_columns = chunk.select_dtypes(include=[np.number]).columns.tolist()
+        chunk = chunk.set_axis(pd.RangeIndex(self.rows_seen, self.rows_seen + len(chunk)))
+        self.rows_seen += len(chunk)
+        if not len(chunk):
+            return self
+
+        strata = self._stratum_codes(chunk)
+        n_strata = max(len(self._stratum_ids), 1)
+        self._population = np.bincount(strata, minlength=n_strata) + np.pad(
+            self._population, (0, n_strata - len(self._population)))
+
+        # Only rows whose key beats the current cut-off of their stratum can
+        # enter; after the first few chunks that's a small fraction
+        keys = self._rng.random(len(chunk))
+        cutoff = np.ones(n_strata)
+        res = self._reservoir
+        if res is not None:
+            res_keys, res_strata = res["_key"].to_numpy(), res["_stratum"].to_numpy()
+            counts = np.bincount(res_strata, minlength=n_strata)
+            last = np.cumsum(counts) - 1  # the reservoir is sorted by (stratum, key)
+            full = counts >= self.capacity
+            cutoff[full] = res_keys[last[full]]
+        else:
+            res_keys = res_strata = np.zeros(0)
+        entering = np.flatnonzero(keys < cutoff[strata])
+
+        # Work out the new reservoir on the key arrays, then copy only the
+        # rows that made it in
+        n_res = len(res_keys)
+        all_keys = np.concatenate([res_keys, keys[entering]])
+        all_strata = np.concatenate([res_strata, strata[entering]]).astype(np.int64)
+        order = np.lexsort((all_keys, all_strata))
+        sorted_strata = all_strata[order]
+        rank = np.arange(len(order)) - np.searchsorted(sorted_strata, sorted_strata)
+        keep = order[rank < self.capacity]
+        added = np.sort(keep[keep >= n_res] - n_res)
+        rows = entering[added]
+        new = chunk.iloc[rows].assign(_key=keys[rows], _stratum=strata[rows])
+        pool = new if res is None else pd.concat([res, new])
+        take = np.where(keep < n_res, keep, n_res + np.searchsorted(added, keep - n_res))
+        self._reservoir = pool.iloc[take]
+
+        if self.outlier_columns and self.outliers_per_column:
+            extremes = chunk.iloc[self._extreme_positions(chunk)]
+            if self._outliers is not None:
+                extremes = pd.concat([self._outliers, extremes])
+                extremes = extremes.iloc[self._extreme_positions(extremes)]
+            self._outliers = extremes
+        return self
+
+    def _extreme_positions(self, df):
+        """Positions of the rows holding the m largest/smallest values of each outlier column."""
+        m = self.outliers_per_column
+        positions = []
+        for col in self.outlier_columns:
+            if col not in df.columns:
+                continue
+            values = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+            if len(values) <= 2 * m:
+                positions.append(np.flatnonzero(~np.isnan(values)))
+                continue
+            positions.append(np.argpartition(np.nan_to_num(values, nan=np.inf), m)[:m])
+            positions.append(np.argpartition(np.nan_to_num(values, nan=-np.inf), -m)[-m:])
+        return np.unique(np.concatenate(positions)) if positions else np.zeros(0, dtype=np.int64)
+
+    def _restore_dtypes(self, frame):
+        # pd.concat turns categoricals with different categories into object
+        for col, dtype in self._dtypes.items():
+            if isinstance(dtype, pd.CategoricalDtype) and not isinstance(frame[col].dtype, pd.CategoricalDtype):
+                frame[col] = frame[col].astype("category")
+        return frame
+
+    def sample(self, size=DEFAULT_SAMPLE_SIZE, method="stratified", outliers=True):
+        """
+        A Sample of at most `size` rows. method="stratified" allocates rows to
+        strata in proportion to their size, but gives every stratum at least
+        MIN_PER_STRATUM rows (or all of its rows), so rare categories show up,
+        taking those rows from the larger strata's shares; method="uniform" is
+        a plain uniform sample. outliers=True appends the extreme rows of each
+        numeric column on top of the `size` rows.
+        """
+        if method not in ("stratified", "uniform"):
+            raise ValueError(f"method must be 'stratified' or 'uniform', not {method!r}")
+        if self._reservoir is None:
+            return Sample(pd.DataFrame(columns=self._dtypes.index if self._dtypes is not None else []),
+                          pd.Series(dtype=float), self._provenance("uniform", 0, 0, 0))
+        size = min(size, self.capacity)
+        res = self._reservoir
+        population = self._population
+        strata = res["_stratum"].to_numpy()
+
+        if method == "uniform" or len(population) == 1:
+            method = "uniform"
+            picked = res.nsmallest(size, "_key")
+            weights = np.full(len(picked), self.rows_seen / max(len(picked), 1))
+        else:
+            share = np.floor(size * population / population.sum()).astype(np.int64)
+            # The floor is capped so small samples don't grow by more than half
+            floor = np.minimum(population, min(MIN_PER_STRATUM, max(1, size // (2 * len(population)))))
+            allocation = np.minimum(np.maximum(share, floor), np.minimum(population, self.capacity))
+            # Floors added on top of the shares can't take the sample past size
+            allocation = _cap_allocation(allocation, floor, population, size)
+            rank = res.groupby("_stratum").cumcount().to_numpy()  # reservoir is sorted by key
+            picked = res[rank < allocation[strata]]
+            per_row = population / np.maximum(allocation, 1)
+            weights = per_row[picked["_stratum"].to_numpy()]
+
+        frame = picked.drop(columns=["_key", "_stratum"])
+        weights = pd.Series(weights, index=frame.index)
+        n_outliers = 0
+        if outliers and self._outliers is not None:
+            extra = self._outliers.loc[self._outliers.index.difference(frame.index)]
+            n_outliers = len(extra)
+            frame = pd.concat([frame, extra])
+            weights = pd.concat([weights, pd.Series(1.0, index=extra.index)])
+        frame = self._restore_dtypes(frame.sort_index())
+        return Sample(frame, weights.sort_index(),
+                      self._provenance(method, len(frame), n_outliers, len(population)))
+
+    def _provenance(self, method, sample_rows, outlier_rows, n_strata):
+        return {
+            "method": method,
+            "source_rows": self.rows_seen,
+            "sample_rows": sample_rows,
+            "strata": list(self._strata_present or []),
+            "n_strata": n_strata,
+            "outlier_rows": outlier_rows,
+            "outlier_columns": list(self.outlier_columns or []),
+            "seed": self.seed,
+        }
+
+
+# Samplers attached to in-memory dataframes, by id(df) and strata. Entries
+# are dropped when the dataframe is garbage collected.
+_attached = {}
+
+def attach(df, sampler):
+    """Registers a sampler built during ingestion as the one for df."""
+    entry = _attached.get(id(df))
+    if entry is None:
+        entry = _attached[id(df)] = {}
+        weakref.finalize(df, _attached.pop, id(df), None)
+    entry[sampler.strata] = sampler
+    return sampler
+
+def sampler_for(df, strata=DEFAULT_STRATA, capacity=DEFAULT_SAMPLE_SIZE, chunksize=DEFAULT_CHUNKSIZE, **kwargs):
+    """
+    The sampler attached to df for these strata (holding at least `capacity`
+    rows per stratum), or a new one built from df in one pass and attached,
+    so later requests don't scan again.
+    """
+    strata = tuple(strata)
+    sampler = _attached.get(id(df), {}).get(strata)
+    if sampler is None or sampler.capacity < capacity:
+        sampler = Sampler(capacity=capacity, strata=strata, **kwargs)
+        if hasattr(df, "iter_chunks"):
+            # An out-of-core dataset.Dataset streams its rows
+            for chunk in df.iter_chunks(chunksize):
+                sampler.update(chunk)
+        else:
+            for start in range(0, len(df), chunksize):
+                sampler.update(df.iloc[start:start + chunksize])
+            if not len(df):
+                sampler.update(df)
+        attach(df, sampler)
+    return sampler
+
+def representative_sample(df, size=DEFAULT_SAMPLE_SIZE, strata=DEFAULT_STRATA, method="stratified",
+                          outliers=True):
+    """
+    At most `size` representative rows of df, plus extreme rows with
+    outliers=True (see Sampler.sample). Frames that already fit are returned whole.
+    """
+    if len(df) <= size:
+        return Sample(df, pd.Series(1.0, index=df.index), {
+            "method": "all rows", "source_rows": len(df), "sample_rows": len(df), "strata": [],
+            "n_strata": 0, "outlier_rows": 0, "outlier_columns": [], "seed": None,
+        })
+    sampler = sampler_for(df, strata, capacity=max(size, DEFAULT_SAMPLE_SIZE))
+    return sampler.sample(size, method=method, outliers=outliers)
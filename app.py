@@ -2,15 +2,22 @@
 import streamlit as st
 import sys
 import os
-import numpy as np
 import pandas as pd
-import matplotlib.pyplot as plt
 # Add the path to your module
 sys.path.append('Prakhar/converted_scripts/dataVisualization')
 
 # Import your new modular functions
 try:
     import eda_functions as eda
+    import data_cache
+    import profiling
+    import duplicates
+    import figure_cache
+    import rendering
+    import sampling
+    import cube
+    import perf
+    import export
 except ImportError as e:
     st.error(f"Could not import module: {e}")
     st.stop()
@@ -18,6 +25,21 @@ except ImportError as e:
 st.set_page_config(layout="wide")
 st.title("Instagram Usage & Lifestyle Dashboard")
 
+# --- Performance Instrumentation ---
+# Hidden unless the page is opened with ?perf=1 (or EDA_PERF=1 is set): each
+# rerun is then recorded as a timeline of the stages below and of every
+# eda_functions call (see perf.py), shown in a sidebar panel at the end
+perf_enabled = st.query_params.get("perf") == "1" or os.environ.get("EDA_PERF") == "1"
+if perf_enabled:
+    perf.instrument(eda)
+    perf.instrument(figure_cache, ["render_figure"])
+    if "perf_tracer" not in st.session_state:
+        st.session_state["perf_tracer"] = perf.Tracer(memory=True)
+    tracer = st.session_state["perf_tracer"]
+    tracer.new_run()
+else:
+    perf.activate(None)
+
 # --- Sidebar for Controls ---
 with st.sidebar:
     st.header("Data Input")
@@ -34,21 +56,86 @@ with st.sidebar:
         file_path = None
 
 # --- Load Data ---
+# Parsed files are cached on disk by content hash (see data_cache.py), so
+# reruns and new sessions memory-map the cache instead of re-parsing the CSV
 df = None
+data_key = None
 if uploaded_file is not None:
-    df = pd.read_csv(uploaded_file)
+    loader = pd.read_csv
+    with perf.span("load data"):
+        df, data_key = data_cache.load_cached(uploaded_file, loader=loader)
     st.sidebar.success(f"Uploaded: {uploaded_file.name}")
 elif use_sample and os.path.exists(file_path):
-    df = eda.load_data(file_path)  # Use our function
+    loader = eda.load_data  # Use our function
+    with perf.span("load data"):
+        df, data_key = data_cache.load_cached(file_path, loader=loader)
     st.sidebar.info("Using sample dataset.")
 else:
     st.info("👈 Please upload a CSV file or select the sample dataset to begin.")
     st.stop()
 
+# --- Dataset Profile ---
+# Every per-column statistic the tabs show comes from one profiling pass,
+# cached per dataset fingerprint
+@st.cache_resource(max_entries=4)
+def get_profile(_df, data_key):
+    # Duplicate rows are counted separately (with a progress bar) in the
+    # Data Quality Check
+    return profiling.profile_dataset(_df, duplicates=False)
+
+with perf.span("profile"):
+    profile = get_profile(df, data_key)
+
+# Rendered plots are cached per (dataset, plot, parameters) in memory and on
+# disk, so switching back to a plot doesn't draw it again
+@st.cache_resource
+def get_figure_cache():
+    return figure_cache.FigureCache()
+
+figures = get_figure_cache()
+
+# The aggregation cube (see cube.py) is built once per dataset and attached
+# to this run's dataframe, so bar and count charts read their group stats
+# from it.
+@st.cache_resource(max_entries=4)
+def get_cube(_df, data_key):
+    return cube.build_cube(_df)
+
+with perf.span("aggregation cube"):
+    cube.attach(df, get_cube(df, data_key))
+
+# As soon as a dataset is loaded, the Visualizations tab's plots are
+# rendered in a background process pool into the figure cache. The pool
+# doesn't fork this multithreaded server: its workers are started fresh and
+# memory-map the dataset's cached Feather file
+@st.cache_resource(max_entries=2)
+def start_prerender(_df, data_key, cache_file):
+    return rendering.PrerenderJob(_df, data_key, figures, cache_file=cache_file)
+
+with perf.span("start pre-rendering"):
+    prerender_job = start_prerender(df, data_key, data_cache.cached_file(data_key, loader=loader))
+
+# Representative samples (see sampling.py) are built once per dataset and
+# strata, then attached to this run's dataframe so plot functions find them
+@st.cache_resource(max_entries=8)
+def get_sampler(_df, data_key, strata, capacity=sampling.DEFAULT_SAMPLE_SIZE):
+    return sampling.sampler_for(_df, strata, capacity=capacity)
+
+def attach_sampler(strata, capacity=sampling.DEFAULT_SAMPLE_SIZE):
+    return sampling.attach(df, get_sampler(df, data_key, tuple(strata), capacity))
+
+def show_plot(plot_func, warning="Required columns not found in data.", **params):
+    with perf.span(f"show_plot {plot_func.__name__}"):
+        png = figures.get_or_render(data_key, perf.traced(plot_func), df, **params)
+    if png:
+        st.image(png, use_container_width=True)
+    else:
+        st.warning(warning)
+
 # --- Main Dashboard Tabs ---
-tab1, tab2, tab3 = st.tabs(["Data Overview", "Visualizations", "Correlations"])
+tab1, tab2, tab3, tab4 = st.tabs(["Data Overview", "Visualizations", "Correlations", "Pairplot"])
 
-with tab1:
+with tab1, perf.span("Data Overview tab"):
     st.header("Dataset Overview")
     
     # Quick stats at the top
@@ -58,11 +145,9 @@ with tab1:
     with col2:
         st.metric("Total Columns", df.shape[1])
     with col3:
-        numeric_cols = df.select_dtypes(include=[np.number]).shape[1]
-        st.metric("Numeric Columns", numeric_cols)
+        st.metric("Numeric Columns", len(profile.numeric_columns))
     with col4:
-        missing_total = df.isna().sum().sum()
-        st.metric("Missing Values", missing_total)
+        st.metric("Missing Values", profile.missing_total)
     
     # Interactive controls in an expander
     with st.expander("📊 Detailed Data Explorer", expanded=True):
@@ -90,18 +175,27 @@ with tab1:
         
         # Show data preview
         st.subheader("Data Preview")
+        preview_mode = st.radio("Preview", ["First rows", "Representative sample"], horizontal=True,
+                                help="The sample is stratified by gender and activity level")
         if selected_columns:
             try:
+                if preview_mode == "First rows":
+                    preview = df[selected_columns].head(preview_rows)
+                else:
+                    attach_sampler(sampling.DEFAULT_STRATA)
+                    sample = sampling.representative_sample(df, preview_rows, outliers=False)
+                    preview = sample.frame[selected_columns]
+                    st.caption(f"Sample: {sample.describe()}")
                 # Use Streamlit's dataframe with height limit
                 st.dataframe(
-                    df[selected_columns].head(preview_rows),
+                    preview,
                     use_container_width=True,
                     height=400
                 )
                 
-                # Show a sample warning for large datasets
-                if len(df) > 10000:
-                    st.info(f"Showing first {preview_rows} rows of {len(df):,} total rows. Data has been sampled for performance.")
+                # Note the preview size for large datasets
+                if len(df) > 10000 and preview_mode == "First rows":
+                    st.info(f"Showing first {preview_rows} rows of {len(df):,} total rows.")
             except Exception as e:
                 st.error(f"Error displaying data: {e}")
                 # Fallback: show just the first few rows without selection
@@ -114,16 +208,12 @@ with tab1:
         if st.button("Generate Summary", key="summary_btn"):
             with st.spinner("Processing dataset info..."):
                 try:
-                    # Use caching for expensive operations
-                    @st.cache_data
-                    def get_summary_stats(_df):
-                        return {
-                            'dtypes': _df.dtypes,
-                            'missing': _df.isna().sum(),
-                            'numeric_summary': _df.describe() if not _df.select_dtypes(include=[np.number]).empty else None
-                        }
-                    
-                    stats = get_summary_stats(df)
+                    # Everything here is read from the cached profile
+                    stats = {
+                        'dtypes': profile.dtypes,
+                        'missing': profile.missing,
+                        'numeric_summary': profile.describe() if profile.numeric_columns else None
+                    }
                     
                     # Display in columns
                     col1, col2 = st.columns(2)
@@ -158,61 +248,72 @@ with tab1:
         selected_col = st.selectbox("Select a column to explore:", df.columns)
         
         if selected_col:
-            col_data = df[selected_col]
+            col_stats = profile.column(selected_col)
             col1, col2 = st.columns(2)
             
             with col1:
                 st.write(f"**Statistics for `{selected_col}`**")
-                st.write(f"Data type: `{col_data.dtype}`")
-                st.write(f"Unique values: `{col_data.nunique()}`")
-                st.write(f"Missing values: `{col_data.isna().sum()}`")
+                st.write(f"Data type: `{col_stats.dtype}`")
+                if col_stats.distinct_exact:
+                    st.write(f"Unique values: `{col_stats.distinct}`")
+                else:
+                    # Large columns get a HyperLogLog estimate (see sketches.py)
+                    st.write(f"Unique values: `~{col_stats.distinct:,}` (estimate, ±2.5%)")
+                    if st.button("Count exactly", key=f"exact_distinct_{selected_col}"):
+                        with st.spinner("Counting distinct values..."):
+                            st.write(f"Exact unique values: `{df[selected_col].nunique():,}`")
+                st.write(f"Missing values: `{col_stats.null_count}`")
                 
-                if pd.api.types.is_numeric_dtype(col_data):
-                    st.write(f"Min: `{col_data.min():.2f}`")
-                    st.write(f"Max: `{col_data.max():.2f}`")
-                    st.write(f"Mean: `{col_data.mean():.2f}`")
-                    st.write(f"Std Dev: `{col_data.std():.2f}`")
+                if col_stats.is_numeric:
+                    st.write(f"Min: `{col_stats.min:.2f}`")
+                    st.write(f"Max: `{col_stats.max:.2f}`")
+                    st.write(f"Mean: `{col_stats.mean:.2f}`")
+                    st.write(f"Std Dev: `{col_stats.std:.2f}`")
             
             with col2:
                 # Quick visualization based on data type
-                if pd.api.types.is_numeric_dtype(col_data):
-                    # For large datasets, sample the data
-                    if len(col_data) > 10000:
-                        sample_data = col_data.sample(10000, random_state=42)
-                        st.write(f"*Showing 10,000 sample points of {len(col_data):,} total*")
-                    else:
-                        sample_data = col_data
-                    
+                if col_stats.is_numeric:
+                    # Histogram bins come precomputed (over all rows) from the profile
+                    edges = col_stats.hist_edges
+                    # Imported here so sessions that never draw don't load matplotlib
+                    import matplotlib.pyplot as plt
                     fig, ax = plt.subplots(figsize=(8, 4))
-                    ax.hist(sample_data.dropna(), bins=30, edgecolor='black')
+                    ax.stairs(col_stats.hist_counts, edges, fill=True, edgecolor='black')
                     ax.set_title(f"Distribution of {selected_col}")
                     ax.set_xlabel(selected_col)
                     ax.set_ylabel("Frequency")
-                    st.pyplot(fig)
-                elif pd.api.types.is_categorical_dtype(col_data) or col_data.nunique() < 20:
+                    with perf.span("st.pyplot"):
+                        st.pyplot(fig)
+                elif isinstance(col_stats.dtype, pd.CategoricalDtype) or col_stats.distinct < 20:
                     # Show value counts for categorical
-                    value_counts = col_data.value_counts().head(10)
-                    st.bar_chart(value_counts)
+                    st.bar_chart(col_stats.top_values)
     
     # Data Quality Check
     with st.expander("✅ Data Quality Check", expanded=False):
         quality_issues = []
         
         # Check for columns with high missing percentage
-        missing_pct = (df.isna().sum() / len(df)) * 100
-        high_missing = missing_pct[missing_pct > 50].index.tolist()
+        high_missing = profile.high_missing(50)
         if high_missing:
             quality_issues.append(f"⚠️ {len(high_missing)} columns have >50% missing values")
         
         # Check for constant columns
-        constant_cols = [col for col in df.columns if df[col].nunique() == 1]
+        constant_cols = profile.constant_columns
         if constant_cols:
             quality_issues.append(f"⚠️ {len(constant_cols)} constant columns (single value)")
         
-        # Check for duplicate rows
-        duplicates = df.duplicated().sum()
-        if duplicates > 0:
-            quality_issues.append(f"⚠️ {duplicates} duplicate rows found")
+        # Check for duplicate rows (fingerprint-based, spills to disk on
+        # large data); the result is kept per dataset for later reruns
+        dup_key = f"duplicates_{data_key}"
+        if dup_key not in st.session_state:
+            dup_progress = st.progress(0.0, text="Checking for duplicate rows...")
+            st.session_state[dup_key] = duplicates.find_duplicates(
+                df, progress=lambda fraction, message: dup_progress.progress(fraction, text=message)
+            )
+            dup_progress.empty()
+        dup_report = st.session_state[dup_key]
+        if dup_report.duplicate_rows > 0:
+            quality_issues.append(f"⚠️ {dup_report.duplicate_rows} duplicate rows found")
         
         if quality_issues:
             for issue in quality_issues:
@@ -220,71 +321,125 @@ with tab1:
         else:
             st.success("✅ No major data quality issues detected")
 
-with tab2:
+        if dup_report.groups:
+            st.write("**Sample duplicate groups:**")
+            for group in dup_report.groups:
+                st.dataframe(df.loc[group], use_container_width=True)
+
+with tab2, perf.span("Visualizations tab"):
     st.header("Visualizations")
-    # Use selectbox to choose which plot to show
-    plot_choice = st.selectbox(
-        "Choose a visualization:",
-        [
-            "Daily Activity Distribution",
-            "Activity by Gender",
-            "Reels Watched by Activity",
-            "Instagram Activity by Age",
-            "DMs sent by Relationship Status",
-            # ... add all other plot names here
-        ]
-    )
+    # The plot menu is built from the registry in eda_functions
+    plot_specs = {spec.name: spec for spec in eda.available_plots(df, section="visualizations")}
+    if not plot_specs:
+        st.warning("Required columns not found in data.")
+    else:
+        plot_choice = st.selectbox("Choose a visualization:", list(plot_specs))
+        spec = plot_specs[plot_choice]
+        params = dict(spec.params)
 
-    if plot_choice == "Daily Activity Distribution":
-        fig = eda.plot_activity_distribution(df)
-        if fig:
-            st.pyplot(fig)
-        else:
-            st.warning("Required columns not found in data.")
-    elif plot_choice == "Activity by Gender":
-        fig = eda.plot_activity_by_gender(df)
-        if fig:
-            st.pyplot(fig)
-        else:
-            st.warning("Required columns not found in data.")
-    elif plot_choice == "Reels Watched by Activity":
-        fig = eda.plot_reels_by_activity(df)
-        if fig:
-            st.pyplot(fig)
-        else:
-            st.warning("Required columns not found in data.")
-    elif plot_choice == "Instagram Activity by Age":
-        fig = eda.plot_activity_by_age(df)
-        if fig:
-            st.pyplot(fig)
-        else:
-            st.warning("Required columns not found in data.")
-    elif plot_choice == "DMs sent by Relationship Status":
-        fig = eda.plot_dms_by_relationship_status(df)
-        if fig:
-            st.pyplot(fig)
-        else:
-            st.warning("Required columns not found in data.")
-    # ... add more elif blocks for each plot
+        # Bar charts can draw closed-form 95% confidence intervals; the
+        # checkbox starts at the plot's registered default
+        if 'ci' in params:
+            show_ci = st.checkbox("Show 95% confidence intervals on bar charts", value=params['ci'] is not None)
+            params['ci'] = 95 if show_ci else None
+        if 'bin_size' in params:
+            params['bin_size'] = st.slider("Age group size (years)", min_value=1, max_value=10, value=params['bin_size'])
+        # Scatter plots shade a density grid instead of drawing every point on large data
+        if 'mode' in params:
+            modes = {"Automatic": "auto", "Individual points": "points", "Density": "density"}
+            params['mode'] = modes[st.radio("Rendering", list(modes), horizontal=True)]
 
-with tab3:
+        # Points mode on large data draws a stratified sample; say which one
+        if (spec.name == "Work Hours vs Engagement" and params.get('mode') == 'points'
+                and len(df) > eda.DENSITY_THRESHOLD):
+            attach_sampler(eda.SCATTER_STRATA, capacity=eda.DENSITY_THRESHOLD)
+            st.caption(f"Points drawn from a sample: {eda.scatter_sample(df).describe()}")
+
+        rendered, total = prerender_job.progress
+        if not prerender_job.done():
+            st.caption(f"Pre-rendering plots in the background: {rendered}/{total} ready")
+        show_plot(spec.func, **params)
+
+with tab3, perf.span("Correlations tab"):
     st.header("Feature Correlations")
+    # The clustered view reorders columns by similarity and annotates only the
+    # strongest pairs; its linkage is cached per correlation matrix
+    clustered = st.checkbox("Cluster similar features", value=len(profile.numeric_columns) > eda.ANNOTATE_MAX_COLUMNS)
+    corr_spec = eda.PLOT_REGISTRY["Clustered Correlation Matrix" if clustered else "Feature Correlation Matrix"]
+    corr_params = dict(corr_spec.params)
+    if clustered:
+        corr_params['top_k'] = st.slider("Annotate the strongest pairs", min_value=0, max_value=50,
+                                         value=corr_params['top_k'])
     if st.button("Generate Correlation Heatmap"):
-        fig = eda.plot_correlation_matrix(df)
-        if fig:
-            st.pyplot(fig)
-        else:
-            st.warning("Not enough numeric columns for correlation.")
+        # The registered params plus the slider, so the figure-cache key
+        # matches a pre-render; the linkage is cached per matrix on its own
+        show_plot(corr_spec.func, warning="Not enough numeric columns for correlation.", **corr_params)
+
+with tab4, perf.span("Pairplot tab"):
+    st.header("Pairplot")
+    # Histograms and binned densities for every pair come from one pass over
+    # the data, and the grid is drawn as a single image (see pairs.py)
+    pair_spec = eda.PLOT_REGISTRY["Pairplot"]
+    max_columns = st.number_input("Maximum columns", min_value=2, max_value=40,
+                                  value=pair_spec.params['max_columns'])
+    numeric_columns = profile.numeric_columns
+    pair_columns = st.multiselect("Columns", numeric_columns,
+                                  default=eda.pairplot_columns(df, int(max_columns)))
+    hue_options = ["None"] + [
+        col.name for col in profile.columns.values()
+        if not col.is_numeric and 1 < col.distinct <= eda.pairs.MAX_HUE_LEVELS
+    ]
+    default_hue = pair_spec.params['hue']
+    hue_choice = st.selectbox("Colour by", hue_options,
+                              index=hue_options.index(default_hue) if default_hue in hue_options else 0)
+    if len(pair_columns) > max_columns:
+        st.caption(f"Only the first {int(max_columns)} of {len(pair_columns)} selected columns are drawn.")
+    if st.button("Draw Pairplot"):
+        # Only choices that differ from the registered defaults are passed, so
+        # the default pairplot has the same figure-cache key as a pre-render
+        pair_params = dict(pair_spec.params, max_columns=int(max_columns),
+                           hue=None if hue_choice == "None" else hue_choice)
+        if list(pair_columns) != eda.pairplot_columns(df, int(max_columns)):
+            pair_params['columns'] = list(pair_columns)
+        with st.spinner("Aggregating and drawing..."):
+            show_plot(pair_spec.func, warning="Select at least two numeric columns.", **pair_params)
 
 # --- Bonus: Download Processed Data ---
+# The export (with the derived 'activity_bin' column) is streamed to a file
+# chunk by chunk (see export.py) only when the button is clicked, and kept
+# per dataset fingerprint and format. Streamlit still holds the finished
+# file in memory to serve it, so the compressed formats keep that small.
 st.sidebar.divider()
 st.sidebar.header("Export")
-if st.sidebar.button("Prepare Data for Download"):
-    # Example: Save the dataframe with the new 'activity_bin' column
-    csv = df.to_csv(index=False).encode('utf-8')
-    st.sidebar.download_button(
-        label="Download CSV",
-        data=csv,
-        file_name="processed_instagram_data.csv",
-        mime="text/csv",
-    )
+export_format = st.sidebar.selectbox("Format", export.available_formats(),
+                                     format_func=lambda name: export.FORMATS[name].label)
+
+def read_export(fmt=export_format):
+    with open(export.cached_export(df, data_key, fmt), "rb") as f:
+        return f.read()
+
+st.sidebar.download_button(
+    label="Download Data",
+    data=read_export,
+    file_name=f"processed_instagram_data{export.FORMATS[export_format].extension}",
+    mime=export.FORMATS[export_format].mime,
+)
+
+# --- Performance Panel ---
+if perf_enabled:
+    # Stops recording (and memory tracing) before the panel itself is drawn
+    tracer.end_run()
+    with st.sidebar.expander("⏱️ Performance", expanded=False):
+        runs = list(tracer.runs)[::-1]
+        run = st.selectbox("Rerun", runs, format_func=lambda r: f"{r.label} ({r.wall_s * 1000:,.0f} ms)")
+        timeline = pd.DataFrame(tracer.timeline(run))
+        if timeline.empty:
+            st.caption("Nothing recorded in this rerun.")
+        else:
+            stages = timeline[~timeline['stage'].str.startswith(' ')]
+            st.bar_chart(stages.set_index('stage')['wall_ms'], horizontal=True)
+            st.dataframe(timeline, hide_index=True, use_container_width=True)
+        st.download_button("Export JSON", tracer.to_json(), file_name="perf_trace.json",
+                           mime="application/json")
+        st.download_button("Export Chrome trace", tracer.to_chrome_trace(), file_name="perf_chrome_trace.json",
+                           mime="application/json", help="Open in chrome://tracing or ui.perfetto.dev")